@@ -1,48 +1,74 @@
-from twin4build.model.model import Model
-from twin4build.api import models
-from twin4build.simulator.simulator import Simulator
-from twin4build.monitor.monitor import Monitor
-from twin4build.estimator.estimator import Estimator
-from twin4build.evaluator.evaluator import Evaluator
-from twin4build.components import PiecewiseLinearSystem
-from twin4build.components import PiecewiseLinearSupplyWaterTemperatureSystem
-from twin4build.components import TimeSeriesInputSystem
-from twin4build.components import OutdoorEnvironmentSystem
-from twin4build.components import OccupancySystem
-from twin4build.components import ScheduleSystem
-from twin4build.components import FlowJunctionSystem
-from twin4build.components import PiecewiseLinearScheduleSystem
-from twin4build.components import BuildingSpaceSystem
-from twin4build.components import BuildingSpaceCo2System
-from twin4build.components import BuildingSpaceOccSystem
-from twin4build.components import BuildingSpaceFMUSystem
-from twin4build.components import BuildingSpace1AdjFMUSystem
-from twin4build.components import BuildingSpace2AdjFMUSystem
-from twin4build.components import BuildingSpace0AdjBoundaryFMUSystem
-from twin4build.components import BuildingSpace1AdjBoundaryFMUSystem
-from twin4build.components import BuildingSpace2AdjBoundaryFMUSystem
-from twin4build.components import BuildingSpace11AdjBoundaryFMUSystem
-from twin4build.components import BuildingSpace0AdjBoundaryOutdoorFMUSystem
-from twin4build.components import BuildingSpace1AdjBoundaryOutdoorFMUSystem
-from twin4build.components import BuildingSpace2AdjBoundaryOutdoorFMUSystem
-from twin4build.components import BuildingSpace11AdjBoundaryOutdoorFMUSystem
-from twin4build.components import CoilPumpValveFMUSystem
-from twin4build.components import CoilHeatingSystem
-from twin4build.components import CoilCoolingSystem
-from twin4build.components import ControllerSystem
-from twin4build.components import RulebasedControllerSystem
-from twin4build.components import AirToAirHeatRecoverySystem
-from twin4build.components import DamperSystem
-from twin4build.components import ValveSystem
-from twin4build.components import FanSystem
-from twin4build.components import SpaceHeaterSystem
-from twin4build.components import SensorSystem
-from twin4build.components import ClassificationAnnControllerSystem
-from twin4build.components import MeterSystem
-from twin4build.components import ShadingDeviceSystem
-from twin4build.base import Measurement
-from twin4build.base import PropertyValue
-from twin4build.base import Temperature
-from twin4build.base import Co2
-from twin4build.base import OpeningPosition
-from twin4build.base import Energy
\ No newline at end of file
+"""
+The public classes are imported lazily on first access (PEP 562), e.g. "tb.Model" or "from twin4build import Simulator".
+This keeps "import twin4build" cheap, which matters for worker processes that unpickle a model.
+"""
+import importlib
+
+_lazy_attributes = {
+    "Model": "twin4build.model.model",
+    "Simulator": "twin4build.simulator.simulator",
+    "Monitor": "twin4build.monitor.monitor",
+    "Estimator": "twin4build.estimator.estimator",
+    "Evaluator": "twin4build.evaluator.evaluator",
+    "PiecewiseLinearSystem": "twin4build.components",
+    "PiecewiseLinearSupplyWaterTemperatureSystem": "twin4build.components",
+    "TimeSeriesInputSystem": "twin4build.components",
+    "OutdoorEnvironmentSystem": "twin4build.components",
+    "OccupancySystem": "twin4build.components",
+    "ScheduleSystem": "twin4build.components",
+    "FlowJunctionSystem": "twin4build.components",
+    "PiecewiseLinearScheduleSystem": "twin4build.components",
+    "BuildingSpaceSystem": "twin4build.components",
+    "BuildingSpaceCo2System": "twin4build.components",
+    "BuildingSpaceOccSystem": "twin4build.components",
+    "BuildingSpaceFMUSystem": "twin4build.components",
+    "BuildingSpace1AdjFMUSystem": "twin4build.components",
+    "BuildingSpace2AdjFMUSystem": "twin4build.components",
+    "BuildingSpace0AdjBoundaryFMUSystem": "twin4build.components",
+    "BuildingSpace1AdjBoundaryFMUSystem": "twin4build.components",
+    "BuildingSpace2AdjBoundaryFMUSystem": "twin4build.components",
+    "BuildingSpace11AdjBoundaryFMUSystem": "twin4build.components",
+    "BuildingSpace0AdjBoundaryOutdoorFMUSystem": "twin4build.components",
+    "BuildingSpace1AdjBoundaryOutdoorFMUSystem": "twin4build.components",
+    "BuildingSpace2AdjBoundaryOutdoorFMUSystem": "twin4build.components",
+    "BuildingSpace11AdjBoundaryOutdoorFMUSystem": "twin4build.components",
+    "CoilPumpValveFMUSystem": "twin4build.components",
+    "CoilHeatingSystem": "twin4build.components",
+    "CoilCoolingSystem": "twin4build.components",
+    "ControllerSystem": "twin4build.components",
+    "RulebasedControllerSystem": "twin4build.components",
+    "AirToAirHeatRecoverySystem": "twin4build.components",
+    "DamperSystem": "twin4build.components",
+    "ValveSystem": "twin4build.components",
+    "FanSystem": "twin4build.components",
+    "SpaceHeaterSystem": "twin4build.components",
+    "SensorSystem": "twin4build.components",
+    "ClassificationAnnControllerSystem": "twin4build.components",
+    "MeterSystem": "twin4build.components",
+    "ShadingDeviceSystem": "twin4build.components",
+    "Measurement": "twin4build.base",
+    "PropertyValue": "twin4build.base",
+    "Temperature": "twin4build.base",
+    "Co2": "twin4build.base",
+    "OpeningPosition": "twin4build.base",
+    "Energy": "twin4build.base",
+}
+
+_lazy_modules = {
+    "models": "twin4build.api.models",
+}
+
+__all__ = list(_lazy_attributes.keys()) + list(_lazy_modules.keys())
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+    elif name in _lazy_modules:
+        value = importlib.import_module(_lazy_modules[name])
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__all__))
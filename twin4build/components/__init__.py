@@ -1,51 +1,69 @@
-from twin4build.utils.piecewise_linear import PiecewiseLinearSystem
-from twin4build.utils.piecewise_linear_supply_water_temperature import PiecewiseLinearSupplyWaterTemperatureSystem
-from twin4build.utils.time_series_input import TimeSeriesInputSystem
-from twin4build.utils.outdoor_environment.outdoor_environment_system import OutdoorEnvironmentSystem
-from twin4build.saref.profile.schedule.occupancy.occupancy_system import OccupancySystem
-from twin4build.saref.profile.schedule.schedule_system import ScheduleSystem
-from twin4build.utils.max_system import MaxSystem
-from twin4build.utils.flow_junction_system import FlowJunctionSystem
-from twin4build.utils.on_off_system import OnOffSystem
-from twin4build.utils.piecewise_linear_schedule import PiecewiseLinearScheduleSystem
-from twin4build.saref4bldg.building_space.building_space_adjacent_system import BuildingSpaceSystem
-from twin4build.saref4bldg.building_space.building_space_fmu_system import BuildingSpaceFMUSystem
-from twin4build.saref4bldg.building_space.building_space_1adj_fmu_system import BuildingSpace1AdjFMUSystem
-from twin4build.saref4bldg.building_space.building_space_2adj_fmu_system import BuildingSpace2AdjFMUSystem
-from twin4build.saref4bldg.building_space.building_space_0adj_boundary_fmu_system import BuildingSpace0AdjBoundaryFMUSystem
-from twin4build.saref4bldg.building_space.building_space_1adj_boundary_fmu_system import BuildingSpace1AdjBoundaryFMUSystem
-from twin4build.saref4bldg.building_space.building_space_2adj_boundary_fmu_system import BuildingSpace2AdjBoundaryFMUSystem
-from twin4build.saref4bldg.building_space.building_space_11adj_boundary_fmu_system import BuildingSpace11AdjBoundaryFMUSystem
-from twin4build.saref4bldg.building_space.building_space_noSH_1adj_boundary_fmu_system import BuildingSpaceNoSH1AdjBoundaryFMUSystem
-from twin4build.saref4bldg.building_space.building_space_0adj_boundary_outdoor_fmu_system import BuildingSpace0AdjBoundaryOutdoorFMUSystem
-from twin4build.saref4bldg.building_space.building_space_1adj_boundary_outdoor_fmu_system import BuildingSpace1AdjBoundaryOutdoorFMUSystem
-from twin4build.saref4bldg.building_space.building_space_2adj_boundary_outdoor_fmu_system import BuildingSpace2AdjBoundaryOutdoorFMUSystem
-from twin4build.saref4bldg.building_space.building_space_11adj_boundary_outdoor_fmu_system import BuildingSpace11AdjBoundaryOutdoorFMUSystem
-from twin4build.saref4bldg.building_space.building_space_noSH_1adj_boundary_outdoor_fmu_system import BuildingSpaceNoSH1AdjBoundaryOutdoorFMUSystem
-from twin4build.saref4bldg.building_space.building_space_co2_system import BuildingSpaceCo2System
-from twin4build.saref4bldg.building_space.building_space_occ_system import BuildingSpaceOccSystem
-# from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_DryCoilDiscretizedEthyleneGlycolWater30Percent_wbypass_FMUmodel import CoilPumpValveFMUSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_fmu_system_wsysres import CoilPumpValveFMUSystem
+"""
+Registry of the component classes available in twin4build.
 
+The components are imported lazily on first access (PEP 562), e.g. "components.DamperSystem" or "from twin4build.components import DamperSystem".
+This avoids importing heavy backends such as torch, pwlf or fmpy unless a component that needs them is used.
+"""
+import importlib
 
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_DryCoilDiscretizedEthyleneGlycolWater30Percent_FMUmodel import CoilFMUSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_heating_system import CoilHeatingSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_cooling_system import CoilCoolingSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.setpoint_controller.pid_controller.pid_controller_system import ControllerSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.rulebased_controller.rulebased_controller_system import RulebasedControllerSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.classification_ann_controller.classification_ann_controller_system import ClassificationAnnControllerSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.setpoint_controller.pi_controller.pi_controller_fmu_system import PIControllerFMUSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.sequence_controller.sequence_controller_system import SequenceControllerSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.rulebased_controller.on_off_controller.on_off_controller_system import OnOffControllerSystem
-# from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.setpoint_controller.pid_controller.pid_controller_fmu_system import FMUPIDControllerSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.air_to_air_heat_recovery.air_to_air_heat_recovery_system import AirToAirHeatRecoverySystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.damper.damper_system import DamperSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.valve.valve_system import ValveSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.valve.valve_wbypass_full_FMUmodel import ValvePumpFMUSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.valve.valve_fmu_system import ValveFMUSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_moving_device.fan.fan_system import FanSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_moving_device.fan.fan_fmu_system import FanFMUSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_terminal.space_heater.space_heater_system import SpaceHeaterSystem
-from twin4build.saref.device.sensor.sensor_system import SensorSystem
-from twin4build.saref.device.meter.meter_system import MeterSystem
-from twin4build.saref4bldg.physical_object.building_object.building_device.shading_device.shading_device_system import ShadingDeviceSystem
\ No newline at end of file
+_component_modules = {
+    "PiecewiseLinearSystem": "twin4build.utils.piecewise_linear",
+    "PiecewiseLinearSupplyWaterTemperatureSystem": "twin4build.utils.piecewise_linear_supply_water_temperature",
+    "TimeSeriesInputSystem": "twin4build.utils.time_series_input",
+    "OutdoorEnvironmentSystem": "twin4build.utils.outdoor_environment.outdoor_environment_system",
+    "OccupancySystem": "twin4build.saref.profile.schedule.occupancy.occupancy_system",
+    "ScheduleSystem": "twin4build.saref.profile.schedule.schedule_system",
+    "MaxSystem": "twin4build.utils.max_system",
+    "FlowJunctionSystem": "twin4build.utils.flow_junction_system",
+    "OnOffSystem": "twin4build.utils.on_off_system",
+    "PiecewiseLinearScheduleSystem": "twin4build.utils.piecewise_linear_schedule",
+    "BuildingSpaceSystem": "twin4build.saref4bldg.building_space.building_space_adjacent_system",
+    "BuildingSpaceFMUSystem": "twin4build.saref4bldg.building_space.building_space_fmu_system",
+    "BuildingSpace1AdjFMUSystem": "twin4build.saref4bldg.building_space.building_space_1adj_fmu_system",
+    "BuildingSpace2AdjFMUSystem": "twin4build.saref4bldg.building_space.building_space_2adj_fmu_system",
+    "BuildingSpace0AdjBoundaryFMUSystem": "twin4build.saref4bldg.building_space.building_space_0adj_boundary_fmu_system",
+    "BuildingSpace1AdjBoundaryFMUSystem": "twin4build.saref4bldg.building_space.building_space_1adj_boundary_fmu_system",
+    "BuildingSpace2AdjBoundaryFMUSystem": "twin4build.saref4bldg.building_space.building_space_2adj_boundary_fmu_system",
+    "BuildingSpace11AdjBoundaryFMUSystem": "twin4build.saref4bldg.building_space.building_space_11adj_boundary_fmu_system",
+    "BuildingSpaceNoSH1AdjBoundaryFMUSystem": "twin4build.saref4bldg.building_space.building_space_noSH_1adj_boundary_fmu_system",
+    "BuildingSpace0AdjBoundaryOutdoorFMUSystem": "twin4build.saref4bldg.building_space.building_space_0adj_boundary_outdoor_fmu_system",
+    "BuildingSpace1AdjBoundaryOutdoorFMUSystem": "twin4build.saref4bldg.building_space.building_space_1adj_boundary_outdoor_fmu_system",
+    "BuildingSpace2AdjBoundaryOutdoorFMUSystem": "twin4build.saref4bldg.building_space.building_space_2adj_boundary_outdoor_fmu_system",
+    "BuildingSpace11AdjBoundaryOutdoorFMUSystem": "twin4build.saref4bldg.building_space.building_space_11adj_boundary_outdoor_fmu_system",
+    "BuildingSpaceNoSH1AdjBoundaryOutdoorFMUSystem": "twin4build.saref4bldg.building_space.building_space_noSH_1adj_boundary_outdoor_fmu_system",
+    "BuildingSpaceCo2System": "twin4build.saref4bldg.building_space.building_space_co2_system",
+    "BuildingSpaceOccSystem": "twin4build.saref4bldg.building_space.building_space_occ_system",
+    "CoilPumpValveFMUSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_fmu_system_wsysres",
+    "CoilFMUSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_DryCoilDiscretizedEthyleneGlycolWater30Percent_FMUmodel",
+    "CoilHeatingSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_heating_system",
+    "CoilCoolingSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_cooling_system",
+    "ControllerSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.setpoint_controller.pid_controller.pid_controller_system",
+    "RulebasedControllerSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.rulebased_controller.rulebased_controller_system",
+    "ClassificationAnnControllerSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.classification_ann_controller.classification_ann_controller_system",
+    "PIControllerFMUSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.setpoint_controller.pi_controller.pi_controller_fmu_system",
+    "SequenceControllerSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.sequence_controller.sequence_controller_system",
+    "OnOffControllerSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.rulebased_controller.on_off_controller.on_off_controller_system",
+    "AirToAirHeatRecoverySystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.air_to_air_heat_recovery.air_to_air_heat_recovery_system",
+    "DamperSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.damper.damper_system",
+    "ValveSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.valve.valve_system",
+    "ValvePumpFMUSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.valve.valve_wbypass_full_FMUmodel",
+    "ValveFMUSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_controller.valve.valve_fmu_system",
+    "FanSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_moving_device.fan.fan_system",
+    "FanFMUSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_moving_device.fan.fan_fmu_system",
+    "SpaceHeaterSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.flow_terminal.space_heater.space_heater_system",
+    "SensorSystem": "twin4build.saref.device.sensor.sensor_system",
+    "MeterSystem": "twin4build.saref.device.meter.meter_system",
+    "ShadingDeviceSystem": "twin4build.saref4bldg.physical_object.building_object.building_device.shading_device.shading_device_system",
+}
+
+__all__ = list(_component_modules.keys())
+
+def __getattr__(name):
+    if name in _component_modules:
+        cls = getattr(importlib.import_module(_component_modules[name]), name)
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(__all__))
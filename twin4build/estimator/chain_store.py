@@ -0,0 +1,171 @@
+import os
+import json
+import pickle
+import numpy as np
+
+class ChainStore():
+    """
+    Append-only on-disk storage of MCMC chains, used by Estimator.run_emcee_estimation.
+
+    The store is a directory containing:
+        - metadata.pickle: Static information about the estimation problem, e.g. the estimated component attributes and the training periods.
+        - <key>.<chunk number>.npy: Chunks of the arrays that grow with the number of iterations, e.g. "chain.x" or "chain.logl". The first axis of each chunk is the iteration axis.
+        - index.json: The number of iterations in each committed chunk.
+
+    Each checkpoint only writes the iterations added since the previous checkpoint.
+    All files are written to a temporary file first and then moved into place, and chunks are only committed by the subsequent update of index.json.
+    A crash during a checkpoint therefore leaves the store in the state of the previous checkpoint, from which the estimation can be resumed.
+
+    A ChainStore can be used in place of the chain log dictionary (see Model.load_chain_log).
+    Arrays are loaded lazily and memory-mapped if the array consists of a single chunk (see self.consolidate).
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        if os.path.isdir(self.directory)==False:
+            os.makedirs(self.directory)
+        self._index_filename = os.path.join(self.directory, "index.json")
+        self._metadata_filename = os.path.join(self.directory, "metadata.pickle")
+        if os.path.isfile(self._index_filename):
+            with open(self._index_filename, "r") as handle:
+                self.index = json.load(handle)
+        else:
+            self.index = {"keys": [], "chunks": []}
+        if os.path.isfile(self._metadata_filename):
+            with open(self._metadata_filename, "rb") as handle:
+                self.metadata = pickle.load(handle)
+        else:
+            self.metadata = {}
+        self._cache = {}
+        self._deleted = set()
+        if "merged" in self.index:
+            # A previous consolidation was interrupted after the merged chunk was committed
+            self._finish_consolidate()
+
+    @staticmethod
+    def is_chain_store(directory):
+        return os.path.isfile(os.path.join(directory, "index.json"))
+
+    def get_n_iterations(self):
+        return sum(self.index["chunks"])
+
+    def _replace(self, filename, write):
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "wb") as handle:
+            write(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_filename, filename)
+
+    def _get_chunk_filename(self, key, chunk):
+        return os.path.join(self.directory, f"{key}.{chunk:06d}.npy")
+
+    def _write_index(self):
+        self._replace(self._index_filename, lambda handle: handle.write(json.dumps(self.index).encode()))
+
+    def write_metadata(self, metadata):
+        self.metadata = metadata
+        self._replace(self._metadata_filename, lambda handle: pickle.dump(metadata, handle, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def append(self, arrays):
+        """
+        Appends a new chunk. "arrays" is a dictionary of arrays, which must all have the same length along the first (iteration) axis.
+        The keys must be identical for all chunks.
+        """
+        n = {len(array) for array in arrays.values()}
+        assert len(n)==1, "All arrays appended to a ChainStore must have the same number of iterations"
+        n = n.pop()
+        if n==0:
+            return
+        if len(self.index["chunks"])==0:
+            self.index["keys"] = list(arrays.keys())
+        else:
+            assert set(arrays.keys())==set(self.index["keys"]), "The keys appended to a ChainStore must be identical for all chunks"
+        chunk = len(self.index["chunks"])
+        for key, array in arrays.items():
+            self._replace(self._get_chunk_filename(key, chunk), lambda handle: np.save(handle, np.asarray(array)))
+        self.index["chunks"].append(n)
+        self._write_index()
+        self._clear_cache()
+
+    def consolidate(self):
+        """
+        Merges all chunks into a single chunk per key, which allows the arrays to be memory-mapped when loaded.
+        """
+        if len(self.index["chunks"])<=1:
+            return
+        n_chunks = len(self.index["chunks"])
+        merged_chunk = n_chunks
+        for key in self.index["keys"]:
+            array = self._load(key)
+            self._replace(self._get_chunk_filename(key, merged_chunk), lambda handle: np.save(handle, array))
+        self._clear_cache()
+        # The merged chunk is committed by moving it to chunk number 0 after the index has been updated
+        self.index = {"keys": self.index["keys"], "chunks": [sum(self.index["chunks"])], "merged": merged_chunk}
+        self._write_index()
+        self._finish_consolidate()
+
+    def _finish_consolidate(self):
+        merged_chunk = self.index["merged"]
+        for key in self.index["keys"]:
+            if os.path.isfile(self._get_chunk_filename(key, merged_chunk)):
+                os.replace(self._get_chunk_filename(key, merged_chunk), self._get_chunk_filename(key, 0))
+        del self.index["merged"]
+        self._write_index()
+        for filename in os.listdir(self.directory):
+            key, _, suffix = filename.rpartition(".npy")[0].rpartition(".")
+            if key in self.index["keys"] and suffix.isdigit() and int(suffix)>=1:
+                os.remove(os.path.join(self.directory, filename))
+
+    def _clear_cache(self):
+        for key in self.index["keys"] + ["chain.T"]:
+            self._cache.pop(key, None)
+
+    def _load(self, key):
+        arrays = [np.load(self._get_chunk_filename(key, chunk), mmap_mode="r") for chunk in range(len(self.index["chunks"]))]
+        if len(arrays)==1:
+            return arrays[0]
+        else:
+            return np.concatenate(arrays, axis=0)
+
+    def keys(self):
+        keys = list(self.metadata.keys()) + list(self.index["keys"]) + list(self._cache.keys())
+        if "chain.betas" in self.index["keys"]:
+            keys.append("chain.T")
+        return [key for key in dict.fromkeys(keys) if key not in self._deleted]
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __getitem__(self, key):
+        if key in self._deleted:
+            raise KeyError(key)
+        elif key in self._cache:
+            return self._cache[key]
+        elif key in self.index["keys"]:
+            self._cache[key] = self._load(key)
+            return self._cache[key]
+        elif key=="chain.T" and "chain.betas" in self.index["keys"]:
+            self._cache[key] = 1/self["chain.betas"]
+            return self._cache[key]
+        else:
+            return self.metadata[key]
+
+    def __setitem__(self, key, value):
+        """
+        Overrides the value of "key" in memory. The store on disk is not modified.
+        """
+        self._deleted.discard(key)
+        if key in self.metadata:
+            self.metadata[key] = value
+        else:
+            self._cache[key] = value
+
+    def __delitem__(self, key):
+        """
+        Removes "key" from memory, e.g. to release a loaded array. The store on disk is not modified.
+        """
+        if key not in self:
+            raise KeyError(key)
+        self._cache.pop(key, None)
+        self.metadata.pop(key, None)
+        self._deleted.add(key)
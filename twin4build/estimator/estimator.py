@@ -1,8 +1,12 @@
 import multiprocessing
 import math
 import os
+import functools
 from tqdm import tqdm
 from twin4build.simulator.simulator import Simulator
+from twin4build.simulator.gradient_tape import GradientTape
+from twin4build.estimator.chain_store import ChainStore
+from twin4build.utils.shared_array import SharedArray
 from twin4build.logger.Logging import Logging
 from twin4build.utils.rgetattr import rgetattr
 from twin4build.utils.uppath import uppath
@@ -21,6 +25,24 @@ import matplotlib.pyplot as plt
 #Multiprocessing is used and messes up the logger due to race conditions and access to write the logger file.
 logger.disabled = True
 
+# Estimator instance owned by the current worker process (see _initialize_worker)
+_worker_estimator = None
+
+def _initialize_worker(estimator):
+    """
+    Pool initializer. The estimator, including the model and its cached inputs, is transferred once per worker process and kept for the lifetime of the worker. 
+    FMUs are instantiated by the first simulation in each worker and are afterwards reset instead of re-instantiated.
+    """
+    global _worker_estimator
+    _worker_estimator = estimator
+
+def _call_worker_estimator(method_name, theta):
+    """
+    Calls the method "method_name" of the estimator owned by the worker process. 
+    Wrapping this function with functools.partial gives a task function that only requires the parameter vector "theta" to be sent to the worker.
+    """
+    return getattr(_worker_estimator, method_name)(theta)
+
 class Estimator():
     def __init__(self,
                 model=None):
@@ -145,6 +167,9 @@ class Estimator():
         self.trackGradients = trackGradients
         self.targetParameters = targetParameters
         self.targetMeasuringDevices = targetMeasuringDevices
+        # Only the target measuring devices are recorded when evaluating the objective. Gradients are saved by other components, so everything is recorded in that case.
+        self.record = None if trackGradients else [(measuring_device, next(iter(measuring_device.input))) for measuring_device in targetMeasuringDevices]
+        self.gradient_tape = None
         self.n_obj_eval = 0
         self.best_loss = math.inf
 
@@ -226,7 +251,9 @@ class Estimator():
                 options = {}
             self.run_emcee_estimation(**options)
         elif algorithm == "least_squares":
-            self.run_least_squares_estimation(self.x0, self.lb, self.ub)
+            if options is None:
+                options = {}
+            self.run_least_squares_estimation(self.x0, self.lb, self.ub, **options)
 
     def sample_cartesian_n_sphere(self, r, n_dim, n_samples):
         """
@@ -257,7 +284,13 @@ class Estimator():
                              model_walker_initialization=None,
                              noise_walker_initialization=None,
                              add_noise_model=False,
-                             maxtasksperchild=100):
+                             maxtasksperchild=None,
+                             resume=None):
+        """
+        The chain is saved incrementally in a ChainStore directory (see ChainStore) within "chain_logs". 
+        If "resume" is the directory of an existing ChainStore, e.g. from an estimation that was interrupted, 
+        the walkers and temperatures are initialized from its last iteration and the new iterations are appended to it.
+        """
         assert n_cores>=1, "The argument \"n_cores\" must be larger than or equal to 1"
         assert fac_walker>=2, "The argument \"fac_walker\" must be larger than or equal to 2"
         allowed_priors = ["uniform", "gaussian", "sample_gaussian"]
@@ -282,9 +315,12 @@ class Estimator():
                             endTime=endTime_,
                             stepSize=stepSize_)
         
-        datestr = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = str('{}{}'.format(datestr, '.pickle'))
-        self.chain_savedir, isfile = self.model.get_dir(folder_list=["model_parameters", "estimation_results", "chain_logs"], filename=filename)
+        if resume is None:
+            datestr = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+            self.chain_savedir, isfile = self.model.get_dir(folder_list=["model_parameters", "estimation_results", "chain_logs", datestr])
+        else:
+            assert ChainStore.is_chain_store(resume), f"The directory \"{resume}\" is not a chain store"
+            self.chain_savedir = resume
         
 
         assert (model_prior is None and noise_prior is None) or (model_prior is not None and noise_prior is not None), "\"model_prior\" and \"noise_prior\" must both be either None or set to one of the available priors."
@@ -546,69 +582,101 @@ class Estimator():
         print(f"Number of ensemble walkers per chain: {n_walkers}")
         adaptive = False if n_temperature==1 else True
         betas = np.array([1]) if n_temperature==1 else make_ladder(ndim, n_temperature, Tmax=T_max)
+
+        chain_store = ChainStore(self.chain_savedir)
+        component_id = [com.id for com in self.flat_component_list]
+        component_attr = [attr for attr in self.flat_attr_list]
+        if resume is not None:
+            assert chain_store.get_n_iterations()>0, f"The chain store \"{resume}\" contains no iterations"
+            assert chain_store["component_id"]==component_id and chain_store["component_attr"]==component_attr, f"The estimated parameters in the chain store \"{resume}\" do not match the estimation problem:\nchain store: {list(zip(chain_store['component_id'], chain_store['component_attr']))}\nestimation problem: {list(zip(component_id, component_attr))}"
+            x0_start = np.array(chain_store["chain.x"][-1])
+            assert x0_start.shape==(n_temperature, n_walkers, ndim), f"The chain store \"{resume}\" has shape {x0_start.shape[0]} temperatures, {x0_start.shape[1]} walkers and {x0_start.shape[2]} parameters, which does not match the estimation problem"
+            betas = np.array(chain_store["chain.betas"][-1])
+            print(f"Resuming from iteration {chain_store.get_n_iterations()} of {resume}")
+        else:
+            chain_store.write_metadata({"component_id": component_id,
+                                        "component_attr": component_attr,
+                                        "theta_mask": self.theta_mask,
+                                        "standardDeviation": self.standardDeviation,
+                                        "startTime_train": [self.startTime_train],
+                                        "endTime_train": [self.endTime_train],
+                                        "stepSize_train": [self.stepSize_train],
+                                        "mean_train": self.mean_train,
+                                        "sigma_train": self.sigma_train,
+                                        "n_par": self.n_par,
+                                        "n_par_map": self.n_par_map
+                                        })
         # pool = pathos.multiprocessing.ProcessingPool(n_cores, maxtasksperchild=100)
-        pool = multiprocessing.Pool(n_cores, maxtasksperchild=maxtasksperchild) #maxtasksperchild is set because the FMUs are leaking memory
-        sampler = Sampler(n_walkers,
-                          ndim,
-                          loglike,
-                          logprior,
-                          adaptive=adaptive,
-                          betas=betas,
-                          mapper=pool.imap)
-
-        chain = sampler.chain(x0_start)
-        n_save_checkpoint = 50 if n_sample>=50 else 1
-        result = {"integratedAutoCorrelatedTime": [],
-                    "chain.swap_acceptance": None,
-                    "chain.jump_acceptance": None,
-                    "chain.logl": None,
-                    "chain.logP": None,
-                    "chain.x": None,
-                    "chain.betas": None,
-                    "component_id": [com.id for com in self.flat_component_list],
-                    "component_attr": [attr for attr in self.flat_attr_list],
-                    "theta_mask": self.theta_mask,
-                    "standardDeviation": self.standardDeviation,
-                    "startTime_train": [self.startTime_train],
-                    "endTime_train": [self.endTime_train],
-                    "stepSize_train": [self.stepSize_train],
-                    "mean_train": self.mean_train,
-                    "sigma_train": self.sigma_train,
-                    # "gp_input_map": self.gp_input_map,
-                    # "n_x": self.n_x,
-                    # "n_y": self.n_y,
-                    "n_par": self.n_par,
-                    "n_par_map": self.n_par_map
-                    }
-        swap_acceptance = np.zeros((n_sample, n_temperature))
-        jump_acceptance = np.zeros((n_sample, n_temperature))
-        pbar = tqdm(enumerate(chain.iterate(n_sample)), total=n_sample)
-        for i, ensemble in pbar:
-            datestr = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            des = f"Date: {datestr} logl: {str(int(np.max(chain.logl[:i+1,0,:])))}"
-            pbar.set_description(des)
-            result["integratedAutoCorrelatedTime"].append(chain.get_acts())
-            # result["chain.jumps_accepted"].append(chain.jumps_accepted.copy())
-            # result["chain.jumps_proposed"].append(chain.jumps_proposed.copy())
-            # result["chain.swaps_accepted"].append(chain.swaps_accepted.copy())
-            # result["chain.swaps_proposed"].append(chain.swaps_proposed.copy())
-
-            if n_temperature>1:
-                swap_acceptance[i] = np.sum(ensemble.swaps_accepted)/np.sum(ensemble.swaps_proposed)
-            else:
-                swap_acceptance[i] = np.nan
-            jump_acceptance[i] = np.sum(ensemble.jumps_accepted)/np.sum(ensemble.jumps_proposed)
-            if (i+1) % n_save_checkpoint == 0:
-                result["chain.logl"] = chain.logl[:i+1]
-                result["chain.logP"] = chain.logP[:i+1]
-                result["chain.x"] = chain.x[:i+1]
-                result["chain.betas"] = chain.betas[:i+1]
-
-                result["chain.swap_acceptance"] = swap_acceptance[:i+1]
-                result["chain.jump_acceptance"] = jump_acceptance[:i+1]
-                with open(self.chain_savedir, 'wb') as handle:
-                    pickle.dump(result, handle, protocol=pickle.HIGHEST_PROTOCOL)
-        pool.close()
+        # The estimator is transferred to each worker once by the initializer. Each task then only sends the parameter vector and receives the log-likelihood or log-prior.
+        # FMUs are kept alive within each worker. maxtasksperchild can still be set to periodically restart the workers if an FMU leaks memory.
+        self._share_data()
+        # The pool and the shared memory blocks are released if the sampling fails or is interrupted
+        try:
+            pool = multiprocessing.Pool(n_cores, initializer=_initialize_worker, initargs=(self,), maxtasksperchild=maxtasksperchild)
+            try:
+                sampler = Sampler(n_walkers,
+                                  ndim,
+                                  functools.partial(_call_worker_estimator, loglike.__name__),
+                                  functools.partial(_call_worker_estimator, logprior.__name__),
+                                  adaptive=adaptive,
+                                  betas=betas,
+                                  mapper=pool.imap)
+
+                chain = sampler.chain(x0_start)
+                n_save_checkpoint = 50 if n_sample>=50 else 1
+                # Only the iterations since the last checkpoint are kept here and appended to the chain store
+                integratedAutoCorrelatedTime = []
+                swap_acceptance = []
+                jump_acceptance = []
+                n_saved = 0
+                pbar = tqdm(enumerate(chain.iterate(n_sample)), total=n_sample)
+                for i, ensemble in pbar:
+                    datestr = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+                    des = f"Date: {datestr} logl: {str(int(np.max(chain.logl[:i+1,0,:])))}"
+                    pbar.set_description(des)
+                    integratedAutoCorrelatedTime.append(chain.get_acts())
+                    # result["chain.jumps_accepted"].append(chain.jumps_accepted.copy())
+                    # result["chain.jumps_proposed"].append(chain.jumps_proposed.copy())
+                    # result["chain.swaps_accepted"].append(chain.swaps_accepted.copy())
+                    # result["chain.swaps_proposed"].append(chain.swaps_proposed.copy())
+
+                    if n_temperature>1:
+                        swap_acceptance.append(np.sum(ensemble.swaps_accepted)/np.sum(ensemble.swaps_proposed)*np.ones((n_temperature,)))
+                    else:
+                        swap_acceptance.append(np.nan*np.ones((n_temperature,)))
+                    jump_acceptance.append(np.sum(ensemble.jumps_accepted)/np.sum(ensemble.jumps_proposed)*np.ones((n_temperature,)))
+                    if (i+1) % n_save_checkpoint == 0 or i+1==n_sample:
+                        chain_store.append({"integratedAutoCorrelatedTime": np.array(integratedAutoCorrelatedTime),
+                                            "chain.logl": chain.logl[n_saved:i+1],
+                                            "chain.logP": chain.logP[n_saved:i+1],
+                                            "chain.x": chain.x[n_saved:i+1],
+                                            "chain.betas": chain.betas[n_saved:i+1],
+                                            "chain.swap_acceptance": np.array(swap_acceptance),
+                                            "chain.jump_acceptance": np.array(jump_acceptance)})
+                        integratedAutoCorrelatedTime = []
+                        swap_acceptance = []
+                        jump_acceptance = []
+                        n_saved = i+1
+                pool.close()
+            except BaseException:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+        finally:
+            self._release_shared_data()
+        chain_store.consolidate()
+
+    def _share_data(self):
+        """
+        Moves the input time series (see Model.share_data) and the measured readings to shared memory before the estimator is transferred to the worker processes.
+        """
+        self.model.share_data()
+        self.actual_readings = {key: SharedArray.from_array(value) for key, value in self.actual_readings.items()}
+
+    def _release_shared_data(self):
+        self.actual_readings = {key: value.release() if isinstance(value, SharedArray) else value for key, value in self.actual_readings.items()}
+        self.model.release_shared_data()
 
     def get_solution(self):
         sol_dict = {}
@@ -649,10 +717,12 @@ class Estimator():
                                     trackGradients=self.trackGradients,
                                     targetParameters=self.targetParameters,
                                     targetMeasuringDevices=self.targetMeasuringDevices,
-                                    show_progress_bar=False)
+                                    show_progress_bar=False,
+                                    record=self.record,
+                                    prune=self.record is not None)
             n_time = len(self.simulator.dateTimeSteps)-self.n_initialization_steps
             for measuring_device in self.targetMeasuringDevices:
-                y_model = np.array(next(iter(measuring_device.savedInput.values())))[self.n_initialization_steps:]#/self.targetMeasuringDevices[measuring_device]["scale_factor"]
+                y_model = np.asarray(next(iter(measuring_device.savedInput.values())))[self.n_initialization_steps:]#/self.targetMeasuringDevices[measuring_device]["scale_factor"]
                 self.simulation_readings[measuring_device.id][n_time_prev:n_time_prev+n_time] = y_model
             n_time_prev += n_time
 
@@ -718,10 +788,12 @@ class Estimator():
                                     trackGradients=self.trackGradients,
                                     targetParameters=self.targetParameters,
                                     targetMeasuringDevices=self.targetMeasuringDevices,
-                                    show_progress_bar=False)
+                                    show_progress_bar=False,
+                                    record=self.record,
+                                    prune=self.record is not None)
             n_time = len(self.simulator.dateTimeSteps)-self.n_initialization_steps
             for measuring_device in self.targetMeasuringDevices:
-                y_model = np.array(next(iter(measuring_device.savedInput.values())))[self.n_initialization_steps:]#/self.targetMeasuringDevices[measuring_device]["scale_factor"]
+                y_model = np.asarray(next(iter(measuring_device.savedInput.values())))[self.n_initialization_steps:]#/self.targetMeasuringDevices[measuring_device]["scale_factor"]
                 self.simulation_readings[measuring_device.id][n_time_prev:n_time_prev+n_time] = y_model
             n_time_prev += n_time
 
@@ -790,8 +862,16 @@ class Estimator():
 
         return p_model+p_noise
 
-    def run_least_squares_estimation(self, x0,lb,ub):
-        
+    def run_least_squares_estimation(self, x0,lb,ub, n_cores=multiprocessing.cpu_count(), use_sparsity=True, use_gradient_tape=False, **kwargs):
+        """
+        If "use_gradient_tape" is True, the Jacobian is computed from the local gradients of the components recorded while evaluating the residuals (see self._jac_least_squares_tape). 
+        This requires all components between the estimated parameters and the target measuring devices to implement "get_subset_gradient", 
+        and is refused if any of these components has internal states or if cycles were broken between them, as the tape neglects these sensitivities (see GradientTape).
+        Otherwise, if "n_cores" is larger than 1, the finite difference Jacobian is evaluated in parallel by a pool of worker processes (see self._jac_least_squares). 
+        If "use_sparsity" is True, parameters that affect disjoint sets of target measuring devices are perturbed in the same simulation (see self._get_jacobian_groups).
+        Additional keyword arguments are passed to scipy.optimize.least_squares.
+        """
+        assert n_cores>=1, "The argument \"n_cores\" must be larger than or equal to 1"
         assert np.all(self.x0>=self.lb), "The provided x0 must be larger than the provided lower bound lb"
         assert np.all(self.x0<=self.ub), "The provided x0 must be smaller than the provided upper bound ub"
         assert np.all(np.abs(self.x0-self.lb)>self.tol), f"The difference between x0 and lb must be larger than {str(self.tol)}"
@@ -810,7 +890,30 @@ class Estimator():
         filename = str('{}{}'.format(datestr, '.pickle'))
         self.ls_res_savedir, isfile = self.model.get_dir(folder_list=["model_parameters", "estimation_results", "least_squares_result"], filename=filename)
 
-        ls_result = least_squares(self._res_fun_least_squares_exception_wrapper, x0, bounds=(lb, ub), verbose=2) #Change verbose to 2 to see the optimization progress
+        if "verbose" not in kwargs:
+            kwargs["verbose"] = 2 #Change verbose to 2 to see the optimization progress
+        if use_gradient_tape:
+            self.gradient_tape = GradientTape(self.model, self.flat_component_list, self.flat_attr_list, self.targetMeasuringDevices)
+            self.last_jac = None
+            try:
+                ls_result = least_squares(self._res_fun_least_squares_exception_wrapper, x0, jac=self._jac_least_squares_tape, bounds=(lb, ub), **kwargs)
+            finally:
+                self.gradient_tape = None
+        elif n_cores>1:
+            self.jac_groups, self.jac_device_masks = self._get_jacobian_groups(use_sparsity=use_sparsity)
+            self.last_res = None
+            # The estimator is transferred to each worker once (see _initialize_worker)
+            self._share_data()
+            self.jac_pool = multiprocessing.Pool(n_cores, initializer=_initialize_worker, initargs=(self,))
+            try:
+                ls_result = least_squares(self._res_fun_least_squares_cached, x0, jac=self._jac_least_squares, bounds=(lb, ub), **kwargs)
+            finally:
+                self.jac_pool.close()
+                self.jac_pool.join()
+                del self.jac_pool
+                self._release_shared_data()
+        else:
+            ls_result = least_squares(self._res_fun_least_squares_exception_wrapper, x0, bounds=(lb, ub), **kwargs)
 
         with open(self.ls_res_savedir, 'wb') as handle:
             pickle.dump(ls_result, handle, protocol=pickle.HIGHEST_PROTOCOL)
@@ -825,9 +928,13 @@ class Estimator():
             return: A one-dimensional array of residuals.
 
         '''
+        theta_ = theta.copy()
+        theta = theta[self.theta_mask]
         self.model.set_parameters_from_array(theta, self.flat_component_list, self.flat_attr_list)
         n_time_prev = 0
         self.simulation_readings = {com.id: np.zeros((self.n_timesteps)) for com in self.targetMeasuringDevices}
+        if self.gradient_tape is not None:
+            simulation_jac = np.zeros((self.n_timesteps, len(self.targetMeasuringDevices), len(self.flat_component_list)))
         for startTime_, endTime_, stepSize_  in zip(self.startTime_train, self.endTime_train, self.stepSize_train):
             self.simulator.simulate(self.model,
                                     stepSize=stepSize_,
@@ -836,11 +943,16 @@ class Estimator():
                                     trackGradients=self.trackGradients,
                                     targetParameters=self.targetParameters,
                                     targetMeasuringDevices=self.targetMeasuringDevices,
-                                    show_progress_bar=False)
+                                    show_progress_bar=False,
+                                    record=self.record,
+                                    prune=self.record is not None,
+                                    gradient_tape=self.gradient_tape)
             n_time = len(self.simulator.dateTimeSteps)-self.n_initialization_steps
             for measuring_device in self.targetMeasuringDevices:
-                y_model = np.array(next(iter(measuring_device.savedInput.values())))[self.n_initialization_steps:]#/self.targetMeasuringDevices[measuring_device]["scale_factor"]
+                y_model = np.asarray(next(iter(measuring_device.savedInput.values())))[self.n_initialization_steps:]#/self.targetMeasuringDevices[measuring_device]["scale_factor"]
                 self.simulation_readings[measuring_device.id][n_time_prev:n_time_prev+n_time] = y_model
+            if self.gradient_tape is not None:
+                simulation_jac[n_time_prev:n_time_prev+n_time] = self.gradient_tape.get_jacobian()[self.n_initialization_steps:]
             n_time_prev += n_time
 
         res = np.zeros((self.n_timesteps, len(self.targetMeasuringDevices)))
@@ -868,6 +980,14 @@ class Estimator():
         
         # # Flatten the residual matrix for the least_squares optimization method
         res = res.flatten()
+
+        if self.gradient_tape is not None:
+            # Parameters shared by several components are summed into the same column (see self.theta_mask)
+            scale_factor = np.array([self.targetMeasuringDevices[measuring_device]["scale_factor"] for measuring_device in self.targetMeasuringDevices])
+            simulation_jac = -simulation_jac/scale_factor[np.newaxis,:,np.newaxis]
+            jac = np.zeros((self.n_timesteps, len(self.targetMeasuringDevices), theta_.size))
+            np.add.at(jac, (slice(None), slice(None), self.theta_mask), simulation_jac)
+            self.last_jac = (theta_, jac.reshape((res.size, theta_.size)))
         # self.n_obj_eval+=1
 
         return res
@@ -876,5 +996,89 @@ class Estimator():
         try:
             res = self._res_fun_least_squares(theta)
         except FMICallException as inst:
-            res = 10e+10*np.ones((len(self.targetMeasuringDevices)))
-        return res
\ No newline at end of file
+            res = 10e+10*np.ones((self.n_timesteps*len(self.targetMeasuringDevices)))
+        return res
+
+    def _res_fun_least_squares_cached(self, theta):
+        """
+        Residual function used together with self._jac_least_squares. 
+        The last residual is kept, as least_squares always evaluates the Jacobian at a point where the residual has just been evaluated.
+        """
+        res = self._res_fun_least_squares_exception_wrapper(theta)
+        self.last_res = (theta.copy(), res)
+        return res
+
+    def _jac_least_squares_tape(self, theta):
+        """
+        Jacobian of self._res_fun_least_squares, computed by a reverse sweep over the local gradients recorded by self.gradient_tape (see GradientTape). 
+        As least_squares always evaluates the Jacobian at a point where the residual has just been evaluated, no additional simulation is needed in most cases.
+        If the simulation fails, a zero Jacobian is returned.
+        """
+        if self.last_jac is None or np.array_equal(self.last_jac[0], theta)==False:
+            self.last_jac = None
+            self._res_fun_least_squares_exception_wrapper(theta)
+        if self.last_jac is None:
+            return np.zeros((self.n_timesteps*len(self.targetMeasuringDevices), theta.size))
+        return self.last_jac[1]
+
+    def _get_jacobian_groups(self, use_sparsity=True):
+        """
+        A parameter can only affect the residuals of the target measuring devices that are downstream of the components it is set on.
+        This method returns a boolean array "device_masks" with shape (n_parameters, n_target_measuring_devices) holding this dependency pattern, 
+        together with a list of parameter groups. The parameters within a group affect disjoint sets of target measuring devices, 
+        such that their Jacobian columns can be approximated by perturbing them in the same simulation.
+        If "use_sparsity" is False, all parameters are assumed to affect all target measuring devices, i.e. each group holds a single parameter.
+        """
+        n_par = len(self.x0)
+        devices = list(self.targetMeasuringDevices)
+        if use_sparsity:
+            device_masks = np.zeros((n_par, len(devices)), dtype=bool)
+            for component, k in zip(self.flat_component_list, self.theta_mask):
+                downstream_components = set(self.model._depth_first_search_system(component))
+                device_masks[k] |= np.array([device in downstream_components for device in devices], dtype=bool)
+        else:
+            device_masks = np.ones((n_par, len(devices)), dtype=bool)
+
+        groups = []
+        group_masks = []
+        for k in range(n_par):
+            for group, group_mask in zip(groups, group_masks):
+                if np.any(group_mask & device_masks[k])==False:
+                    group.append(k)
+                    group_mask |= device_masks[k]
+                    break
+            else:
+                groups.append([k])
+                group_masks.append(device_masks[k].copy())
+        return groups, device_masks
+
+    def _jac_least_squares(self, theta):
+        """
+        Forward difference approximation of the Jacobian of self._res_fun_least_squares. 
+        The perturbed simulations, one for each group of parameters (see self._get_jacobian_groups), are evaluated in parallel by self.jac_pool.
+        The step sizes follow the default "2-point" scheme of scipy.optimize.least_squares, with the step direction reversed where the upper bound would be violated.
+        """
+        h = np.finfo(np.float64).eps**0.5*np.where(theta>=0, 1, -1)*np.maximum(1, np.abs(theta))
+        h = np.where(theta+h>self.ub, -h, h)
+        h = (theta+h)-theta
+        theta_list = []
+        for group in self.jac_groups:
+            theta_perturbed = theta.copy()
+            theta_perturbed[group] += h[group]
+            theta_list.append(theta_perturbed)
+
+        if self.last_res is not None and np.array_equal(self.last_res[0], theta):
+            f0 = self.last_res[1]
+            res_list = self.jac_pool.map(functools.partial(_call_worker_estimator, "_res_fun_least_squares_exception_wrapper"), theta_list)
+        else:
+            res_list = self.jac_pool.map(functools.partial(_call_worker_estimator, "_res_fun_least_squares_exception_wrapper"), [theta]+theta_list)
+            f0 = res_list.pop(0)
+
+        n_devices = len(self.targetMeasuringDevices)
+        jac = np.zeros((f0.size, theta.size))
+        for group, res in zip(self.jac_groups, res_list):
+            for k in group:
+                # The residuals are ordered with time along the first axis and target measuring devices along the second axis (see self._res_fun_least_squares)
+                rows = np.tile(self.jac_device_masks[k], int(f0.size/n_devices))
+                jac[rows,k] = (res[rows]-f0[rows])/h[k]
+        return jac
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+from twin4build.estimator.chain_store import ChainStore
+
+class TestChainStore(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_chain_store(self):
+        n_temperature, n_walkers, ndim = 3, 4, 2
+        x = np.random.uniform(size=(120, n_temperature, n_walkers, ndim))
+        betas = np.random.uniform(size=(120, n_temperature))
+        with tempfile.TemporaryDirectory() as directory:
+            chain_store = ChainStore(directory)
+            chain_store.write_metadata({"component_attr": ["a", "b"]})
+            for i in range(0, 120, 50):
+                chain_store.append({"chain.x": x[i:i+50], "chain.betas": betas[i:i+50]})
+
+            # Uncommitted chunks, e.g. from a crash during a checkpoint, are ignored
+            np.save(os.path.join(directory, "chain.x.000003.npy"), x[:10])
+
+            chain_store = ChainStore(directory)
+            self.assertEqual(chain_store.get_n_iterations(), 120)
+            self.assertTrue("chain.x" in chain_store)
+            self.assertEqual(chain_store["component_attr"], ["a", "b"])
+            self.assertTrue(np.array_equal(chain_store["chain.x"], x))
+            self.assertTrue(np.allclose(chain_store["chain.T"], 1/betas))
+
+            chain_store.consolidate()
+            chain_store = ChainStore(directory)
+            self.assertTrue(isinstance(chain_store["chain.x"], np.memmap))
+            self.assertTrue(np.array_equal(chain_store["chain.x"], x))
+
+            # Deleting a key releases the loaded array without modifying the store on disk
+            del chain_store["chain.x"]
+            del chain_store["component_attr"]
+            self.assertFalse("chain.x" in chain_store)
+            self.assertFalse("component_attr" in chain_store)
+            self.assertRaises(KeyError, chain_store.__getitem__, "chain.x")
+            self.assertEqual(ChainStore(directory).get_n_iterations(), 120)
+            del chain_store
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import numpy as np
+
+class AdjacencyIndex:
+    """
+    Typed adjacency index of the components of a Model.
+    Each component is assigned a fixed integer id when it is added to the model.
+    For each relation, the index holds the ids of the neighbors of each component together with the Connection objects linking them,
+    in the same order as the corresponding attribute list of the component. The relations are:
+        "connectedThrough": The components receiving an output of the component.
+        "connectsAt": The components sending an input to the component.
+    The index is maintained by Model.add_connection, Model.remove_connection, Model.remove_component and Model._add_component,
+    such that graph traversals do not have to go through the attributes of the components.
+    """
+    relation_names = ("connectedThrough", "connectsAt")
+
+    def __init__(self):
+        self.components = []
+        self.component_ids = {}
+        self.neighbor_ids = {relation_name: [] for relation_name in self.relation_names}
+        self.connections = {relation_name: [] for relation_name in self.relation_names}
+
+    def __len__(self):
+        return len(self.components)
+
+    def add_component(self, component):
+        if component not in self.component_ids:
+            self.component_ids[component] = len(self.components)
+            self.components.append(component)
+            for relation_name in self.relation_names:
+                self.neighbor_ids[relation_name].append([])
+                self.connections[relation_name].append([])
+        return self.component_ids[component]
+
+    def remove_component(self, component):
+        """
+        Removes a component and all connections to and from it from the index. The id of the component is not reused.
+        """
+        component_id = self.component_ids.pop(component)
+        self.components[component_id] = None
+        for relation_name, reverse_relation_name in (("connectedThrough", "connectsAt"), ("connectsAt", "connectedThrough")):
+            for neighbor_id, connection in zip(self.neighbor_ids[relation_name][component_id], self.connections[relation_name][component_id]):
+                self._remove_edge(reverse_relation_name, neighbor_id, connection)
+            self.neighbor_ids[relation_name][component_id] = []
+            self.connections[relation_name][component_id] = []
+
+    def _remove_edge(self, relation_name, component_id, connection):
+        connections = self.connections[relation_name][component_id]
+        i = next(i for i, connection_ in enumerate(connections) if connection_ is connection)
+        del connections[i]
+        del self.neighbor_ids[relation_name][component_id][i]
+
+    def add_connection(self, connection):
+        sender_id = self.add_component(connection.connectsSystem)
+        receiver_id = self.add_component(connection.connectsSystemAt.connectionPointOf)
+        self.neighbor_ids["connectedThrough"][sender_id].append(receiver_id)
+        self.connections["connectedThrough"][sender_id].append(connection)
+        self.neighbor_ids["connectsAt"][receiver_id].append(sender_id)
+        self.connections["connectsAt"][receiver_id].append(connection)
+
+    def remove_connection(self, connection):
+        sender_id = self.component_ids[connection.connectsSystem]
+        receiver_id = self.component_ids[connection.connectsSystemAt.connectionPointOf]
+        self._remove_edge("connectedThrough", sender_id, connection)
+        self._remove_edge("connectsAt", receiver_id, connection)
+
+    def get_neighbor_ids(self, component, relation_name):
+        """
+        Returns the ids of the neighbors of "component" through "relation_name" as an integer array.
+        """
+        return np.array(self.neighbor_ids[relation_name][self.component_ids[component]], dtype=int)
+
+    def get_neighbors(self, component, relation_name):
+        return [self.components[neighbor_id] for neighbor_id in self.neighbor_ids[relation_name][self.component_ids[component]]]
+
+    def depth_first_search(self, component, relation_name="connectedThrough", removed_connections=None):
+        """
+        Returns all components that can be reached from "component" through "relation_name", including the component itself.
+        Connections in "removed_connections" are not followed.
+        The components are returned in depth-first preorder.
+        """
+        if removed_connections is None:
+            removed_connections = ()
+        neighbor_ids = self.neighbor_ids[relation_name]
+        connections = self.connections[relation_name]
+        root_id = self.component_ids[component]
+        is_visited = bytearray(len(self.components))
+        is_visited[root_id] = 1
+        visited = [root_id]
+        stack = [(root_id, 0)]
+        while len(stack)>0:
+            component_id, i = stack.pop()
+            component_neighbor_ids = neighbor_ids[component_id]
+            component_connections = connections[component_id]
+            while i<len(component_neighbor_ids):
+                neighbor_id = component_neighbor_ids[i]
+                i += 1
+                if is_visited[neighbor_id]==0 and component_connections[i-1] not in removed_connections:
+                    is_visited[neighbor_id] = 1
+                    visited.append(neighbor_id)
+                    stack.append((component_id, i))
+                    stack.append((neighbor_id, 0))
+                    break
+        return [self.components[component_id] for component_id in visited]
+
+    def get_n_connections(self, relation_name, removed_connections=None):
+        """
+        Returns an integer array with the number of connections of each component through "relation_name", excluding the connections in "removed_connections".
+        """
+        if removed_connections is None:
+            removed_connections = ()
+        return np.array([len([connection for connection in connections if connection not in removed_connections]) for connections in self.connections[relation_name]], dtype=int)
+
+    def get_strongly_connected_components(self, components, removed_connections=None):
+        """
+        Returns the strongly connected components (Tarjan's algorithm) of the graph formed by the "connectedThrough" relation, ignoring the connections in "removed_connections".
+        The search is started from "components" in the given order. Each strongly connected component is returned as a list of components.
+        """
+        if removed_connections is None:
+            removed_connections = ()
+        neighbor_ids = self.neighbor_ids["connectedThrough"]
+        connections = self.connections["connectedThrough"]
+        n = len(self.components)
+        index = [-1]*n
+        lowlink = [0]*n
+        is_on_stack = bytearray(n)
+        stack = []
+        strongly_connected_components = []
+        counter = 0
+        for root in components:
+            root_id = self.component_ids[root]
+            if index[root_id]!=-1:
+                continue
+            index[root_id] = lowlink[root_id] = counter
+            counter += 1
+            stack.append(root_id)
+            is_on_stack[root_id] = 1
+            call_stack = [(root_id, 0)]
+            while len(call_stack)>0:
+                component_id, i = call_stack.pop()
+                component_neighbor_ids = neighbor_ids[component_id]
+                is_descended = False
+                while i<len(component_neighbor_ids):
+                    neighbor_id = component_neighbor_ids[i]
+                    i += 1
+                    if connections[component_id][i-1] in removed_connections:
+                        continue
+                    if index[neighbor_id]==-1:
+                        index[neighbor_id] = lowlink[neighbor_id] = counter
+                        counter += 1
+                        stack.append(neighbor_id)
+                        is_on_stack[neighbor_id] = 1
+                        call_stack.append((component_id, i))
+                        call_stack.append((neighbor_id, 0))
+                        is_descended = True
+                        break
+                    elif is_on_stack[neighbor_id]:
+                        lowlink[component_id] = min(lowlink[component_id], index[neighbor_id])
+                if is_descended:
+                    continue
+                if len(call_stack)>0:
+                    parent_id = call_stack[-1][0]
+                    lowlink[parent_id] = min(lowlink[parent_id], lowlink[component_id])
+                if lowlink[component_id]==index[component_id]:
+                    strongly_connected_component = []
+                    while True:
+                        member_id = stack.pop()
+                        is_on_stack[member_id] = 0
+                        strongly_connected_component.append(self.components[member_id])
+                        if member_id==component_id:
+                            break
+                    strongly_connected_components.append(strongly_connected_component)
+        return strongly_connected_components
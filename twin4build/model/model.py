@@ -13,18 +13,18 @@ import numpy as np
 import pandas as pd
 import numbers
 import datetime
-import torch
 import json
 import builtins
 import pickle
-import matplotlib.font_manager
-from PIL import ImageFont
+import hashlib
+import marshal
+import glob
+from concurrent.futures import ThreadPoolExecutor, Future
 from itertools import count
 from prettytable import PrettyTable
 from prettytable.colortable import ColorTable, Themes
 from twin4build.utils.print_progress import PrintProgress
 
-from openpyxl import load_workbook
 from dateutil.parser import parse
 from twin4build.utils.fmu.fmu_component import FMUComponent
 from twin4build.utils.isnumeric import isnumeric
@@ -42,11 +42,50 @@ from twin4build.saref4syst.system import System
 import twin4build.utils.signature_pattern.signature_pattern as signature_pattern
 from twin4build.utils.uppath import uppath
 from twin4build.logger.Logging import Logging
+from twin4build.estimator.chain_store import ChainStore
+from twin4build.model.adjacency_index import AdjacencyIndex
 import twin4build.base as base
 import twin4build.components as components
 
 logger = Logging.get_logger("ai_logfile")
 
+_graph_render_executor = None
+_graph_render_jobs = {} # Maps image filenames to the latest background render (Future) or deferred render (tuple) of the image, see Model.draw_graph
+
+def _get_graph_render_executor():
+    global _graph_render_executor
+    if _graph_render_executor is None:
+        # A single worker is used to bound the memory used by graphviz, which can be large for high resolution images
+        _graph_render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="graph_render")
+    return _graph_render_executor
+
+def _log_graph_render_exception(future):
+    """
+    Done-callback of the background renders, which would otherwise only raise their exceptions when Model.render_graphs is called.
+    """
+    if future.cancelled()==False and future.exception() is not None:
+        message = f"[Model Class] : Rendering of graph in the background failed: {future.exception()!r}"
+        logger.error(message)
+        warnings.warn(message)
+
+_package_source_hash = None
+
+def _get_package_source_hash():
+    """
+    Returns a hash of the source code of the twin4build package (excluding tests), which is part of the key of model snapshots (see Model.load_model).
+    """
+    global _package_source_hash
+    if _package_source_hash is None:
+        package_path = uppath(os.path.abspath(__file__), 2)
+        h = hashlib.sha256()
+        for filename in sorted(glob.glob(os.path.join(package_path, "**", "*.py"), recursive=True)):
+            if f"{os.sep}tests{os.sep}" not in filename:
+                h.update(os.path.relpath(filename, package_path).encode())
+                with open(filename, "rb") as f:
+                    h.update(f.read())
+        _package_source_hash = h.hexdigest()
+    return _package_source_hash
+
 def str2Class(str):
     return getattr(sys.modules[__name__], str)
 
@@ -75,9 +114,11 @@ class Model:
             
         return t.get_string()
 
+    graph_rendering_options = ("background", "sync", "none")
     def __init__(self,
                  id=None,
-                saveSimulationResult=False):
+                saveSimulationResult=False,
+                graph_rendering="background"):
         self.valid_chars = ["_", "-", " ", "(", ")", "[", "]"]
         assert isinstance(id, str), f"Argument \"id\" must be of type {str(type(str))}"
         isvalid = np.array([x.isalnum() or x in self.valid_chars for x in id])
@@ -86,6 +127,8 @@ class Model:
         assert all(isvalid), f"The model with id \"{id}\" has an invalid id. The characters \"{', '.join(violated_characters)}\" are not allowed."
         self.id = id
         self.saveSimulationResult = saveSimulationResult
+        assert graph_rendering in self.graph_rendering_options, f"Argument \"graph_rendering\" must be one of the following: {', '.join(self.graph_rendering_options)}"
+        self.graph_rendering = graph_rendering
         self._initialize_graph("system")
         self._initialize_graph("object")
 
@@ -99,9 +142,11 @@ class Model:
         self.object_dict = {}
         self.object_dict_reversed = {}
         self.object_counter_dict = {}
+        self.adjacency_index = AdjacencyIndex() # Integer-based index of the connections between the components in component_dict
         self.property_dict = {}
         self.custom_initial_dict = None
         self.initial_dict = None
+        self.recording_policy = None
         self.heatexchanger_types = (base.AirToAirHeatRecovery, base.Coil)
         self.water_types = (base.Pump, base.Valve, base.SpaceHeater)
         self.air_types = (base.Fan, base.Damper)
@@ -141,6 +186,7 @@ class Model:
         assert isinstance(component, System), f"The argument \"component\" must be of type {System.__name__}"
         if component.id not in self.component_dict:
             self.component_dict[component.id] = component
+        self.adjacency_index.add_component(component)
 
         self._add_object(component)
 
@@ -166,6 +212,9 @@ class Model:
             if "fmu" in get_object_attributes(fmu_component):
                 del fmu_component.fmu
                 del fmu_component.fmu_initial_state
+                for attr in ["fmu_input_valueReferences", "fmu_output_valueReferences", "fmu_input_values", "fmu_output_values", "fmu_input_array", "fmu_output_array"]:
+                    if attr in get_object_attributes(fmu_component):
+                        delattr(fmu_component, attr)
                 fmu_component.INITIALIZED = False
 
     def _add_object(self, obj):
@@ -179,7 +228,7 @@ class Model:
             self.object_dict_reversed[obj] = name
 
     def remove_component(self, component):
-        for connection in component.connectedThrough:
+        for connection in list(component.connectedThrough):
             connection_point = connection.connectsSystemAt
             connected_component = connection_point.connectionPointOf
             self.remove_connection(component, connected_component, connection.senderPropertyName, connection_point.receiverPropertyName)
@@ -188,6 +237,7 @@ class Model:
         for connection_point in component.connectsAt:
             connection_point.connectPointOf = None
         del self.component_dict[component.id]
+        self.adjacency_index.remove_component(component)
 
     def get_edge_label(self, sender_property_name, receiver_property_name):
         end_space = "          "
@@ -219,6 +269,7 @@ class Model:
         receiver_component_connection_point = ConnectionPoint(connectionPointOf=receiver_component, connectsSystemThrough=sender_obj_connection, receiverPropertyName=receiver_property_name)
         sender_obj_connection.connectsSystemAt = receiver_component_connection_point
         receiver_component.connectsAt.append(receiver_component_connection_point)
+        self.adjacency_index.add_connection(sender_obj_connection)
 
         exception_classes = (components.TimeSeriesInputSystem, components.FlowJunctionSystem, components.PiecewiseLinearSystem, components.PiecewiseLinearSupplyWaterTemperatureSystem, components.PiecewiseLinearScheduleSystem, base.Sensor, base.Meter, components.MaxSystem) # These classes are exceptions because their inputs and outputs can take any form 
         if isinstance(sender_component, exception_classes):
@@ -337,6 +388,7 @@ class Model:
         if receiver_component_connection_point is None:
             raise ValueError(f"The receiver component \"{receiver_component.id}\" does not have a connection point with the property \"{receiver_property_name}\"")
         receiver_component.connectsAt.remove(receiver_component_connection_point)
+        self.adjacency_index.remove_connection(sender_obj_connection)
 
         del sender_obj_connection
         del receiver_component_connection_point
@@ -1047,6 +1099,7 @@ class Model:
         '''
 
         logger.info("[Model Class] : Entered in read_config Function")
+        from openpyxl import load_workbook
         wb = load_workbook(semantic_model_filename, read_only=True)
         df_Systems = pd.read_excel(semantic_model_filename, sheet_name="System") if 'System' in wb.sheetnames else pd.DataFrame([np.nan], columns=["id"])
         df_Space = pd.read_excel(semantic_model_filename, sheet_name="BuildingSpace") if 'BuildingSpace' in wb.sheetnames else pd.DataFrame([np.nan], columns=["id"])
@@ -2151,10 +2204,18 @@ class Model:
 
     def connect_new(self):
         def copy_nodemap(nodemap):
-            return {k: v.copy() for k, v in nodemap.items()}
+            # The sets of matched nodes are never modified in place, only replaced. A shallow copy is therefore sufficient.
+            return nodemap.copy()
+
+        object_attributes = {} # Memoized attributes of the semantic model objects, which are not modified while matching
+        def get_match_node_attributes(match_node):
+            key = id(match_node)
+            if key not in object_attributes:
+                object_attributes[key] = set(get_object_attributes(match_node))
+            return object_attributes[key]
         
         def _prune_recursive(match_node, sp_node, node_map, node_map_list, feasible, comparison_table, ruleset):
-            match_node_id = match_node.id if "id" in get_object_attributes(match_node) else match_node.__class__.__name__ + " [" + str(id(match_node)) +"]"
+            # match_node_id = match_node.id if "id" in get_match_node_attributes(match_node) else match_node.__class__.__name__ + " [" + str(id(match_node)) +"]"
             # print(f"sp_node: {sp_node.id} match_node: {match_node_id}")
             if sp_node not in feasible: feasible[sp_node] = set()
             if sp_node not in comparison_table: comparison_table[sp_node] = set()
@@ -2162,7 +2223,7 @@ class Model:
             comparison_table[sp_node].add(match_node)
             
 
-            match_name_attributes = get_object_attributes(match_node)
+            match_name_attributes = get_match_node_attributes(match_node)
 
 
             sp_node_pairs = sp_node.attributes
@@ -2286,8 +2347,7 @@ class Model:
                             else:
                                 node_map_list = new_node_map_list
                                 for node_map_ in node_map_list:
-                                    node_map_[sp_node] = set() if sp_node not in node_map_ else node_map_[sp_node]
-                                    node_map_[sp_node].add(match_node) #Multiple nodes might be added if multiple branches match
+                                    node_map_[sp_node] = node_map_.get(sp_node, set()) | {match_node} #Multiple nodes might be added if multiple branches match
                     else:
                         if isinstance(sp_node_child, list):
                             for sp_node_child_ in sp_node_child:
@@ -2328,7 +2388,36 @@ class Model:
             return node_map_list, node_map, feasible, comparison_table, False
 
 
+        link_summaries = {}
+        def get_link_summary(node_map):
+            """
+            Returns the ids of the matched nodes in "node_map" and the ids of their children along the predicates of the signature nodes.
+            The summaries are cached by id, and a reference to "node_map" is kept such that the id is not reused.
+            """
+            key = id(node_map)
+            if key not in link_summaries:
+                node_ids = set()
+                child_ids = set()
+                for sp_node_, match_node_set in node_map.items():
+                    for match_node_ in match_node_set:
+                        node_ids.add(id(match_node_))
+                        for attr in sp_node_.attributes:
+                            child = getattr(match_node_, attr, None)
+                            if isinstance(child, list):
+                                child_ids.update(id(c) for c in child)
+                            elif child is not None:
+                                child_ids.add(id(child))
+                link_summaries[key] = (node_map, node_ids, child_ids)
+            return link_summaries[key]
+
         def match(group, node_map_, sp, cg, new_ig):
+            # A match requires that a node in one of the maps is linked to a node in the other map (see the checks below). 
+            # Maps without any links are rejected without further checks.
+            _, group_ids, group_child_ids = get_link_summary(group)
+            _, node_map_ids, node_map_child_ids = get_link_summary(node_map_)
+            if node_map_child_ids.isdisjoint(group_ids) and group_child_ids.isdisjoint(node_map_ids):
+                return False, group, cg, new_ig
+
             can_match = all([group[sp_node_]==node_map_[sp_node_] if len(group[sp_node_])!=0 and len(node_map_[sp_node_])!=0 else True for sp_node_ in sp.nodes])
             is_match = False
             if can_match:
@@ -2481,12 +2570,26 @@ class Model:
                             if all([len(group[sp_node_])!=0 for sp_node_ in sp.nodes]):
                                 cg.append(group)
                                 new_ig.remove(group)
+            if is_match:
+                link_summaries.pop(id(group), None) # The group has been modified
             return is_match, group, cg, new_ig
 
         classes = [cls[1] for cls in inspect.getmembers(components, inspect.isclass) if (issubclass(cls[1], (System, )) and hasattr(cls[1], "sp"))]
         complete_groups = {}
         incomplete_groups = {}
         counter = 0
+
+        # Index the semantic model objects by class. The candidates for each signature node are then found by only checking each class once.
+        objects_by_class = {}
+        for i, c in enumerate(self.object_dict.values()):
+            if isinstance(c, signature_pattern.NodeBase)==False:
+                objects_by_class.setdefault(c.__class__, []).append((i, c))
+        match_nodes_by_class = {}
+        def get_match_nodes(cls):
+            if cls not in match_nodes_by_class:
+                match_nodes = [ic for c, l in objects_by_class.items() if issubclass(c, cls) for ic in l]
+                match_nodes_by_class[cls] = [c for i, c in sorted(match_nodes, key=lambda ic: ic[0])] # Same order as self.object_dict
+            return match_nodes_by_class[cls]
         for component_cls in classes:
             # print(component_cls.__name__)
             complete_groups[component_cls] = {}
@@ -2504,7 +2607,7 @@ class Model:
                     l = list(sp_node.cls)
                     l.remove(signature_pattern.NodeBase)
                     l = tuple(l)
-                    match_nodes = [c for c in self.object_dict.values() if (isinstance(c, l)) and isinstance(c, signature_pattern.NodeBase)==False] ######################################
+                    match_nodes = get_match_nodes(l)
                         
                     for match_node in match_nodes:
                         # print("MATCH NODE: ", match_node.id if "id" in get_object_attributes(match_node) else match_node.__class__.__name__ + " [" + str(id(match_node)) +"]") if component_cls is components.CoilPumpValveFMUSystem else None
@@ -2568,16 +2671,21 @@ class Model:
                 
                 
                 ig_len = np.inf
+                no_match_pairs = set() # Pairs of unmodified groups that did not match in a previous iteration. Groups are only modified if they match.
                 while len(ig)<ig_len:
                     ig_len = len(ig)
                     new_ig = ig.copy()
                     is_match = False
                     for group_i in ig:
                         for group_j in ig:
-                            if group_i!=group_j:
+                            if group_i!=group_j and (id(group_i), id(group_j)) not in no_match_pairs:
                                 is_match, group, cg, new_ig = match(group_i, group_j, sp, cg, new_ig)
                                 # if is_match:
                                     # new_ig.remove(group_j) #Not removed in match - therefore we remove it here
+                                if is_match:
+                                    no_match_pairs = {pair for pair in no_match_pairs if id(group_i) not in pair}
+                                else:
+                                    no_match_pairs.add((id(group_i), id(group_j)))
                             if is_match:
                                 break
                         if is_match:
@@ -2615,6 +2723,8 @@ class Model:
                         cg.append(group)
                         new_ig.remove(group)
                 ig = new_ig
+                no_match_pairs.clear()
+        link_summaries.clear() # The summaries keep references to the node maps of all matched groups
 
 
         for component_cls, sps in complete_groups.items():
@@ -3098,24 +3208,65 @@ class Model:
                                 endTime=endTime,
                                 stepSize=stepSize)
 
+    def share_data(self):
+        """
+        Moves the time series data cached by "cache" to shared memory (see SharedArray).
+        This is called before the model is transferred to worker processes, which then attach to the shared data instead of receiving a copy each.
+        "release_shared_data" must be called when the worker processes are done.
+        """
+        c = self.get_component_by_class(self.component_dict, (components.SensorSystem, components.MeterSystem, components.OutdoorEnvironmentSystem, components.TimeSeriesInputSystem))
+        for component in c:
+            component.share_data()
+
+    def release_shared_data(self):
+        c = self.get_component_by_class(self.component_dict, (components.SensorSystem, components.MeterSystem, components.OutdoorEnvironmentSystem, components.TimeSeriesInputSystem))
+        for component in c:
+            component.release_shared_data()
+
     def initialize(self,
                     startTime=None,
                     endTime=None,
-                    stepSize=None):
+                    stepSize=None,
+                    n_timesteps=None,
+                    components=None):
         """
         This method is always called before simulation. 
         It sets initial values for the different components and further calls the customizable "initialize" method for each component. 
+        If "n_timesteps" is provided, the simulation results are saved in preallocated arrays (see SimulationResult.clear_results).
+        If "components" is provided, only these components are initialized, e.g. when simulating a pruned model. The results of all components are cleared.
         """
         logger.info("Initializing model for simulation...")
         self.set_initial_values()
         self.check_for_for_missing_initial_values()
+        if components is None:
+            components = self.flat_execution_order
         for component in self.flat_execution_order:
-            component.clear_results()
+            component.clear_results(n_timesteps=n_timesteps)
+        for component in components:
             component.initialize(startTime=startTime,
                                 endTime=endTime,
                                 stepSize=stepSize,
                                 model=self)
             
+    def get_state(self, components=None):
+        """
+        Returns a dictionary mapping the ids of "components" (all components in the execution order if not provided) to their simulation states (see System.get_state).
+        """
+        if components is None:
+            components = self.flat_execution_order
+        return {component.id: component.get_state() for component in components}
+
+    def set_state(self, states, components=None):
+        """
+        Restores the simulation states returned by self.get_state for "components" (all components in the execution order if not provided). 
+        Must be called after self.initialize.
+        """
+        if components is None:
+            components = self.flat_execution_order
+        for component in components:
+            assert component.id in states, f"The state of the component \"{component.id}\" is missing"
+            component.set_state(states[component.id])
+
     def validate_model(self):
         self.validate_ids()
         self.validate_connections()
@@ -3142,12 +3293,19 @@ class Model:
         
 
     
-    def load_model(self, semantic_model_filename=None, input_config=None, infer_connections=True, fcn=None, do_load_parameters=True):
+    def load_model(self, semantic_model_filename=None, input_config=None, infer_connections=True, fcn=None, do_load_parameters=True, use_snapshot=False):
         """
         This method loads component models and creates connections between the models. 
         In addition, it creates and draws graphs of the simulation model and the semantic model. 
+        The graphs are rendered according to self.graph_rendering (see self.draw_graph).
+
+        If "use_snapshot" is True, the loaded model is stored as a snapshot, and subsequent loads with identical inputs restore the snapshot instead (see self._get_snapshot_key).
         """
         print("Loading model...")
+        if use_snapshot:
+            snapshot_kwargs = dict(semantic_model_filename=semantic_model_filename, input_config=input_config, fcn=fcn, method="load_model", infer_connections=infer_connections, do_load_parameters=do_load_parameters)
+            if self._load_snapshot(self._get_snapshot_key(**snapshot_kwargs), fcn=fcn):
+                return
         if semantic_model_filename is not None:
             self.read_datamodel_config(semantic_model_filename)
             self._create_object_graph(self.component_base_dict)
@@ -3178,6 +3336,9 @@ class Model:
 
         self.validate_model()
 
+        if use_snapshot:
+            self._save_snapshot(self._get_snapshot_key(**snapshot_kwargs))
+
 
 
     def _load_parameters(self):
@@ -3214,19 +3375,27 @@ class Model:
                         elif isinstance(component, components.OutdoorEnvironmentSystem)==False:
                             raise(ValueError(f"\"valuecolumn\" is not defined in the \"readings\" key of the config file: {filename}"))
                     
-    def load_model_new(self, semantic_model_filename=None, input_config=None, infer_connections=True, fcn=None, create_signature_graphs=False, verbose=False, validate_model=True):
+    def load_model_new(self, semantic_model_filename=None, input_config=None, infer_connections=True, fcn=None, create_signature_graphs=False, verbose=False, validate_model=True, use_snapshot=False):
         if verbose:
-            self._load_model_new(semantic_model_filename=semantic_model_filename, input_config=input_config, infer_connections=infer_connections, fcn=fcn, create_signature_graphs=create_signature_graphs, validate_model=validate_model)
+            self._load_model_new(semantic_model_filename=semantic_model_filename, input_config=input_config, infer_connections=infer_connections, fcn=fcn, create_signature_graphs=create_signature_graphs, validate_model=validate_model, use_snapshot=use_snapshot)
         else:
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
-                self._load_model_new(semantic_model_filename=semantic_model_filename, input_config=input_config, infer_connections=infer_connections, fcn=fcn, create_signature_graphs=create_signature_graphs, validate_model=validate_model)
+                self._load_model_new(semantic_model_filename=semantic_model_filename, input_config=input_config, infer_connections=infer_connections, fcn=fcn, create_signature_graphs=create_signature_graphs, validate_model=validate_model, use_snapshot=use_snapshot)
 
-    def _load_model_new(self, semantic_model_filename=None, input_config=None, infer_connections=True, fcn=None, create_signature_graphs=False, validate_model=True):
+    def _load_model_new(self, semantic_model_filename=None, input_config=None, infer_connections=True, fcn=None, create_signature_graphs=False, validate_model=True, use_snapshot=False):
         """
         This method loads component models and creates connections between the models. 
         In addition, it creates and draws graphs of the simulation model and the semantic model. 
+        The graphs are rendered according to self.graph_rendering (see self.draw_graph).
+
+        If "use_snapshot" is True, the loaded model is stored as a snapshot, and subsequent loads with identical inputs restore the snapshot instead (see self._get_snapshot_key).
         """
+        if use_snapshot:
+            snapshot_kwargs = dict(semantic_model_filename=semantic_model_filename, input_config=input_config, fcn=fcn, method="load_model_new", infer_connections=infer_connections, create_signature_graphs=create_signature_graphs, validate_model=validate_model)
+            if self._load_snapshot(self._get_snapshot_key(**snapshot_kwargs), fcn=fcn):
+                print(self)
+                return
 
 
         p = PrintProgress()
@@ -3289,10 +3458,78 @@ class Model:
 
         p("Loading parameters")
         self._load_parameters()
+
+        if use_snapshot:
+            p("Saving snapshot")
+            self._save_snapshot(self._get_snapshot_key(**snapshot_kwargs))
         p()
 
         print(self)
 
+    def _get_snapshot_key(self, semantic_model_filename=None, input_config=None, fcn=None, **kwargs):
+        """
+        Returns the key of the snapshot of the loaded model. The key is a hash of:
+            - The content of the semantic model file and the input config.
+            - The source code of "fcn" (or self.fcn if "fcn" is None). Note that global variables used by "fcn" are not included.
+            - The source code of the twin4build package, which includes the model extensions and signature patterns.
+            - The content of the parameter files of the model (see self._load_parameters).
+            - The model id and the remaining keyword arguments of the load method.
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps({"id": self.id, "saveSimulationResult": self.saveSimulationResult, **kwargs}, sort_keys=True, default=str).encode())
+        h.update(_get_package_source_hash().encode())
+        if semantic_model_filename is not None:
+            with open(semantic_model_filename, "rb") as f:
+                h.update(f.read())
+        h.update(json.dumps(input_config, sort_keys=True, default=str).encode())
+        
+        if fcn is None:
+            fcn = self.fcn
+        fcn = getattr(fcn, "__func__", fcn)
+        try:
+            h.update(inspect.getsource(fcn).encode())
+        except (OSError, TypeError): # The source code is not available, e.g. for functions defined in an interactive session
+            h.update(marshal.dumps(fcn.__code__))
+
+        parameter_path, isfile = self.get_dir(folder_list=["model_parameters"])
+        for filename in sorted(glob.glob(os.path.join(parameter_path, "**", "*.json"), recursive=True)):
+            h.update(os.path.relpath(filename, parameter_path).encode())
+            with open(filename, "rb") as f:
+                h.update(f.read())
+        return h.hexdigest()
+
+    def _load_snapshot(self, key, fcn=None):
+        """
+        Restores the model from the snapshot with the given key. Returns False if the snapshot does not exist or cannot be loaded.
+        """
+        filename, isfile = self.get_dir(folder_list=["snapshots"], filename=f"{key}.pickle")
+        if isfile==False:
+            return False
+        try:
+            with open(filename, "rb") as f:
+                state = pickle.load(f)
+        except Exception as err:
+            logger.warning(f"[Model Class] : Failed to load the model snapshot \"{filename}\": {err}")
+            return False
+        self.__dict__.update(state)
+        if fcn is not None:
+            self.fcn = fcn.__get__(self, Model)
+        logger.info(f"[Model Class] : Loaded the model snapshot \"{filename}\"")
+        return True
+
+    def _save_snapshot(self, key):
+        filename, isfile = self.get_dir(folder_list=["snapshots"], filename=f"{key}.pickle")
+        # "fcn" is bound to the model and is set again when the snapshot is loaded. The rendering mode is a setting of the loading process.
+        state = {k: v for k, v in self.__dict__.items() if k not in ("fcn", "graph_rendering")}
+        try:
+            with open(f"{filename}.tmp", "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{filename}.tmp", filename)
+        except Exception as err:
+            logger.warning(f"[Model Class] : Failed to save the model snapshot \"{filename}\": {err}")
+            if os.path.isfile(f"{filename}.tmp"):
+                os.remove(f"{filename}.tmp")
+
     def fcn(self):
         pass
 
@@ -3365,9 +3602,10 @@ class Model:
         exceptions = []
         builtin_types = [getattr(builtins, d) for d in dir(builtins) if isinstance(getattr(builtins, d), type)]
         for exception in exceptions: builtin_types.remove(exception)
-        exception_classes = (Connection, ConnectionPoint, np.ndarray, torch.device, pd.DataFrame) # These classes are excluded from the graph 
+        exception_classes = (Connection, ConnectionPoint, np.ndarray, pd.DataFrame) # These classes are excluded from the graph 
+        if "torch" in sys.modules: # torch is only imported by components that need it
+            exception_classes = exception_classes + (sys.modules["torch"].device,)
         exception_classes_exact = (base.DistributionDevice, *builtin_types, count)
-        visited = []
 
 
         ruleset_applies = True if ruleset is not None else False
@@ -3375,9 +3613,7 @@ class Model:
                       signature_pattern.Optional: "diamond",}
         dummy_dim = 0.3
         
-        for component in object_dict.values():
-            if component not in visited:
-                visited = self._depth_first_search_recursive(component, visited, exception_classes, exception_classes_exact)
+        visited = self._depth_first_search_objects(object_dict.values(), exception_classes, exception_classes_exact)
         
         ignore_nodes = [v.isValueOfProperty for v in visited if isinstance(v, base.PropertyValue) and v.hasValue is None]
         ignore_nodes.extend([v for v in visited if isinstance(v, base.PropertyValue) and v.hasValue is None])
@@ -3624,6 +3860,7 @@ class Model:
         self.draw_graph(filename, graph)
 
     def get_font(self):
+        import matplotlib.font_manager
         font_files = matplotlib.font_manager.findSystemFonts(fontpaths=None)
         preferred_font = "Helvetica-Bold".lower()
         preferred_font = "CMUNBTL".lower()
@@ -3650,12 +3887,62 @@ class Model:
         subprocess.run(args=args)
 
     def draw_graph(self, filename, graph, args=None):
-        fontpath, fontname = self.get_font()
+        """
+        Renders "graph" to the image <filename>.png in the graph folder of the model using graphviz.
+        Depending on self.graph_rendering, the image is rendered:
+            - "background": In a background thread, such that loading the model is not blocked. 
+            - "sync": Before this method returns.
+            - "none": When self.render_graphs is called.
+        Rendering is skipped if the existing image was rendered from an identical graph.
+        """
+        assert self.graph_rendering in self.graph_rendering_options, f"The attribute \"graph_rendering\" must be one of the following: {', '.join(self.graph_rendering_options)}"
+        graph_filename = os.path.join(self.graph_path, f"{filename}.png")
+        dot_string = graph.to_string()
+        graph_hash = hashlib.sha256((dot_string + repr(args)).encode()).hexdigest()
+        job = _graph_render_jobs.get(graph_filename)
+        is_pending = job is not None and (isinstance(job, Future)==False or job.done()==False)
+        if is_pending==False and self._get_graph_hash(graph_filename)==graph_hash:
+            return
         
+        job = (graph_filename, dot_string, args, graph_hash)
+        if self.graph_rendering=="none":
+            _graph_render_jobs[graph_filename] = job
+        elif self.graph_rendering=="background":
+            future = _get_graph_render_executor().submit(self._render_graph, *job)
+            future.add_done_callback(_log_graph_render_exception)
+            _graph_render_jobs[graph_filename] = future
+        else:
+            _graph_render_jobs.pop(graph_filename, None)
+            self._render_graph(*job)
+
+    def render_graphs(self):
+        """
+        Renders the images deferred by self.draw_graph and waits for the images being rendered in the background.
+        """
+        graph_filenames = [graph_filename for graph_filename in _graph_render_jobs.keys() if graph_filename.startswith(self.graph_path)]
+        for graph_filename in graph_filenames:
+            job = _graph_render_jobs.pop(graph_filename)
+            if isinstance(job, Future):
+                job.result()
+            else:
+                self._render_graph(*job)
+
+    def _get_graph_hash(self, graph_filename):
+        hash_filename = f"{graph_filename}.sha256"
+        if os.path.isfile(graph_filename) and os.path.isfile(hash_filename):
+            with open(hash_filename, "r") as f:
+                return f.read()
+        return None
+
+    def _render_graph(self, graph_filename, dot_string, args, graph_hash):
+        fontpath, fontname = self.get_font()
         light_grey = "#71797E"
-        graph_filename = os.path.join(self.graph_path, f"{filename}.png")
-        graph.write(f'{filename}.dot', prog="dot")
         app_path = shutil.which("dot")
+        if app_path is None:
+            message = f"[Model Class] : Rendering of graph \"{graph_filename}\" skipped as the graphviz executable \"dot\" was not found. Install graphviz and add it to PATH to render the graphs."
+            logger.warning(message)
+            warnings.warn(message)
+            return
         if args is None:
             args = [app_path,
                     "-q",
@@ -3685,36 +3972,66 @@ class Model:
                     "-Gremincross=true",
                     "-Gstart=1",
                     "-q",
-                    f"-o{graph_filename}",
-                    f"{filename}.dot"] #_unflatten
+                    f"-o{graph_filename}"] # The graph is read from stdin
         else:
             args_ = [app_path]
             args_.extend(args)
-            args_.extend([f"-o{graph_filename}", f"{filename}.dot"])
+            args_.extend([f"-o{graph_filename}"])
             args = args_
-        subprocess.run(args=args)
-        os.remove(f"{filename}.dot")
-
-    def _depth_first_search_recursive(self, component, visited, exception_classes, exception_classes_exact):
-        visited.append(component)
-        attributes = dir(component)
-        attributes = [attr for attr in attributes if attr[:2]!="__"]#Remove callables
-        for attr in attributes:
-            obj = rgetattr(component, attr)
-            if obj is not None and inspect.ismethod(obj)==False:
-                if isinstance(obj, list):
-                    for receiver_component in obj:
-                        if isinstance(receiver_component, exception_classes)==False and receiver_component not in visited and istype(receiver_component, exception_classes_exact)==False:
-                            visited = self._depth_first_search_recursive(receiver_component, visited, exception_classes, exception_classes_exact)
-                else:
-                    receiver_component = obj
-                    if isinstance(receiver_component, exception_classes)==False and receiver_component not in visited and istype(receiver_component, exception_classes_exact)==False:
-                        visited = self._depth_first_search_recursive(receiver_component, visited, exception_classes, exception_classes_exact)
-        return visited
+        result = subprocess.run(args=args, input=dot_string.encode())
+        hash_filename = f"{graph_filename}.sha256"
+        if result.returncode==0:
+            with open(f"{hash_filename}.tmp", "w") as f:
+                f.write(graph_hash)
+            os.replace(f"{hash_filename}.tmp", hash_filename)
+        else:
+            logger.warning(f"[Model Class] : Rendering of graph \"{graph_filename}\" failed")
+            if os.path.isfile(hash_filename):
+                os.remove(hash_filename)
+
+    def _depth_first_search_objects(self, objects, exception_classes, exception_classes_exact):
+        """
+        Returns all objects that can be reached from "objects" through their attributes, including the objects themselves.
+        Objects that are instances of "exception_classes" or have the exact type of one of "exception_classes_exact" are not visited.
+        The objects are returned in depth-first preorder.
+        """
+        def get_children(obj):
+            for attr in get_object_attributes(obj):
+                child = rgetattr(obj, attr)
+                if child is not None and inspect.ismethod(child)==False:
+                    if isinstance(child, list):
+                        yield from child
+                    else:
+                        yield child
+
+        def is_visited(obj):
+            try:
+                return obj in visited_set
+            except TypeError: # Unhashable objects are compared with all visited objects
+                return obj in visited
+
+        def add_visited(obj):
+            visited.append(obj)
+            try:
+                visited_set.add(obj)
+            except TypeError:
+                pass
 
-    def _depth_first_search(self, obj):
         visited = []
-        visited = self._depth_first_search_recursive(obj, visited)
+        visited_set = set()
+        for root in objects:
+            if is_visited(root):
+                continue
+            add_visited(root)
+            stack = [get_children(root)]
+            while len(stack)>0:
+                for child in stack[-1]:
+                    if isinstance(child, exception_classes)==False and is_visited(child)==False and istype(child, exception_classes_exact)==False:
+                        add_visited(child)
+                        stack.append(get_children(child))
+                        break
+                else:
+                    stack.pop()
         return visited
 
     def _flatten(self, _list):
@@ -3722,21 +4039,33 @@ class Model:
 
 
  
-    def _depth_first_search_system(self, component):
-        def _depth_first_search_recursive_system(component, visited):
-            visited.append(component)
-            for connection in component.connectedThrough:
-                connection_point = connection.connectsSystemAt
-                receiver_component = connection_point.connectionPointOf
-                if receiver_component not in visited:
-                    visited = _depth_first_search_recursive_system(receiver_component, visited)
-            return visited
-        visited = []
-        visited = _depth_first_search_recursive_system(component, visited)
-        return visited
-    
-    
- 
+    def _depth_first_search_system(self, component, removed_connections=None):
+        """
+        Returns all components that can be reached from the given component through outgoing connections, including the component itself.
+        Connections in "removed_connections" are not followed.
+        The components are returned in depth-first preorder.
+        """
+        return self.adjacency_index.depth_first_search(component, "connectedThrough", removed_connections)
+
+    def _depth_first_search_system_reversed(self, component):
+        """
+        Returns all components that the given component depends on through ingoing connections, including the component itself.
+        """
+        return self.adjacency_index.depth_first_search(component, "connectsAt")
+
+    def get_pruned_execution_order(self, components):
+        """
+        Returns self.execution_order restricted to the given components and all components upstream of them, i.e. all components which can affect their inputs or outputs.
+        Connections that were removed to break cycles are included in the search, as they still carry information from previous timesteps.
+        """
+        required_components = set()
+        for component in components:
+            if component not in required_components:
+                required_components.update(self._depth_first_search_system_reversed(component))
+        pruned_execution_order = [[component for component in component_group if component in required_components] for component_group in self.execution_order]
+        pruned_execution_order = [component_group for component_group in pruned_execution_order if len(component_group)>0]
+        return pruned_execution_order
+
     def _depth_first_search_cycle_system(self, component):
         def _depth_first_search_recursive_system(component, visited):
             visited.append(component)
@@ -3759,31 +4088,43 @@ class Model:
             subgraph.get_nodes()
             if len(subgraph.get_nodes())>0:
                 node = subgraph.get_nodes()[0].obj_dict["name"].replace('"',"")
-                self.system_subgraph_dict_no_cycles[self._component_dict_no_cycles[node].__class__] = subgraph
+                self.system_subgraph_dict_no_cycles[self.component_dict[node].__class__] = subgraph
 
+    def get_removed_connections(self):
+        """
+        Returns the connections that are removed to break cycles when the execution order is determined (see self._remove_connection_no_cycles). 
+        Their receivers get the values of the previous timestep.
+        """
+        return frozenset(self._removed_connections)
+
+    def _remove_connection_no_cycles(self, connection):
+        """
+        Removes a connection from the acyclic view of the model. 
+        The components are not modified. Instead, the connection is added to self._removed_connections, which is excluded when the execution order is determined.
+        """
+        connection_point = connection.connectsSystemAt
+        sender_component = connection.connectsSystem
+        receiver_component = connection_point.connectionPointOf
+        self._removed_connections.add(connection)
+        edge_label = self.get_edge_label(connection.senderPropertyName, connection_point.receiverPropertyName)
+        status = self._del_edge(self.system_graph_no_cycles, sender_component.id, receiver_component.id, label=edge_label)
+        assert status, "del_edge returned False. Check if additional characters should be added to \"disallowed_characters\"."
+        self.required_initialization_connections.append(connection)
 
     def get_component_dict_no_cycles_old(self):
-        self._component_dict_no_cycles = copy.deepcopy(self.component_dict)
         self.system_graph_no_cycles = copy.deepcopy(self.system_graph)
         self.get_subgraph_dict_no_cycles()
         self.required_initialization_connections = []
-        controller_instances = [v for v in self._component_dict_no_cycles.values() if isinstance(v, base.Controller)]
+        self._removed_connections = set()
+        controller_instances = [v for v in self.component_dict.values() if isinstance(v, base.Controller)]
         for controller in controller_instances:
             controlled_component = controller.observes.isPropertyOf
             assert controlled_component is not None, f"The attribute \"isPropertyOf\" is None for property \"{controller.observes}\" of component \"{controller.id}\""
-            visited = self._depth_first_search_system(controller)
+            visited = self._depth_first_search_system(controller, self._removed_connections)
             for reachable_component in visited:
-                for connection in reachable_component.connectedThrough.copy():
-                    connection_point = connection.connectsSystemAt
-                    receiver_component = connection_point.connectionPointOf
-                    if controlled_component==receiver_component:
-                        controlled_component.connectsAt.remove(connection_point)
-                        reachable_component.connectedThrough.remove(connection)
-                        edge_label = self.get_edge_label(connection.senderPropertyName, connection_point.receiverPropertyName)
-                        status = self._del_edge(self.system_graph_no_cycles, reachable_component.id, controlled_component.id, label=edge_label)
-                        assert status, "del_edge returned False. Check if additional characters should be added to \"disallowed_characters\"."
-
-                        self.required_initialization_connections.append(connection)
+                for connection in reachable_component.connectedThrough:
+                    if connection not in self._removed_connections and connection.connectsSystemAt.connectionPointOf==controlled_component:
+                        self._remove_connection_no_cycles(connection)
 
     def get_base_component(self, key):
         """
@@ -3793,52 +4134,37 @@ class Model:
         return next(iter(self.instance_map[self.component_dict[key]]))
 
     def get_component_dict_no_cycles(self):
-        self._component_dict_no_cycles = copy.deepcopy(self.component_dict)
         self.system_graph_no_cycles = copy.deepcopy(self.system_graph)
         self.get_subgraph_dict_no_cycles()
         self.required_initialization_connections = []
+        self._removed_connections = set()
 
-        controller_instances = [v for v in self._component_dict_no_cycles.values() if isinstance(v, base.Controller)]
+        controller_instances = [v for v in self.component_dict.values() if isinstance(v, base.Controller)]
         for controller in controller_instances:
-            modeled_components = self.instance_map[self.component_dict[controller.id]]
+            modeled_components = self.instance_map[controller]
             base_controller = [v for v in modeled_components if isinstance(v, base.Controller)][0]
-            controlled_components = [self._component_dict_no_cycles[self.instance_map_reversed[c.isPropertyOf].id] for c in base_controller.controls]
+            controlled_components = [self.component_dict[self.instance_map_reversed[c.isPropertyOf].id] for c in base_controller.controls]
             assert len(controlled_components)!=0, f"No controlled components found for controller with id: {controller.id}"
-            visited = self._depth_first_search_system(controller)
+            visited = self._depth_first_search_system(controller, self._removed_connections)
 
             for controlled_component in controlled_components:
                 for reachable_component in visited:
-                    for connection in reachable_component.connectedThrough.copy():
-                        connection_point = connection.connectsSystemAt
-                        receiver_component = connection_point.connectionPointOf
-                        if controlled_component==receiver_component:
-                            controlled_component.connectsAt.remove(connection_point)
-                            reachable_component.connectedThrough.remove(connection)
-                            edge_label = self.get_edge_label(connection.senderPropertyName, connection_point.receiverPropertyName)
-                            status = self._del_edge(self.system_graph_no_cycles, reachable_component.id, controlled_component.id, label=edge_label)
-                            assert status, "del_edge returned False. Check if additional characters should be added to \"disallowed_characters\"."
-
-                            self.required_initialization_connections.append(connection)
+                    for connection in reachable_component.connectedThrough:
+                        if connection not in self._removed_connections and connection.connectsSystemAt.connectionPointOf==controlled_component:
+                            self._remove_connection_no_cycles(connection)
 
 
         # Temporary fix for removing connections between spaces - should be handled in a more general way
-        # Maybe implement Johnsons algorithm to detect and locate cycles 
-        space_instances = [v for v in self._component_dict_no_cycles.values() if isinstance(v, base.BuildingSpace)]
+        # Remaining cycles are located with _get_strongly_connected_components when the execution order is determined
+        space_instances = [v for v in self.component_dict.values() if isinstance(v, base.BuildingSpace)]
         for space in space_instances:
-            modeled_components = self.instance_map[self.component_dict[space.id]]
+            modeled_components = self.instance_map[space]
             base_space = [v for v in modeled_components if isinstance(v, base.BuildingSpace)][0]
-            connected_spaces = [self._component_dict_no_cycles[self.instance_map_reversed[c].id] for c in base_space.connectedTo if isinstance(c, base.BuildingSpace)]
+            connected_spaces = [self.component_dict[self.instance_map_reversed[c].id] for c in base_space.connectedTo if isinstance(c, base.BuildingSpace)]
             for connected_space in connected_spaces:
-                for connection in space.connectedThrough.copy():
-                    connection_point = connection.connectsSystemAt
-                    receiver_component = connection_point.connectionPointOf
-                    if receiver_component==connected_space:
-                        space.connectedThrough.remove(connection)
-                        connected_space.connectsAt.remove(connection_point)
-                        edge_label = self.get_edge_label(connection.senderPropertyName, connection_point.receiverPropertyName)
-                        status = self._del_edge(self.system_graph_no_cycles, space.id, connected_space.id, label=edge_label)
-                        assert status, "del_edge returned False. Check if additional characters should be added to \"disallowed_characters\"."
-                        self.required_initialization_connections.append(connection)
+                for connection in space.connectedThrough:
+                    if connection not in self._removed_connections and connection.connectsSystemAt.connectionPointOf==connected_space:
+                        self._remove_connection_no_cycles(connection)
 
         # # Temporary fix for removing connections between spaces - should be handled in a more general way
         # # Maybe implement Johnsons algorithm to detect and locate cycles 
@@ -3872,9 +4198,37 @@ class Model:
                     instance.addUncertainty = addUncertainty
 
     def load_chain_log(self, filename):
-        with open(filename, 'rb') as handle:
-            self.chain_log = pickle.load(handle)
-            self.chain_log["chain.T"] = 1/self.chain_log["chain.betas"]
+        """
+        Loads a chain log saved by Estimator.run_emcee_estimation. 
+        "filename" is either a chain store directory (see ChainStore), which is loaded lazily, or a pickled chain log.
+        """
+        if os.path.isdir(filename):
+            self.chain_log = ChainStore(filename)
+        else:
+            with open(filename, 'rb') as handle:
+                self.chain_log = pickle.load(handle)
+                self.chain_log["chain.T"] = 1/self.chain_log["chain.betas"]
+
+    def set_recording_policy(self, record=None):
+        """
+        Sets which simulation results are saved during simulation.
+        If "record" is None, all inputs and outputs are saved for components with saveSimulationResult=True.
+        Otherwise, "record" must be a list of (component, property name) tuples. 
+        Only the listed inputs or outputs are saved and recording is disabled for all other components. 
+        This is e.g. used during estimation, where only the target measuring devices are needed.
+        """
+        if record is None:
+            for component in self.component_dict.values():
+                component.set_recorded_properties(None)
+        else:
+            recordedProperties = {component: [] for component in self.component_dict.values()}
+            for component, property_name in record:
+                assert component in recordedProperties, f"The component with id \"{component.id}\" is not part of the model"
+                assert property_name in component.input or property_name in component.output, f"The component with id \"{component.id}\" has no input or output named \"{property_name}\""
+                recordedProperties[component].append(property_name)
+            for component, property_names in recordedProperties.items():
+                component.set_recorded_properties(property_names)
+        self.recording_policy = record
 
     def set_trackGradient(self, trackGradient):
         assert isinstance(trackGradient, bool), "Argument trackGradient must be True or False" 
@@ -3897,29 +4251,90 @@ class Model:
                 
     def _get_execution_order_old(self):
         self.get_component_dict_no_cycles_old()
-        initComponents = [v for v in self._component_dict_no_cycles.values() if len(v.connectsAt)==0]
-        self.activeComponents = initComponents
-        self.execution_order = []
-        while len(self.activeComponents)>0:
-            self._traverse()
-
-        self.map_execution_order()
-        self.map_required_initialization_connections()
-        self.flat_execution_order = self._flatten(self.execution_order)
-        assert len(self.flat_execution_order)==len(self._component_dict_no_cycles), f"Cycles detected in the model. Inspect the generated file \"system_graph.png\" to see where."
+        self._order_components_no_cycles()
 
     def _get_execution_order(self):
         self.get_component_dict_no_cycles()
-        initComponents = [v for v in self._component_dict_no_cycles.values() if len(v.connectsAt)==0]
+        self._order_components_no_cycles()
+
+    def _order_components_no_cycles(self):
+        """
+        Groups the components into self.execution_order, ignoring the connections in self._removed_connections.
+        Each group only depends on components in previous groups.
+        """
+        n_connections = self.adjacency_index.get_n_connections("connectsAt", self._removed_connections)
+        self.n_active_connections = {component: n_connections[self.adjacency_index.component_ids[component]] for component in self.component_dict.values()}
+        initComponents = [v for v in self.component_dict.values() if self.n_active_connections[v]==0]
         self.activeComponents = initComponents
         self.execution_order = []
         while len(self.activeComponents)>0:
             self._traverse()
+        del self.n_active_connections
 
-        self.map_execution_order()
         self.map_required_initialization_connections()
         self.flat_execution_order = self._flatten(self.execution_order)
-        assert len(self.flat_execution_order)==len(self._component_dict_no_cycles), f"Cycles detected in the model. Inspect the generated file \"system_graph.png\" to see where."
+        if len(self.flat_execution_order)!=len(self.component_dict):
+            cycles = [[component.id for component in scc] for scc in self._get_strongly_connected_components(self._removed_connections) if len(scc)>1]
+            raise AssertionError(f"Cycles detected in the model between the components {cycles}. Inspect the generated file \"system_graph.png\" to see where.")
+        self._compile_input_connections()
+        self._compile_reachability()
+
+    def _get_strongly_connected_components(self, removed_connections=None):
+        """
+        Returns the strongly connected components of the system graph (Tarjan's algorithm), ignoring the connections in "removed_connections".
+        Each strongly connected component is a list of components. A strongly connected component with more than one component contains at least one cycle.
+        """
+        return self.adjacency_index.get_strongly_connected_components(self.component_dict.values(), removed_connections)
+
+    def _compile_input_connections(self):
+        """
+        Caches the ingoing connections of each component, such that the Simulator does not walk connectsAt at each timestep (see Simulator.get_input_transfers).
+        The dictionary self.input_connections maps each component to a tuple of (receiverPropertyName, sender component, senderPropertyName) connections.
+        The values are still transferred one connection at a time between the input and output dictionaries of the components.
+        The output dictionaries are not referenced directly, as some components replace their output dictionary during simulation.
+        """
+        self.input_connections = {}
+        for component in self.flat_execution_order:
+            self.input_connections[component] = tuple((connection_point.receiverPropertyName, connection_point.connectsSystemThrough.connectsSystem, connection_point.connectsSystemThrough.senderPropertyName) for connection_point in component.connectsAt)
+
+    def _compile_reachability(self):
+        """
+        Computes the transitive closure of the acyclic system graph, i.e. ignoring the connections in self._removed_connections.
+        The components are numbered by their position in self.flat_execution_order, and the set of components that can be reached from a component is stored as the bits of an integer.
+        self.descendants[i] holds the components influenced by component i within a timestep, and self.ancestors[i] holds the components influencing component i within a timestep, both including component i itself.
+        """
+        self.execution_index = {component: i for i, component in enumerate(self.flat_execution_order)}
+        n = len(self.flat_execution_order)
+        self.descendants = [1<<i for i in range(n)]
+        self.ancestors = [1<<i for i in range(n)]
+        # Receivers are always later than their senders in self.flat_execution_order
+        for i in reversed(range(n)):
+            for connection in self.flat_execution_order[i].connectedThrough:
+                if connection not in self._removed_connections:
+                    self.descendants[i] |= self.descendants[self.execution_index[connection.connectsSystemAt.connectionPointOf]]
+        for i in range(n):
+            for connection_point in self.flat_execution_order[i].connectsAt:
+                connection = connection_point.connectsSystemThrough
+                if connection not in self._removed_connections:
+                    self.ancestors[i] |= self.ancestors[self.execution_index[connection.connectsSystem]]
+
+    def influences(self, sender_component, receiver_component):
+        """
+        Returns True if the outputs of "sender_component" affect the inputs of "receiver_component" within the same timestep.
+        """
+        return (self.descendants[self.execution_index[sender_component]]>>self.execution_index[receiver_component]) & 1 == 1
+
+    def get_reversed_execution_order(self, source_components, target_component):
+        """
+        Returns the components that lie on a path from any of "source_components" to "target_component" within a timestep, in reversed execution order.
+        This is the order in which gradients of "target_component" are propagated back to parameters of "source_components" (see Simulator.get_gradient).
+        """
+        mask = 0
+        for component in source_components:
+            mask |= self.descendants[self.execution_index[component]]
+        target_index = self.execution_index[target_component]
+        mask &= self.ancestors[target_index]
+        return [self.flat_execution_order[i] for i in reversed(range(target_index+1)) if (mask>>i) & 1]
 
     def _traverse(self):
         activeComponentsNew = []
@@ -3927,10 +4342,11 @@ class Model:
         for component in self.activeComponents:
             self.component_group.append(component)
             for connection in component.connectedThrough:
-                connection_point = connection.connectsSystemAt
-                receiver_component = connection_point.connectionPointOf
-                receiver_component.connectsAt.remove(connection_point)
-                if len(receiver_component.connectsAt)==0:
+                if connection in self._removed_connections:
+                    continue
+                receiver_component = connection.connectsSystemAt.connectionPointOf
+                self.n_active_connections[receiver_component] -= 1
+                if self.n_active_connections[receiver_component]==0:
                     activeComponentsNew.append(receiver_component)
         self.activeComponents = activeComponentsNew
         self.execution_order.append(self.component_group)
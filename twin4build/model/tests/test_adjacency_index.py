@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+
+class TestAdjacencyIndex(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_adjacency_index(self):
+        model = tb.Model(id="test_adjacency_index", graph_rendering="none")
+        position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                                "ruleset_default_value": 0,
+                                                "ruleset_start_minute": [0],
+                                                "ruleset_end_minute": [0],
+                                                "ruleset_start_hour": [6],
+                                                "ruleset_end_hour": [22],
+                                                "ruleset_value": [1]},
+                                            add_noise=False,
+                                            id="Position schedule")
+        damper_1 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6), a=5, id="Damper 1")
+        damper_2 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6), a=5, id="Damper 2")
+        model.add_connection(position_schedule, damper_1, "scheduleValue", "damperPosition")
+        model.add_connection(position_schedule, damper_2, "scheduleValue", "damperPosition")
+
+        index = model.adjacency_index
+        self.assertEqual(index.get_neighbor_ids(position_schedule, "connectedThrough").tolist(), [index.component_ids[damper_1], index.component_ids[damper_2]])
+        self.assertEqual(index.get_neighbors(damper_2, "connectsAt"), [position_schedule])
+        self.assertEqual(model._depth_first_search_system(position_schedule), [position_schedule, damper_1, damper_2])
+        self.assertEqual(model._depth_first_search_system_reversed(damper_1), [damper_1, position_schedule])
+
+        model.remove_connection(position_schedule, damper_1, "scheduleValue", "damperPosition")
+        self.assertEqual(index.get_neighbors(position_schedule, "connectedThrough"), [damper_2])
+        self.assertEqual(index.get_neighbors(damper_1, "connectsAt"), [])
+        self.assertEqual(model._depth_first_search_system(position_schedule), [position_schedule, damper_2])
+
+        # Removing a component also removes the connections of its neighbors to it
+        model.remove_component(damper_2)
+        self.assertNotIn(damper_2, index.component_ids)
+        self.assertEqual(index.get_neighbors(position_schedule, "connectedThrough"), [])
+        self.assertEqual(model._depth_first_search_system(position_schedule), [position_schedule])
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import sys
+import unittest
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+
+def fcn(self):
+    damper_1 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper 1")
+    damper_2 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper 2")
+    damper_3 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper 3")
+    self.add_connection(damper_1, damper_2, "airFlowRate", "damperPosition")
+    self.add_connection(damper_2, damper_1, "airFlowRate", "damperPosition")
+    self.add_connection(damper_2, damper_3, "airFlowRate", "damperPosition")
+
+class TestCycleDetection(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_cycle_detection(self):
+        model = tb.Model(id="test_cycle_detection", graph_rendering="none")
+        with self.assertRaises(AssertionError) as context:
+            model.load_model(infer_connections=False, fcn=fcn)
+        self.assertIn("Damper 1", str(context.exception))
+        self.assertNotIn("Damper 3", str(context.exception))
+        strongly_connected_components = model._get_strongly_connected_components()
+        self.assertEqual(sorted([sorted([component.id for component in scc]) for scc in strongly_connected_components]), [["Damper 1", "Damper 2"], ["Damper 3"]])
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+import tempfile
+import pydot
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+from twin4build.model.model import _get_graph_render_executor
+
+def fcn(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0,
+                                            "ruleset_start_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_end_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_start_hour": [6,7,8,12,14,16,18],
+                                            "ruleset_end_hour": [7,8,12,14,16,18,22],
+                                            "ruleset_value": [0,0.1,1,0,0,0.5,0.7]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    damper = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper")
+    self.add_connection(position_schedule, damper, "scheduleValue", "damperPosition")
+
+class TestGraphRendering(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_graph_rendering(self):
+        model = tb.Model(id="test_graph_rendering", graph_rendering="none")
+        for filename in os.listdir(model.graph_path):
+            if os.path.isfile(os.path.join(model.graph_path, filename)):
+                os.remove(os.path.join(model.graph_path, filename))
+        model.load_model(infer_connections=False, fcn=fcn)
+        graph_filename = os.path.join(model.graph_path, "system_graph.png")
+        self.assertFalse(os.path.isfile(graph_filename))
+
+        model.render_graphs()
+        self.assertTrue(os.path.isfile(graph_filename))
+        self.assertTrue(os.path.isfile(f"{graph_filename}.sha256"))
+
+        # Unchanged graphs are not rendered again
+        mtime = os.path.getmtime(f"{graph_filename}.sha256")
+        model = tb.Model(id="test_graph_rendering", graph_rendering="background")
+        model.load_model(infer_connections=False, fcn=fcn)
+        model.render_graphs()
+        self.assertEqual(os.path.getmtime(f"{graph_filename}.sha256"), mtime)
+
+        # A missing graphviz installation gives a warning, also when rendering in the background
+        path = os.environ["PATH"]
+        os.environ["PATH"] = tempfile.gettempdir()
+        try:
+            model = tb.Model(id="test_graph_rendering", graph_rendering="sync")
+            with self.assertWarns(UserWarning):
+                model.draw_graph("missing_graphviz", pydot.Dot())
+            self.assertFalse(os.path.isfile(os.path.join(model.graph_path, "missing_graphviz.png")))
+        finally:
+            os.environ["PATH"] = path
+
+        # Exceptions raised by background renders are reported when the render finishes
+        model = tb.Model(id="test_graph_rendering", graph_rendering="background")
+        with self.assertWarns(UserWarning):
+            model.draw_graph("invalid_arguments", pydot.Dot(), args=[None])
+            # The single worker calls the done-callback of the render before it starts the next job
+            _get_graph_render_executor().submit(lambda: None).result()
+        self.assertRaises(TypeError, model.render_graphs)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+
+n_fcn_calls = 0
+def fcn(self):
+    global n_fcn_calls
+    n_fcn_calls += 1
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0,
+                                            "ruleset_start_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_end_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_start_hour": [6,7,8,12,14,16,18],
+                                            "ruleset_end_hour": [7,8,12,14,16,18,22],
+                                            "ruleset_value": [0,0.1,1,0,0,0.5,0.7]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    damper = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper")
+    self.add_connection(position_schedule, damper, "scheduleValue", "damperPosition")
+
+class TestModelSnapshot(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_model_snapshot(self):
+        model = tb.Model(id="test_model_snapshot")
+        snapshot_path = model.get_dir(folder_list=["snapshots"])[0]
+        for filename in os.listdir(snapshot_path):
+            os.remove(os.path.join(snapshot_path, filename))
+
+        model.load_model(infer_connections=False, fcn=fcn, use_snapshot=True)
+        self.assertEqual(n_fcn_calls, 1)
+        self.assertEqual(len(os.listdir(snapshot_path)), 1)
+
+        # The second load restores the snapshot without calling fcn
+        snapshot_model = tb.Model(id="test_model_snapshot")
+        snapshot_model.load_model(infer_connections=False, fcn=fcn, use_snapshot=True)
+        self.assertEqual(n_fcn_calls, 1)
+        self.assertEqual([component.id for component in snapshot_model.flat_execution_order], [component.id for component in model.flat_execution_order])
+        damper = snapshot_model.component_dict["Damper"]
+        self.assertIs(damper.connectsAt[0].connectsSystemThrough.connectsSystem, snapshot_model.component_dict["Position schedule"])
+
+        # Changing an input invalidates the snapshot
+        snapshot_model = tb.Model(id="test_model_snapshot")
+        snapshot_model.load_model(infer_connections=False, fcn=fcn, do_load_parameters=False, use_snapshot=True)
+        self.assertEqual(n_fcn_calls, 2)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+
+def fcn(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0,
+                                            "ruleset_start_minute": [0],
+                                            "ruleset_end_minute": [0],
+                                            "ruleset_start_hour": [6],
+                                            "ruleset_end_hour": [22],
+                                            "ruleset_value": [1]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    damper_1 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6), a=5, id="Damper 1")
+    damper_2 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6), a=5, id="Damper 2")
+    damper_3 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6), a=5, id="Damper 3")
+    self.add_connection(position_schedule, damper_1, "scheduleValue", "damperPosition")
+    self.add_connection(damper_1, damper_2, "airFlowRate", "damperPosition")
+    self.add_connection(position_schedule, damper_3, "scheduleValue", "damperPosition")
+
+class TestReachability(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_reachability(self):
+        model = tb.Model(id="test_reachability", graph_rendering="none")
+        model.load_model(infer_connections=False, fcn=fcn, do_load_parameters=False)
+        position_schedule = model.component_dict["Position schedule"]
+        damper_1 = model.component_dict["Damper 1"]
+        damper_2 = model.component_dict["Damper 2"]
+        damper_3 = model.component_dict["Damper 3"]
+        self.assertTrue(model.influences(position_schedule, damper_2))
+        self.assertTrue(model.influences(damper_1, damper_1))
+        self.assertFalse(model.influences(damper_2, damper_1))
+        self.assertFalse(model.influences(damper_3, damper_2))
+        self.assertEqual(model.get_reversed_execution_order([damper_1], damper_2), [damper_2, damper_1])
+        self.assertEqual(model.get_reversed_execution_order([position_schedule], damper_2), [damper_2, damper_1, position_schedule])
+        self.assertEqual(model.get_reversed_execution_order([damper_3], damper_2), [])
+
+if __name__=="__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 from twin4build.saref.device.meter.meter import Meter
-from twin4build.utils.time_series_input import TimeSeriesInputSystem
+from twin4build.utils.time_series_input import TimeSeriesInputSystem, is_same_data_source
 from twin4build.utils.pass_input_to_output import PassInputToOutput
 from twin4build.utils.signature_pattern.signature_pattern import SignaturePattern, Node, Exact, IgnoreIntermediateNodes
 import twin4build.base as base
@@ -35,6 +35,8 @@ class MeterSystem(Meter):
         self.filename = filename
         self.datecolumn = 0
         self.valuecolumn = 1
+        self.physicalSystem = None
+        self.physicalSystemDataSource = None
         # self.addUncertainty = addUncertainty
         self._config = {"parameters": {},
                         "readings": {"filename": self.filename,
@@ -71,10 +73,15 @@ class MeterSystem(Meter):
                     endTime=None,
                     stepSize=None,
                     model=None):
-        if self.filename is not None:
-            self.physicalSystem = TimeSeriesInputSystem(id=f"time series input - {self.id}", filename=self.filename)
-        else:
-            self.physicalSystem = None
+        # The physical system is kept between simulations, such that its readings are only loaded once per period. 
+        # It is created again if the data source has changed, e.g. if "filename" is assigned after the first simulation.
+        data_source = (self.filename, self.datecolumn, self.valuecolumn, None)
+        if self.physicalSystem is None or is_same_data_source(data_source, self.physicalSystemDataSource)==False:
+            if self.filename is not None:
+                self.physicalSystem = TimeSeriesInputSystem(id=f"time series input - {self.id}", filename=self.filename)
+            else:
+                self.physicalSystem = None
+            self.physicalSystemDataSource = data_source
         self.set_is_physical_system()
         self.set_do_step_instance()
         self.do_step_instance.input = self.input
@@ -109,6 +116,14 @@ class MeterSystem(Meter):
         else:
             return {key: 1 for key in y_keys}
         
+    def share_data(self):
+        if self.physicalSystem is not None:
+            self.physicalSystem.share_data()
+
+    def release_shared_data(self):
+        if self.physicalSystem is not None:
+            self.physicalSystem.release_shared_data()
+
     def get_physical_readings(self,
                             startTime=None,
                             endTime=None,
@@ -1,6 +1,6 @@
 # import twin4build.saref.device.sensor.sensor as sensor
 from twin4build.saref.device.sensor.sensor import Sensor
-from twin4build.utils.time_series_input import TimeSeriesInputSystem
+from twin4build.utils.time_series_input import TimeSeriesInputSystem, is_same_data_source
 from twin4build.utils.pass_input_to_output import PassInputToOutput
 from twin4build.utils.signature_pattern.signature_pattern import SignaturePattern, Node, Exact, IgnoreIntermediateNodes
 import twin4build.base as base
@@ -136,6 +136,8 @@ class SensorSystem(Sensor):
         self.df_input = df_input
         self.datecolumn = 0
         self.valuecolumn = 1
+        self.physicalSystem = None
+        self.physicalSystemDataSource = None
         # self.addUncertainty = addUncertainty
         self._config = {"parameters": [],
                         "readings": {"filename": self.filename,
@@ -172,12 +174,17 @@ class SensorSystem(Sensor):
                     endTime=None,
                     stepSize=None,
                     model=None):
-        if self.filename is not None:
-            self.physicalSystem = TimeSeriesInputSystem(id=f"time series input - {self.id}", filename=self.filename, datecolumn=self.datecolumn, valuecolumn=self.valuecolumn)
-        elif self.df_input is not None:
-            self.physicalSystem = TimeSeriesInputSystem(id=f"time series input - {self.id}", df_input=self.df_input, datecolumn=self.datecolumn, valuecolumn=self.valuecolumn)
-        else:
-            self.physicalSystem = None
+        # The physical system is kept between simulations, such that its readings are only loaded once per period. 
+        # It is created again if the data source has changed, e.g. if "df_input" is assigned after the first simulation.
+        data_source = (self.filename, self.datecolumn, self.valuecolumn, self.df_input if self.filename is None else None)
+        if self.physicalSystem is None or is_same_data_source(data_source, self.physicalSystemDataSource)==False:
+            if self.filename is not None:
+                self.physicalSystem = TimeSeriesInputSystem(id=f"time series input - {self.id}", filename=self.filename, datecolumn=self.datecolumn, valuecolumn=self.valuecolumn)
+            elif self.df_input is not None:
+                self.physicalSystem = TimeSeriesInputSystem(id=f"time series input - {self.id}", df_input=self.df_input, datecolumn=self.datecolumn, valuecolumn=self.valuecolumn)
+            else:
+                self.physicalSystem = None
+            self.physicalSystemDataSource = data_source
         self.set_is_physical_system()
         self.set_do_step_instance()
         self.do_step_instance.input = self.input
@@ -212,6 +219,14 @@ class SensorSystem(Sensor):
     #     else:
     #         return {key: 1 for key in y_keys}
         
+    def share_data(self):
+        if self.physicalSystem is not None:
+            self.physicalSystem.share_data()
+
+    def release_shared_data(self):
+        if self.physicalSystem is not None:
+            self.physicalSystem.release_shared_data()
+
     def get_physical_readings(self,
                             startTime=None,
                             endTime=None,
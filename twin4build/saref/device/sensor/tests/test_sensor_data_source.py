@@ -0,0 +1,64 @@
+import os
+import sys
+import pickle
+import datetime
+import unittest
+import pandas as pd
+from dateutil import tz
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 6)
+    sys.path.append(file_path)
+import twin4build as tb
+from twin4build.utils.time_series_input import TimeSeriesInputSystem
+
+class TestSensorDataSource(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_sensor_data_source(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        endTime = datetime.datetime(year=2021, month=1, day=10, hour=1, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        sensor = tb.SensorSystem(df_input=pd.Series([1.0, 2.0, 3.0]), id="Sensor")
+        sensor.initialize(startTime, endTime, stepSize)
+        sensor.do_step()
+        self.assertEqual(list(sensor.output.values()), [1.0])
+
+        # The readings are loaded again when df_input is assigned after the first initialize
+        sensor.df_input = pd.Series([5.0, 6.0])
+        sensor.initialize(startTime, endTime, stepSize)
+        sensor.do_step()
+        self.assertEqual(list(sensor.output.values()), [5.0])
+
+        # The physical system and its cached readings are kept if the data source is unchanged, also in worker processes
+        physical_system = sensor.physicalSystem
+        sensor.initialize(startTime, endTime, stepSize)
+        self.assertIs(sensor.physicalSystem, physical_system)
+        physical_system.share_data()
+        try:
+            sensor_copy = pickle.loads(pickle.dumps(sensor))
+            cached_readings = sensor_copy.physicalSystem.cached_readings
+            sensor_copy.initialize(startTime, endTime, stepSize)
+            self.assertIs(sensor_copy.physicalSystem.cached_readings, cached_readings)
+        finally:
+            physical_system.release_shared_data()
+
+    @unittest.skipIf(False, 'Currently not used')
+    def test_time_series_input_data_source(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        endTime = datetime.datetime(year=2021, month=1, day=10, hour=1, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        time_series_input = TimeSeriesInputSystem(df_input=pd.Series([1.0, 2.0]), id="Time series input")
+        time_series_input.output = {"value": None}
+        time_series_input.initialize(startTime, endTime, stepSize)
+        time_series_input.do_step()
+        self.assertEqual(time_series_input.output["value"], 1.0)
+
+        time_series_input.df = pd.Series([3.0, 4.0])
+        time_series_input.initialize(startTime, endTime, stepSize)
+        time_series_input.do_step()
+        self.assertEqual(time_series_input.output["value"], 3.0)
+        self.assertEqual(len(time_series_input.cached_readings), 1)
+
+if __name__=="__main__":
+    unittest.main()
@@ -30,6 +30,7 @@ def get_signature_pattern():
 
 class OccupancySystem(base.Schedule, System):
     sp = [get_signature_pattern()]
+    state_attributes = ["previous_indoorCO2Concentration"]
     def __init__(self,
                 **kwargs):
         super().__init__(**kwargs)
@@ -6,11 +6,73 @@ from twin4build.logger.Logging import Logging
 from twin4build.utils.signature_pattern.signature_pattern import SignaturePattern, Node, Exact, IgnoreIntermediateNodes
 import twin4build.base as base
 from twin4build.utils.time_series_input import TimeSeriesInputSystem
+import numpy as np
+import numbers
+import math
+import functools
 logger = Logging.get_logger("ai_logfile")
 
 
 
 
+def get_ruleset_key(rulesetDict):
+    """
+    Returns a hashable representation of a ruleset dict, or None if the ruleset has non-numeric values.
+    """
+    values = [rulesetDict["ruleset_default_value"]] + list(rulesetDict["ruleset_value"])
+    if all(isinstance(value, numbers.Number) for value in values)==False:
+        return None
+    return (rulesetDict["ruleset_default_value"],
+            tuple(rulesetDict["ruleset_start_minute"]),
+            tuple(rulesetDict["ruleset_end_minute"]),
+            tuple(rulesetDict["ruleset_start_hour"]),
+            tuple(rulesetDict["ruleset_end_hour"]),
+            tuple(rulesetDict["ruleset_value"]))
+
+def get_timeline(startTime, n_timesteps, stepSize):
+    """
+    Returns the hour, minute and weekday of the simulation timesteps startTime+i*stepSize (see Simulator.get_simulation_timesteps).
+    Adding a timedelta to a datetime is done in wall-clock time, which is therefore also done here.
+    """
+    start = np.datetime64(startTime.replace(tzinfo=None), "s")
+    dateTimes = start + np.arange(n_timesteps, dtype=np.int64)*np.timedelta64(int(stepSize), "s")
+    days = dateTimes.astype("datetime64[D]")
+    seconds_of_day = (dateTimes-days).astype(np.int64)
+    hour = seconds_of_day//3600
+    minute = (seconds_of_day%3600)//60
+    weekday = (days.astype(np.int64)+3)%7 # 1970-01-01 was a Thursday
+    return hour, minute, weekday
+
+@functools.lru_cache(maxsize=256)
+def get_schedule_values(ruleset_keys, startTime, n_timesteps, stepSize):
+    """
+    Evaluates the rulesets of a ScheduleSystem (without noise) for all simulation timesteps.
+    "ruleset_keys" are the keys (see get_ruleset_key) of the rulesets for Monday to Sunday.
+    Results are cached, such that identical schedules are only evaluated once. The returned array is therefore read-only.
+    """
+    hour, minute, weekday = get_timeline(startTime, n_timesteps, stepSize)
+    values = np.empty(n_timesteps, dtype=np.float64)
+    is_match = np.empty(n_timesteps, dtype=bool)
+    for day, (default_value, start_minute, end_minute, start_hour, end_hour, ruleset_value) in enumerate(ruleset_keys):
+        is_day = weekday==day
+        h = hour[is_day]
+        m = minute[is_day]
+        conditions = []
+        for i_rule in range(len(start_hour)):
+            # Same conditions as in ScheduleSystem.get_schedule_value. np.select picks the first matching rule.
+            conditions.append(((start_hour[i_rule]==h) & (m>=start_minute[i_rule])) |
+                              ((start_hour[i_rule]<h) & (h<end_hour[i_rule])) |
+                              ((end_hour[i_rule]==h) & (m<=end_minute[i_rule])))
+        if len(conditions)==0:
+            values[is_day] = default_value
+            is_match[is_day] = False
+        else:
+            values[is_day] = np.select(conditions, ruleset_value, default=default_value)
+            is_match[is_day] = np.any(conditions, axis=0)
+    values.flags.writeable = False
+    is_match.flags.writeable = False
+    return values, is_match
+
 def get_signature_pattern():
     node0 = Node(cls=(base.Schedule,), id="<Schedule<SUB>1</SUB>>")
     sp = SignaturePattern(ownedBy="ScheduleSystem", priority=10)
@@ -111,6 +173,7 @@ class ScheduleSystem(base.Schedule, System):
                     model=None):
         self.noise = 0
         self.bias = 0
+        self.scheduleValues = None
         assert (self.useFile and self.filename is None)==False, "filename must be provided if useFile is True."
         assert (self.useFile==False and self.weekDayRulesetDict is None)==False, "weekDayRulesetDict must be provided if useFile is False."
 
@@ -173,10 +236,55 @@ class ScheduleSystem(base.Schedule, System):
                         if key not in rulesetDict:
                             rulesetDict[key] = [0]*len_key
 
+            ruleset_keys = tuple(get_ruleset_key(rulesetDict) for rulesetDict in required_dicts)
+            if startTime is not None and endTime is not None and stepSize is not None and None not in ruleset_keys:
+                self.initialize_schedule_values(ruleset_keys, startTime, endTime, stepSize)
+
 
 
         
 
+    def initialize_schedule_values(self, ruleset_keys, startTime, endTime, stepSize):
+        """
+        Computes the schedule values for all simulation timesteps, such that do_step is a lookup.
+        The noise and bias are drawn in bulk with the same random number generator and in the same order as in get_schedule_value.
+        """
+        n_timesteps = math.floor((endTime-startTime).total_seconds()/stepSize)
+        values, is_match = get_schedule_values(ruleset_keys, startTime, n_timesteps, stepSize)
+        if self.add_noise:
+            hour, minute, weekday = get_timeline(startTime, n_timesteps, stepSize)
+            is_new_hour = minute==0
+            is_new_day = is_new_hour & (hour==0)
+            noise = np.zeros(n_timesteps)
+            bias = np.zeros(n_timesteps)
+            for i in np.flatnonzero(is_new_hour):
+                noise[i] = randrange(-4,4)
+                if is_new_day[i]:
+                    bias[i] = randrange(-10,10)
+            # The noise and bias are held until a new value is drawn
+            noise = noise[np.maximum.accumulate(np.where(is_new_hour, np.arange(n_timesteps), 0))]
+            bias = bias[np.maximum.accumulate(np.where(is_new_day, np.arange(n_timesteps), 0))]
+            is_noisy = is_match & (values>0)
+            values = np.where(is_noisy, np.maximum(values+noise+bias, 0), values)
+        self.scheduleValues = values
+        self.scheduleStepSize = stepSize
+
+    def has_constant_output(self, startTime=None, endTime=None, stepSize=None):
+        """
+        The schedule value is constant if no file is used, no noise is added, and all rulesets yield the same value at all times.
+        Must be called after initialize.
+        """
+        if self.useFile or self.add_noise:
+            return False
+        if self.scheduleValues is not None:
+            return bool(np.all(self.scheduleValues==self.scheduleValues[0])) if self.scheduleValues.size>0 else True
+        rulesetDicts = [self.mondayRulesetDict, self.tuesdayRulesetDict, self.wednesdayRulesetDict, self.thursdayRulesetDict, self.fridayRulesetDict, self.saturdayRulesetDict, self.sundayRulesetDict]
+        values = set()
+        for rulesetDict in rulesetDicts:
+            values.add(rulesetDict["ruleset_default_value"])
+            values.update(rulesetDict["ruleset_value"])
+        return len(values)==1
+
     def get_schedule_value(self, dateTime):
         if dateTime.minute==0: #Compute a new noise value if a new hour is entered in the simulation
             self.noise = randrange(-4,4)
@@ -232,6 +340,8 @@ class ScheduleSystem(base.Schedule, System):
         if self.useFile:
             self.do_step_instance.do_step(secondTime, dateTime, stepSize)
             self.output = self.do_step_instance.output
+        elif self.scheduleValues is not None and secondTime is not None and 0<=secondTime//self.scheduleStepSize<self.scheduleValues.size:
+            self.output["scheduleValue"] = self.scheduleValues[int(secondTime//self.scheduleStepSize)]
         else:
             self.output["scheduleValue"] = self.get_schedule_value(dateTime)
 
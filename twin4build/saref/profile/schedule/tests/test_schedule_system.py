@@ -0,0 +1,48 @@
+import os
+import sys
+import math
+import random
+import datetime
+import unittest
+import numpy as np
+from dateutil.tz import gettz
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 6)
+    sys.path.append(file_path)
+from twin4build.saref.profile.schedule.schedule_system import ScheduleSystem
+
+class TestScheduleSystem(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_schedule_values(self):
+        weekDayRulesetDict = {"ruleset_default_value": 0,
+                              "ruleset_start_minute": [0,0,30,0],
+                              "ruleset_end_minute": [0,0,0,15],
+                              "ruleset_start_hour": [6,7,8,12],
+                              "ruleset_end_hour": [7,8,12,18],
+                              "ruleset_value": [3,5,20,25]}
+        weekendRulesetDict = {"ruleset_default_value": 1}
+        startTime = datetime.datetime(year=2023, month=10, day=25, hour=0, minute=0, second=0, tzinfo=gettz("Europe/Copenhagen"))
+        endTime = datetime.datetime(year=2023, month=11, day=3, hour=0, minute=0, second=0, tzinfo=gettz("Europe/Copenhagen"))
+        for add_noise in [False, True]:
+            for stepSize in [420, 600]:
+                schedule = ScheduleSystem(id="schedule", weekDayRulesetDict=weekDayRulesetDict, weekendRulesetDict=weekendRulesetDict, add_noise=add_noise)
+                random.seed(0)
+                schedule.initialize(startTime, endTime, stepSize)
+                n_timesteps = math.floor((endTime-startTime).total_seconds()/stepSize)
+                dateTimeSteps = [startTime+datetime.timedelta(seconds=i*stepSize) for i in range(n_timesteps)]
+                values = []
+                for i, dateTime in enumerate(dateTimeSteps):
+                    schedule.do_step(secondTime=i*stepSize, dateTime=dateTime, stepSize=stepSize)
+                    values.append(schedule.output["scheduleValue"])
+
+                # Evaluate the rulesets at each timestep
+                random.seed(0)
+                schedule.noise = 0
+                schedule.bias = 0
+                values_expected = [schedule.get_schedule_value(dateTime) for dateTime in dateTimeSteps]
+                self.assertTrue(np.array_equal(values, values_expected))
+
+if __name__=="__main__":
+    unittest.main()
@@ -429,7 +429,7 @@ class BuildingSpaceSystem(building_space.BuildingSpace):
         for input and output. It also determines the device to be used for running the code, which is the CPU in this case. 
         Additionally, it sets a boolean variable use_onnx to True.
     '''
-
+    state_attributes = ["hidden_state"]
 
     def __init__(self,
                 airVolume=None,
@@ -413,6 +413,7 @@ class NoSpaceModelException(Exception):
 
 
 class BuildingSpaceSystem(building_space.BuildingSpace):
+    state_attributes = ["hidden_state"]
     def __init__(self,
                 airVolume=None,
                 **kwargs):
@@ -14,6 +14,7 @@ logger = Logging.get_logger("ai_logfile")
 logger.info("Controller Model Rule Based File")
 
 class RulebasedControllerSystem(RulebasedController):
+    state_attributes = ["hold_900_signal", "hold_750_signal", "hold_600_signal"]
     def __init__(self, 
                 **kwargs):
         super().__init__(**kwargs)
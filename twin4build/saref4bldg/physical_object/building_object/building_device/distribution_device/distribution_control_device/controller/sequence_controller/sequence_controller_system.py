@@ -77,6 +77,7 @@ def get_signature_pattern2():
 
 class SequenceControllerSystem(base.Controller):
     sp = [get_signature_pattern1(), get_signature_pattern2()]
+    state_attributes = ["setpoint_controller", "rulebased_controller"]
     def __init__(self,
                 **kwargs):
         super().__init__(**kwargs)
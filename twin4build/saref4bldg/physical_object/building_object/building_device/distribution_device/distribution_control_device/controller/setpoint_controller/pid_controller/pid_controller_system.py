@@ -2,6 +2,9 @@ import twin4build.base as base
 from scipy.optimize import least_squares
 import numpy as np
 class ControllerSystem(base.SetpointController):
+    batch_parameters = ["K_p", "K_i", "K_d"]
+    batch_states = ["acc_err", "prev_err"]
+    state_attributes = ["acc_err", "prev_err"]
     def __init__(self, 
                 # isTemperatureController=None,
                 # isCo2Controller=None,
@@ -59,6 +62,28 @@ class ControllerSystem(base.SetpointController):
 
         self.output["inputSignal"] = signal_value
 
+    @classmethod
+    def do_step_batch(cls, batch, secondTime=None, dateTime=None, stepSize=None):
+        """
+        Vectorized version of do_step for a ComponentBatch of ControllerSystem instances.
+        The integrator states "acc_err" and "prev_err" are kept in batch.state while simulating.
+        """
+        K_p = batch.parameters["K_p"]
+        K_i = batch.parameters["K_i"]
+        K_d = batch.parameters["K_d"]
+        acc_err = batch.state["acc_err"]
+        prev_err = batch.state["prev_err"]
+        err = batch.get_input("setpointValue")-batch.get_input("actualValue")
+        signal_value = err*K_p + acc_err*K_i + (err-prev_err)*K_d
+        is_upper = signal_value>1
+        is_lower = signal_value<0
+        is_saturated = is_upper | is_lower
+        with np.errstate(divide="ignore"):
+            batch.state["acc_err"] = np.where(is_upper, 1/K_i, np.where(is_lower, 0, acc_err+err))
+        batch.state["prev_err"] = np.where(is_saturated, 0, err)
+        signal_value = np.where(is_upper, 1, np.where(is_lower, 0, signal_value))
+        batch.set_output("inputSignal", signal_value)
+
     def do_period(self, input):
         self.clear_report()
         self.acc_err = 0
@@ -19,6 +19,12 @@ from twin4build.logger.Logging import Logging
 logger = Logging.get_logger("ai_logfile")
 
 class AirToAirHeatRecoverySystem(air_to_air_heat_recovery.AirToAirHeatRecovery):
+    batch_parameters = ["eps_75_h",
+                        "eps_75_c",
+                        "eps_100_h",
+                        "eps_100_c",
+                        "primaryAirFlowRateMax.hasValue",
+                        "secondaryAirFlowRateMax.hasValue"]
     def __init__(self,
                 eps_75_h: Union[float, None]=None,
                 eps_75_c: Union[float, None]=None,
@@ -112,6 +118,42 @@ class AirToAirHeatRecoverySystem(air_to_air_heat_recovery.AirToAirHeatRecovery):
 
         logger.info("[ AirToAirHeatRecoverySystem] : Exited from Do Step Function ")
 
+    @classmethod
+    def do_step_batch(cls, batch, secondTime=None, dateTime=None, stepSize=None):
+        '''
+            Vectorized version of do_step for a ComponentBatch of AirToAirHeatRecoverySystem instances.
+            The branches of do_step are evaluated for all components and selected with masks.
+        '''
+        for component in batch.components:
+            component.output.update(component.input)
+        tol = 1e-5
+        primaryTemperatureIn = batch.get_input("primaryTemperatureIn")
+        secondaryTemperatureIn = batch.get_input("secondaryTemperatureIn")
+        primaryAirFlowRate = batch.get_input("primaryAirFlowRate")
+        secondaryAirFlowRate = batch.get_input("secondaryAirFlowRate")
+        primaryTemperatureOutSetpoint = batch.get_input("primaryTemperatureOutSetpoint")
+
+        has_flow = (primaryAirFlowRate>tol) & (secondaryAirFlowRate>tol)
+        m_a_max = np.maximum(batch.parameters["primaryAirFlowRateMax.hasValue"], batch.parameters["secondaryAirFlowRateMax.hasValue"])
+        is_feasible_heating = primaryTemperatureIn < secondaryTemperatureIn
+        eps_75 = np.where(is_feasible_heating, batch.parameters["eps_75_h"], batch.parameters["eps_75_c"])
+        eps_100 = np.where(is_feasible_heating, batch.parameters["eps_100_h"], batch.parameters["eps_100_c"])
+        is_operation_heating = primaryTemperatureIn<primaryTemperatureOutSetpoint
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f_flow = 0.5*(primaryAirFlowRate + secondaryAirFlowRate)/m_a_max
+            eps_op = eps_75 + (eps_100-eps_75)*(f_flow-0.75)/(1-0.75)
+            C_sup = primaryAirFlowRate*Constants.specificHeatCapacity["air"]
+            C_exh = secondaryAirFlowRate*Constants.specificHeatCapacity["air"]
+            C_min = np.minimum(C_sup, C_exh)
+            primaryTemperatureOut = primaryTemperatureIn + eps_op*(secondaryTemperatureIn - primaryTemperatureIn)*(C_min/C_sup)
+
+        primaryTemperatureOut = np.where(is_operation_heating & (primaryTemperatureOut>primaryTemperatureOutSetpoint), primaryTemperatureOutSetpoint, primaryTemperatureOut)
+        primaryTemperatureOut = np.where(~is_operation_heating & (primaryTemperatureOut<primaryTemperatureOutSetpoint), primaryTemperatureOutSetpoint, primaryTemperatureOut)
+        primaryTemperatureOut = np.where(is_feasible_heating==is_operation_heating, primaryTemperatureOut, primaryTemperatureIn)
+        primaryTemperatureOut = np.where(has_flow, primaryTemperatureOut, NaN)
+        batch.set_output("primaryTemperatureOut", primaryTemperatureOut)
+
 
     def do_period(self, input):
 
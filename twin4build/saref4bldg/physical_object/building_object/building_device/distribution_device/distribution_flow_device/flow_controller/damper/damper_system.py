@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from .damper import Damper
 from twin4build.utils.signature_pattern.signature_pattern import SignaturePattern, Node, Exact, MultipleMatches, Optional
 import twin4build.base as base
@@ -31,6 +32,7 @@ def get_signature_pattern_1():
 
 class DamperSystem(Damper):
     sp = [get_signature_pattern_1()]
+    batch_parameters = ["a", "b", "c"]
     """
     Parameters:
         - nominalAirFlowRate: The nominal air flow rate through the damper when it is fully open.
@@ -95,6 +97,16 @@ class DamperSystem(Damper):
         self.output["damperPosition"] = self.input["damperPosition"]
         self.output["airFlowRate"] = m_a
 
+    @classmethod
+    def do_step_batch(cls, batch, secondTime=None, dateTime=None, stepSize=None):
+        """
+        Vectorized version of do_step for a ComponentBatch of DamperSystem instances.
+        """
+        u = batch.get_input("damperPosition")
+        m_a = batch.parameters["a"]*np.exp(batch.parameters["b"]*u) + batch.parameters["c"]
+        batch.set_output("damperPosition", u)
+        batch.set_output("airFlowRate", m_a)
+
         
 
 
@@ -10,6 +10,9 @@ logger = Logging.get_logger("ai_logfile")
 logger.info("Space Heater Model")
 
 class SpaceHeaterSystem(space_heater.SpaceHeater):
+    batch_parameters = ["heatTransferCoefficient",
+                        "thermalMassHeatCapacity.hasValue",
+                        "specificHeatCapacityWater"]
     def __init__(self,
                  heatTransferCoefficient=None,
                 **kwargs):
@@ -88,6 +91,34 @@ class SpaceHeaterSystem(space_heater.SpaceHeater):
 
         logger.info("[space heater model] : Exited from DoStep Function")
 
+    @classmethod
+    def do_step_batch(cls, batch, secondTime=None, dateTime=None, stepSize=None):
+        '''
+            Vectorized version of do_step for a ComponentBatch of SpaceHeaterSystem instances. 
+            The segments are still solved sequentially, but each segment is solved for all space heaters at once.
+        '''
+        n = 10
+        waterFlowRate = batch.get_input("waterFlowRate")
+        indoorTemperature = batch.get_input("indoorTemperature")
+        heatTransferCoefficient = batch.parameters["heatTransferCoefficient"]
+        thermalMassHeatCapacity = batch.parameters["thermalMassHeatCapacity.hasValue"]
+        specificHeatCapacityWater = batch.parameters["specificHeatCapacityWater"]
+        outletWaterTemperature = batch.get_output("outletWaterTemperature")
+        supplyWaterTemperature = np.empty(outletWaterTemperature.shape)
+        supplyWaterTemperature[:,0] = batch.get_input("supplyWaterTemperature")
+        K2 = 1/stepSize + (heatTransferCoefficient/n + waterFlowRate*specificHeatCapacityWater)/(thermalMassHeatCapacity/n)
+        for i in range(n):
+            K1 = (supplyWaterTemperature[:,i]*waterFlowRate*specificHeatCapacityWater + heatTransferCoefficient/n*indoorTemperature)/(thermalMassHeatCapacity/n) + outletWaterTemperature[:,i]/stepSize
+            outletWaterTemperature[:,i] = K1/K2
+            if i!=n-1:
+                supplyWaterTemperature[:,i+1] = outletWaterTemperature[:,i]
+
+        Q_r = waterFlowRate*specificHeatCapacityWater*(supplyWaterTemperature[:,0]-outletWaterTemperature[:,-1])
+        batch.set_input("supplyWaterTemperature", supplyWaterTemperature)
+        batch.set_output("outletWaterTemperature", outletWaterTemperature)
+        batch.set_output("Power", Q_r)
+        batch.set_output("Energy", batch.get_output("Energy") + Q_r*stepSize/3600/1000)
+
 
     def do_period(self, input, stepSize=None):
         '''
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Union
+import copy
 from twin4build.utils.plot.simulation_result import SimulationResult
 import itertools
 from twin4build.logger.Logging import Logging
@@ -7,6 +8,8 @@ from twin4build.logger.Logging import Logging
 logger = Logging.get_logger("ai_logfile")
 
 class System(SimulationResult):
+    # Attribute names holding internal state that is carried between timesteps, in addition to the inputs and outputs (see self.get_state).
+    state_attributes = []
     # id_iter = itertools.count()
     def __init__(self,
                 connectedTo: Union[list, None]=None,
@@ -89,3 +92,46 @@ class System(SimulationResult):
         self.parameterGradient = parameterGradient
         self.id = id
         logger.info("[System Class] : Exited from __init__ Function")
+
+    def has_constant_output(self, startTime=None, endTime=None, stepSize=None):
+        """
+        Returns True if the outputs of the component are provably constant between "startTime" and "endTime". 
+        Constant components are only stepped once when simulating a pruned model (see Simulator.simulate).
+        Component classes without inputs can override this method.
+        """
+        return False
+
+    def has_state(self):
+        """
+        Returns True if the outputs of the component depend on previous timesteps through internal states, i.e. the attributes in "state_attributes".
+        """
+        return len(self.state_attributes)>0
+
+    def get_state(self):
+        """
+        Returns a copy of the simulation state of the component, i.e. the inputs, the outputs and the attributes in "state_attributes". 
+        Attributes holding other components, e.g. the sub-controllers of a composite controller, are stored through their own "get_state" method.
+        Data that only depends on the simulation period, e.g. cached readings or schedules, is not part of the state and is set up again by "initialize".
+        """
+        state = {"input": copy.deepcopy(self.input),
+                "output": copy.deepcopy(self.output)}
+        for attr in self.state_attributes:
+            value = getattr(self, attr)
+            if isinstance(value, System):
+                state[attr] = value.get_state()
+            else:
+                state[attr] = copy.deepcopy(value)
+        return state
+
+    def set_state(self, state):
+        """
+        Restores a state returned by self.get_state. Must be called after the component has been initialized for the new simulation period.
+        """
+        self.input.update(copy.deepcopy(state["input"]))
+        self.output.update(copy.deepcopy(state["output"]))
+        for attr in self.state_attributes:
+            value = getattr(self, attr, None)
+            if isinstance(value, System):
+                value.set_state(state[attr])
+            else:
+                setattr(self, attr, copy.deepcopy(state[attr]))
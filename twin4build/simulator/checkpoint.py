@@ -0,0 +1,27 @@
+import pickle
+
+class SimulationCheckpoint:
+    """
+    Snapshot of the simulation state of a model at the timestamp "dateTime" (see Simulator.simulate and Model.get_state).
+    The "states" dictionary maps component ids to the states returned by System.get_state,
+    including the internal states of FMU components (see FMUComponent.get_state) and controller integrators.
+    A simulation can be resumed from the checkpoint by calling Simulator.simulate with startTime=dateTime and checkpoint=<SimulationCheckpoint>,
+    e.g. to skip a warm-up period or to branch several forecasts or what-if scenarios from the same state.
+    """
+    def __init__(self, dateTime=None, stepSize=None, states=None):
+        assert dateTime.tzinfo is not None, "The argument dateTime must have a timezone"
+        assert isinstance(states, dict), "The argument states must be a dictionary"
+        self.dateTime = dateTime
+        self.stepSize = stepSize
+        self.states = states
+
+    def save(self, filename):
+        with open(filename, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(filename):
+        with open(filename, "rb") as f:
+            checkpoint = pickle.load(f)
+        assert isinstance(checkpoint, SimulationCheckpoint), f"The file \"{filename}\" does not contain a SimulationCheckpoint"
+        return checkpoint
@@ -0,0 +1,144 @@
+import numpy as np
+from twin4build.utils.rgetattr import rgetattr
+
+def get_batch_class(cls):
+    """
+    Returns the class that provides the vectorized "do_step_batch" method for "cls", or None if "cls" cannot be batched.
+    A class can only be batched if the class that defines its "do_step" method also defines "do_step_batch".
+    This ensures that subclasses overriding "do_step" are never advanced by a kernel written for their parent class.
+    """
+    for c in cls.__mro__:
+        if "do_step" in c.__dict__:
+            if "do_step_batch" in c.__dict__:
+                return c
+            else:
+                return None
+    return None
+
+
+class ComponentBatch():
+    """
+    A group of components of the same class, which are advanced together by the vectorized <Class>.do_step_batch method.
+
+    The batchable class declares:
+        - batch_parameters: Attribute names (dotted paths are allowed) that are stacked into arrays once per simulation.
+        - batch_states: Attribute names holding internal state. These are kept as arrays while simulating and written back to the components by "write_states".
+
+    The batch owns contiguous arrays for its inputs and outputs. self.input holds the inputs that are filled directly by self.do_transfers (see self.compile_transfers), 
+    and self.output holds the outputs written by "set_output". The input and output dictionaries of the components are kept up to date for recording and for non-batched receivers.
+    """
+    def __init__(self, components):
+        assert len(components)>0, "A ComponentBatch must contain at least one component"
+        self.components = components
+        self.cls = type(components[0])
+        assert all(type(component) is self.cls for component in components), "All components in a ComponentBatch must be of the same class"
+        self.batch_class = get_batch_class(self.cls)
+        assert self.batch_class is not None, f"The class \"{self.cls.__name__}\" does not support vectorized stepping"
+        self.parameters = {}
+        self.state = {}
+        self.input = {}
+        self.output = {}
+        self.transfers = []
+        self.component_transfers = []
+
+    def __len__(self):
+        return len(self.components)
+
+    def initialize(self):
+        """
+        Stacks parameters and states. Must be called after the components have been initialized.
+        """
+        self.parameters = {attr: np.array([rgetattr(component, attr) for component in self.components], dtype=np.float64) for attr in getattr(self.batch_class, "batch_parameters", [])}
+        self.state = {attr: np.array([getattr(component, attr) for component in self.components], dtype=np.float64) for attr in getattr(self.batch_class, "batch_states", [])}
+        if hasattr(self.batch_class, "initialize_batch"):
+            self.batch_class.initialize_batch(self)
+
+    def compile_transfers(self, component_transfers, batch_index):
+        """
+        Lowers the input transfers of the components, given as tuples of (receiverPropertyName, sender component, senderPropertyName) for each component (see Simulator.get_input_transfers), 
+        to transfers into the contiguous arrays in self.input. "batch_index" maps the components of previously compiled batches to a tuple of (ComponentBatch, index).
+        Inputs that are connected for all components are transferred by self.do_transfers:
+            - by a single assignment if all components receive the same output of the same sender,
+            - by indexing the output array of another batch if all components receive the same output of components in that batch,
+            - otherwise by gathering the outputs of the senders.
+        All other transfers are done for each component.
+        """
+        senders_by_key = [{receiver_property_name: (sender_component, sender_property_name) for receiver_property_name, sender_component, sender_property_name in transfers} for transfers in component_transfers]
+        common_keys = [key for key in senders_by_key[0] if all(key in senders for senders in senders_by_key)]
+        self.input = {}
+        self.transfers = []
+        for key in common_keys:
+            senders = [senders[key][0] for senders in senders_by_key]
+            sender_property_names = [senders[key][1] for senders in senders_by_key]
+            values = np.full(len(self.components), np.nan)
+            self.input[key] = values
+            upstream_batch = None
+            indices = None
+            if all(sender is senders[0] for sender in senders) and all(name==sender_property_names[0] for name in sender_property_names):
+                senders = senders[:1]
+                sender_property_names = sender_property_names[:1]
+            elif all(name==sender_property_names[0] for name in sender_property_names) and all(sender in batch_index for sender in senders):
+                upstream_batches = [batch_index[sender][0] for sender in senders]
+                if all(batch is upstream_batches[0] for batch in upstream_batches):
+                    upstream_batch = upstream_batches[0]
+                    indices = np.array([batch_index[sender][1] for sender in senders], dtype=int)
+            self.transfers.append((key, values, tuple(senders), tuple(sender_property_names), upstream_batch, indices))
+        common_keys = set(common_keys)
+        self.component_transfers = []
+        for component, transfers in zip(self.components, component_transfers):
+            transfers = tuple(transfer for transfer in transfers if transfer[0] not in common_keys)
+            if len(transfers)>0:
+                self.component_transfers.append((component, transfers))
+
+    def do_transfers(self):
+        """
+        Fills self.input with the current outputs of the senders (see self.compile_transfers) and passes the values on to the input dictionaries of the components.
+        """
+        components = self.components
+        for key, values, senders, sender_property_names, upstream_batch, indices in self.transfers:
+            if len(senders)==1:
+                value = senders[0].output[sender_property_names[0]]
+                values[:] = value
+                for component in components:
+                    component.input[key] = value
+                continue
+            # Outputs that are not written by "set_output" of the upstream batch are gathered from the senders
+            if upstream_batch is not None and sender_property_names[0] in upstream_batch.output:
+                np.take(upstream_batch.output[sender_property_names[0]], indices, out=values)
+            else:
+                values[:] = [sender.output[sender_property_name] for sender, sender_property_name in zip(senders, sender_property_names)]
+            for component, value in zip(components, values.tolist()):
+                component.input[key] = value
+        for component, transfers in self.component_transfers:
+            input_ = component.input
+            for receiver_property_name, sender_component, sender_property_name in transfers:
+                input_[receiver_property_name] = sender_component.output[sender_property_name]
+
+    def get_input(self, key):
+        if key in self.input:
+            return self.input[key]
+        return np.array([component.input[key] for component in self.components], dtype=np.float64)
+
+    def get_output(self, key):
+        return np.array([component.output[key] for component in self.components], dtype=np.float64)
+
+    def set_input(self, key, values):
+        for component, value in zip(self.components, values.tolist()):
+            component.input[key] = value
+
+    def set_output(self, key, values):
+        values = np.array(values, dtype=np.float64)
+        self.output[key] = values
+        for component, value in zip(self.components, values.tolist()):
+            component.output[key] = value
+
+    def write_states(self):
+        """
+        Writes the batched states back to the individual components.
+        """
+        for attr, values in self.state.items():
+            for component, value in zip(self.components, values.tolist()):
+                setattr(component, attr, value)
+
+    def do_step(self, secondTime=None, dateTime=None, stepSize=None):
+        self.batch_class.do_step_batch(self, secondTime=secondTime, dateTime=dateTime, stepSize=stepSize)
@@ -0,0 +1,124 @@
+import numpy as np
+from twin4build.logger.Logging import Logging
+
+logger = Logging.get_logger("ai_logfile")
+
+class GradientTape:
+    """
+    Records the local Jacobians of the components between a set of parameters and a set of target measuring devices at each timestep of a simulation (see Simulator.simulate).
+    The gradients of the measured values with respect to all parameters are then computed by a single reverse sweep over the recorded horizon (see self.get_jacobian).
+
+    The local Jacobians are obtained from the "get_subset_gradient" method of the components, e.g. from FMU directional derivatives (see FMUComponent.get_subset_gradient),
+    with respect to the connected inputs and the parameters of each component.
+    Only dependencies within a timestep are included, i.e. sensitivities carried by the internal states of the components (see System.has_state)
+    and by the connections removed to break cycles (see Model.get_removed_connections) are neglected, as in Simulator.get_gradient.
+    The Jacobian is then wrong, so the tape is refused for such models unless "allow_neglected_sensitivities" is True, in which case a warning is logged.
+    """
+    def __init__(self, model, component_list, attr_list, targetMeasuringDevices, allow_neglected_sensitivities=False):
+        assert len(component_list)==len(attr_list), "The arguments component_list and attr_list must have equal lengths"
+        self.model = model
+        self.component_list = component_list
+        self.attr_list = attr_list
+        self.targetMeasuringDevices = list(targetMeasuringDevices)
+        parameter_components = list(dict.fromkeys(component_list))
+        required_components = set()
+        for measuring_device in self.targetMeasuringDevices:
+            required_components.update(model.get_reversed_execution_order(parameter_components, measuring_device))
+        removed_connections = model.get_removed_connections()
+
+        # Components are taped if they send outputs to other required components within the timestep
+        def get_connections(component):
+            return [connection for connection in component.connectedThrough if connection not in removed_connections and connection.connectsSystemAt.connectionPointOf in required_components]
+        self.components = [component for component in model.flat_execution_order if component in required_components and len(get_connections(component))>0]
+        for component in self.components:
+            assert hasattr(component, "get_subset_gradient"), f"The component with id \"{component.id}\" and class \"{component.__class__.__name__}\" does not provide local gradients (get_subset_gradient)"
+        self._check_neglected_sensitivities(required_components, removed_connections, allow_neglected_sensitivities)
+        self.output_keys = {component: list(dict.fromkeys([connection.senderPropertyName for connection in get_connections(component)])) for component in self.components}
+
+        # For each taped component, the connected inputs and the (sender component, sender output index) they are received from
+        self.input_keys = {}
+        self.input_sources = {}
+        for component in self.components:
+            self.input_keys[component] = []
+            self.input_sources[component] = []
+            for connection_point in component.connectsAt:
+                connection = connection_point.connectsSystemThrough
+                sender_component = connection.connectsSystem
+                if connection not in removed_connections and sender_component in self.output_keys:
+                    self.input_keys[component].append(connection_point.receiverPropertyName)
+                    self.input_sources[component].append((sender_component, self.output_keys[sender_component].index(connection.senderPropertyName)))
+
+        # For each taped component, the parameters (attribute names) and their positions in component_list
+        self.parameter_keys = {component: [] for component in self.components}
+        self.parameter_indices = {component: [] for component in self.components}
+        for k, (component, attr) in enumerate(zip(component_list, attr_list)):
+            if component in self.parameter_keys:
+                self.parameter_keys[component].append(attr)
+                self.parameter_indices[component].append(k)
+
+        # The measured value of a target measuring device is its (first) input
+        self.seeds = []
+        for j, measuring_device in enumerate(self.targetMeasuringDevices):
+            measured_property_name = next(iter(measuring_device.input))
+            for connection_point in measuring_device.connectsAt:
+                connection = connection_point.connectsSystemThrough
+                sender_component = connection.connectsSystem
+                if connection_point.receiverPropertyName==measured_property_name and connection not in removed_connections and sender_component in self.output_keys:
+                    self.seeds.append((j, sender_component, self.output_keys[sender_component].index(connection.senderPropertyName)))
+        self.n_timesteps = 0
+
+    def _check_neglected_sensitivities(self, required_components, removed_connections, allow_neglected_sensitivities):
+        stateful_components = [component.id for component in self.model.flat_execution_order if component in required_components and component.has_state()]
+        cycle_connections = [f"{connection.connectsSystem.id} -> {connection.connectsSystemAt.connectionPointOf.id}" for connection in removed_connections if connection.connectsSystem in required_components and connection.connectsSystemAt.connectionPointOf in required_components]
+        if len(stateful_components)==0 and len(cycle_connections)==0:
+            return
+        message = f"The gradient tape neglects the sensitivities carried by the internal states of the components {stateful_components} and by the connections removed to break cycles {cycle_connections}, so the recorded Jacobian is not exact."
+        assert allow_neglected_sensitivities, message + " Use finite differences instead or set allow_neglected_sensitivities=True."
+        logger.warning(message)
+
+    def initialize(self, n_timesteps):
+        """
+        Allocates the tape for a simulation with "n_timesteps" timesteps.
+        """
+        self.n_timesteps = n_timesteps
+        self.step = 0
+        self.input_jacobians = {component: np.zeros((n_timesteps, len(self.output_keys[component]), len(self.input_keys[component]))) for component in self.components}
+        self.parameter_jacobians = {component: np.zeros((n_timesteps, len(self.output_keys[component]), len(self.parameter_keys[component]))) for component in self.components}
+
+    def _get_local_gradient(self, component, x_key):
+        output_keys = self.output_keys[component]
+        grad_dict = component.get_subset_gradient(x_key, y_keys=output_keys, as_dict=True)
+        return [grad_dict.get(key, 0) for key in output_keys]
+
+    def record(self):
+        """
+        Records the local Jacobians of the current timestep. Must be called after all components have been stepped.
+        """
+        for component in self.components:
+            input_jacobian = self.input_jacobians[component][self.step]
+            for i, x_key in enumerate(self.input_keys[component]):
+                input_jacobian[:,i] = self._get_local_gradient(component, x_key)
+            parameter_jacobian = self.parameter_jacobians[component][self.step]
+            for i, x_key in enumerate(self.parameter_keys[component]):
+                parameter_jacobian[:,i] = self._get_local_gradient(component, x_key)
+        self.step += 1
+
+    def get_jacobian(self):
+        """
+        Returns an array with shape (n_timesteps, n_target_measuring_devices, n_parameters) holding the derivatives of the measured values with respect to the parameters at each timestep.
+        All timesteps and target measuring devices are propagated together in a single reverse sweep through the taped components.
+        """
+        n_devices = len(self.targetMeasuringDevices)
+        adjoints = {component: np.zeros((self.n_timesteps, n_devices, len(self.output_keys[component]))) for component in self.components}
+        for j, sender_component, k in self.seeds:
+            adjoints[sender_component][:,j,k] += 1
+        jac = np.zeros((self.n_timesteps, n_devices, len(self.component_list)))
+        for component in reversed(self.components):
+            adjoint = adjoints.pop(component)
+            if len(self.parameter_indices[component])>0:
+                jac[:,:,self.parameter_indices[component]] += np.einsum("tjo,top->tjp", adjoint, self.parameter_jacobians[component])
+            if len(self.input_keys[component])>0:
+                input_adjoint = np.einsum("tjo,toi->tji", adjoint, self.input_jacobians[component])
+                for i, (sender_component, k) in enumerate(self.input_sources[component]):
+                    adjoints[sender_component][:,:,k] += input_adjoint[:,:,i]
+        return jac
@@ -0,0 +1,95 @@
+import numpy as np
+
+class ResultSink:
+    """
+    Destination of the chunks produced by Simulator.simulate_to_sink.
+    "open" is called once before the simulation with the recorded columns, given as (component id, property name) tuples, the start time, the step size and the number of timesteps.
+    "write" is called for each chunk with the timestamps of the chunk and an array with shape (len(dateTimes), n_columns).
+    "close" is called when the simulation has finished or failed.
+    """
+    def open(self, columns, startTime, stepSize, n_timesteps):
+        self.columns = columns
+        self.startTime = startTime
+        self.stepSize = stepSize
+        self.n_timesteps = n_timesteps
+
+    def write(self, dateTimes, values):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+def get_column_names(columns):
+    return [f"{component_id}:{property_name}" for component_id, property_name in columns]
+
+class MemmapSink(ResultSink):
+    """
+    Writes the results to a .npy file through a memory-mapped array with shape (n_timesteps, n_columns), which can be read with np.load(filename, mmap_mode="r").
+    The time of row i is startTime + i*stepSize.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    def open(self, columns, startTime, stepSize, n_timesteps):
+        super().open(columns, startTime, stepSize, n_timesteps)
+        self.array = np.lib.format.open_memmap(self.filename, mode="w+", dtype=np.float64, shape=(n_timesteps, len(columns)))
+        self.index = 0
+
+    def write(self, dateTimes, values):
+        self.array[self.index:self.index+len(values)] = values
+        self.index += len(values)
+
+    def close(self):
+        self.array.flush()
+        del self.array
+
+class HDF5Sink(ResultSink):
+    """
+    Writes the results to the dataset "values" with shape (n_timesteps, n_columns) in a HDF5 file (requires h5py).
+    The column names, the start time and the step size are saved as attributes of the dataset.
+    """
+    def __init__(self, filename, dataset_name="values"):
+        self.filename = filename
+        self.dataset_name = dataset_name
+
+    def open(self, columns, startTime, stepSize, n_timesteps):
+        import h5py
+        super().open(columns, startTime, stepSize, n_timesteps)
+        self.file = h5py.File(self.filename, "w")
+        self.dataset = self.file.create_dataset(self.dataset_name, shape=(n_timesteps, len(columns)), dtype=np.float64)
+        self.dataset.attrs["columns"] = get_column_names(columns)
+        self.dataset.attrs["startTime"] = startTime.isoformat()
+        self.dataset.attrs["stepSize"] = stepSize
+        self.index = 0
+
+    def write(self, dateTimes, values):
+        self.dataset[self.index:self.index+len(values)] = values
+        self.index += len(values)
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink(ResultSink):
+    """
+    Writes the results to a Parquet file with a "time" column (UTC) and one column per recorded property (requires pyarrow).
+    Each chunk is written as a row group.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    def open(self, columns, startTime, stepSize, n_timesteps):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        super().open(columns, startTime, stepSize, n_timesteps)
+        self.pa = pa
+        self.column_names = get_column_names(columns)
+        fields = [pa.field("time", pa.timestamp("s", tz="UTC"))] + [pa.field(name, pa.float64()) for name in self.column_names]
+        self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(self.filename, self.schema)
+
+    def write(self, dateTimes, values):
+        arrays = [self.pa.array(dateTimes, type=self.schema.field("time").type)] + [self.pa.array(values[:,k]) for k in range(values.shape[1])]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
@@ -1,18 +1,21 @@
 from tqdm import tqdm
 import datetime
+import copy
 import math
 import numpy as np
 import pandas as pd
-import george
-from george import kernels
 from fmpy.fmi2 import FMICallException
 import twin4build.saref4bldg.building_space.building_space as building_space
 from twin4build.saref.device.sensor.sensor import Sensor
 from twin4build.saref.device.meter.meter import Meter
 from twin4build.logger.Logging import Logging
-from twin4build.utils.plot import plot
+from twin4build.simulator.component_batch import ComponentBatch, get_batch_class
+from twin4build.simulator.checkpoint import SimulationCheckpoint
+from twin4build.simulator.result_sink import ResultSink
+from twin4build.utils.fmu.fmu_component import FMUComponent
+from twin4build.utils.rsetattr import rsetattr
+from twin4build.utils.rgetattr import rgetattr
 import multiprocessing
-import matplotlib.pyplot as plt
 
 logger = Logging.get_logger("ai_logfile")
 
@@ -24,21 +27,85 @@ class Simulator():
     def __init__(self, 
                 model=None):
         self.model = model
+        self.gradient_tape = None
         logger.info("[Simulator Class] : Entered in Initialise Function")
 
-    def do_component_timestep(self, component):
+    def get_input_transfers(self, model):
+        """
+        Creates self.input_transfers, which maps each component to its cached ingoing connections (see Model._compile_input_connections) 
+        and whether the component requires additional checks or uncertainty propagation (the slow path in self.set_component_inputs).
+        """
+        self.input_transfers = {}
+        for component in model.flat_execution_order:
+            transfers = model.input_connections[component]
+            use_slow_path = isinstance(component, building_space.BuildingSpace) or component.doUncertaintyAnalysis
+            self.input_transfers[component] = (transfers, use_slow_path)
+
+    def set_component_inputs(self, component):
         #Gather all needed inputs for the component through all ingoing connections
-        for connection_point in component.connectsAt:
-            connection = connection_point.connectsSystemThrough
-            connected_component = connection.connectsSystem
-            if isinstance(component, building_space.BuildingSpace):
-                assert np.isnan(connected_component.output[connection.senderPropertyName])==False, f"Model output {connection.senderPropertyName} of component {connected_component.id} is NaN."
-            component.input[connection_point.receiverPropertyName] = connected_component.output[connection.senderPropertyName]
-            if component.doUncertaintyAnalysis:
-                component.inputUncertainty[connection_point.receiverPropertyName] = connected_component.outputUncertainty[connection.senderPropertyName]
+        transfers, use_slow_path = self.input_transfers[component]
+        if use_slow_path:
+            for receiver_property_name, connected_component, sender_property_name in transfers:
+                if isinstance(component, building_space.BuildingSpace):
+                    assert np.isnan(connected_component.output[sender_property_name])==False, f"Model output {sender_property_name} of component {connected_component.id} is NaN."
+                component.input[receiver_property_name] = connected_component.output[sender_property_name]
+                if component.doUncertaintyAnalysis:
+                    component.inputUncertainty[receiver_property_name] = connected_component.outputUncertainty[sender_property_name]
+        else:
+            input_ = component.input
+            for receiver_property_name, connected_component, sender_property_name in transfers:
+                input_[receiver_property_name] = connected_component.output[sender_property_name]
+
+    def do_component_timestep(self, component):
+        self.set_component_inputs(component)
         component.do_step(secondTime=self.secondTime, dateTime=self.dateTime, stepSize=self.stepSize)
-        
-    
+
+    def do_batch_timestep(self, batch):
+        batch.do_transfers()
+        batch.do_step(secondTime=self.secondTime, dateTime=self.dateTime, stepSize=self.stepSize)
+
+    def get_batch_execution_order(self, execution_order, vectorize=False):
+        """
+        Creates the list self.batch_execution_order, which mirrors the given execution order (see Model.execution_order). 
+        Within each component group, components of the same class are collected in a ComponentBatch 
+        if the class implements a vectorized "do_step_batch" method. All other components are stepped individually.
+        The input transfers of each batch are compiled from self.input_transfers (see ComponentBatch.compile_transfers).
+        Must be called after the model has been initialized and after self.get_input_transfers, as the parameters of the batches are stacked here.
+        """
+        self.batch_execution_order = []
+        self.component_batches = []
+        batch_index = {}
+        for component_group in execution_order:
+            components_by_class = {}
+            for component in component_group:
+                if type(component) not in components_by_class:
+                    components_by_class[type(component)] = [component]
+                else:
+                    components_by_class[type(component)].append(component)
+
+            batch_group = []
+            for cls, components in components_by_class.items():
+                if vectorize and len(components)>1 and get_batch_class(cls) is not None and all(component.doUncertaintyAnalysis==False for component in components):
+                    batch = ComponentBatch(components)
+                    batch.initialize()
+                    batch.compile_transfers([self.input_transfers[component][0] for component in components], batch_index)
+                    batch_index.update({component: (batch, i) for i, component in enumerate(components)})
+                    batch_group.append(batch)
+                    self.component_batches.append(batch)
+                else:
+                    batch_group.extend(components)
+            self.batch_execution_order.append(batch_group)
+
+    def fold_constant_components(self):
+        """
+        Removes the components in self.constant_components from self.batch_execution_order. 
+        Must be called after the first timestep, where the outputs of these components have been computed. 
+        The outputs are left unchanged and are still recorded at each timestep.
+        """
+        constant_components = set(self.constant_components)
+        self.batch_execution_order = [[component for component in component_group if component not in constant_components] for component_group in self.batch_execution_order]
+        self.constant_components = []
+
     def do_system_time_step(self, model):
         """
         Do a system time step, i.e. execute the "do_step" method for each component model. 
@@ -48,57 +115,33 @@ class Simulator():
         because they dont require any inputs from each other. 
         However, in python neither threading or multiprocessing yields any performance gains.
         If the framework is implemented in another language, e.g. C++, parallel execution of components is expected to yield significant performance gains. 
-        Another promising option for performance optimization is to group all components with identical classes/models as well as priority and perform a vectorized "do_step" on all such models at once.
-        This can be done in python using numpy or torch.
+        Instead, components with identical classes within the same group are collected in a ComponentBatch (see self.get_batch_execution_order) 
+        and advanced by a single vectorized "do_step_batch" call, if the class supports it.
         """
-        for component_group in model.execution_order:
+        for component_group in self.batch_execution_order:
             for component in component_group:
-                self.do_component_timestep(component)
+                if isinstance(component, ComponentBatch):
+                    self.do_batch_timestep(component)
+                else:
+                    self.do_component_timestep(component)
 
         if self.trackGradients:
             self.get_gradient(self.targetParameters, self.targetMeasuringDevices)
 
-        for component in model.flat_execution_order:
+        if self.gradient_tape is not None:
+            self.gradient_tape.record()
+
+        for component in self.recorded_components:
             component.update_results()
 
     def get_execution_order_reversed(self):
+        """
+        For each target measuring device, self.execution_order_reversed holds the components between the components in self.targetParameters and the device, in reversed execution order.
+        Only these components contribute to the gradients of the device (see Model.get_reversed_execution_order).
+        """
         self.execution_order_reversed = {}
         for targetMeasuringDevice in self.targetMeasuringDevices:
-            n_inputs = {component: len(component.connectsAt) for component in self.model.component_dict.values()}
-            n_outputs = {component: len(component.connectedThrough) for component in self.model.component_dict.values()}
-            target_index = self.model.flat_execution_order.index(targetMeasuringDevice)
-            self.execution_order_reversed[targetMeasuringDevice] = list(reversed(self.model.flat_execution_order[:target_index+1]))[:]
-            items_removed = True
-            while items_removed: # Assumes that a component must have at least 1 input or 1 output in the graph
-                items_removed = False
-                for component in self.execution_order_reversed[targetMeasuringDevice]:
-                    if n_inputs[component]==0: # No inputs
-                        if component not in self.targetParameters.keys():
-                            self.execution_order_reversed[targetMeasuringDevice].remove(component)
-                            for connection in component.connectedThrough:
-                                connection_point = connection.connectsSystemAt
-                                receiver_component = connection_point.connectionPointOf
-                                n_inputs[receiver_component]-=1
-                            items_removed = True
-                    elif n_outputs[component]==0: # No outputs
-                        if component is not targetMeasuringDevice:
-                            self.execution_order_reversed[targetMeasuringDevice].remove(component)
-                            for connection_point in component.connectsAt:
-                                connection = connection_point.connectsSystemThrough
-                                sender_component = connection.connectsSystem
-                                n_outputs[sender_component]-=1
-                            items_removed = True
-                    elif targetMeasuringDevice not in self.model.depth_first_search(component):
-                        self.execution_order_reversed[targetMeasuringDevice].remove(component)
-                        for connection_point in component.connectsAt:
-                            connection = connection_point.connectsSystemThrough
-                            sender_component = connection.connectsSystem
-                            n_outputs[sender_component]-=1
-                        for connection in component.connectedThrough:
-                            connection_point = connection.connectsSystemAt
-                            receiver_component = connection_point.connectionPointOf
-                            n_inputs[receiver_component]-=1
-                        items_removed = True
+            self.execution_order_reversed[targetMeasuringDevice] = self.model.get_reversed_execution_order(self.targetParameters.keys(), targetMeasuringDevice)
 
             # Make parameterGradient dicts to hold values
             for component, attr_list in self.targetParameters.items():
@@ -176,9 +219,28 @@ class Simulator():
         self.secondTimeSteps = [i*stepSize for i in range(n_timesteps)]
         self.dateTimeSteps = [startTime+datetime.timedelta(seconds=i*stepSize) for i in range(n_timesteps)]
     
-    def simulate(self, model, startTime, endTime, stepSize, trackGradients=False, targetParameters=None, targetMeasuringDevices=None, show_progress_bar=True):
+    def get_checkpoint(self, dateTime):
+        """
+        Returns a SimulationCheckpoint holding the current state of the simulated components, which is the state at "dateTime". 
+        The batched states are written back to the components first (see ComponentBatch.write_states).
+        """
+        for batch in self.component_batches:
+            batch.write_states()
+        return SimulationCheckpoint(dateTime=dateTime, stepSize=self.stepSize, states=self.model.get_state(self.flat_execution_order))
+
+    def simulate(self, model, startTime, endTime, stepSize, trackGradients=False, targetParameters=None, targetMeasuringDevices=None, show_progress_bar=True, vectorize=False, record=None, prune=False, gradient_tape=None, checkpoint=None, checkpoint_times=None):
         """
         Simulate the "model" between the dates "startTime" and "endTime" with timestep equal to "stepSize" in seconds.
+        If "vectorize" is True, components of the same class within each execution group are advanced together where supported (see self.get_batch_execution_order). 
+        Batching only pays off for large groups of components, as each batch adds a fixed overhead per timestep.
+        If "record" is provided as a list of (component, property name) tuples, only these inputs/outputs are saved during this simulation (see Model.set_recording_policy). 
+        Otherwise, the recording policy of the model is used.
+        If "prune" is True, only the recorded components and the components upstream of them are simulated (see Model.get_pruned_execution_order). 
+        Furthermore, components with provably constant outputs (see System.has_constant_output) are only stepped once.
+        If "gradient_tape" is provided, the local Jacobians of the taped components are recorded at each timestep (see GradientTape).
+        If "checkpoint" is provided (see SimulationCheckpoint), the simulation is resumed from the saved state, which requires startTime to equal the time of the checkpoint. 
+        If "checkpoint_times" is provided, the state is saved at each of these times in the dictionary self.checkpoints. 
+        The times must coincide with a timestep or with the end of the simulation.
         """
         assert targetParameters is not None and targetMeasuringDevices is not None if trackGradients else True, "Arguments targetParameters and targetMeasuringDevices must be set if trackGradients=True"
         self.model = model
@@ -191,20 +253,249 @@ class Simulator():
         self.trackGradients = trackGradients
         self.targetParameters = targetParameters
         self.targetMeasuringDevices = targetMeasuringDevices
+        self.gradient_tape = gradient_tape
+        if checkpoint is not None:
+            assert startTime==checkpoint.dateTime, f"The argument startTime must equal the time of the checkpoint ({checkpoint.dateTime}) when resuming from a checkpoint"
+        checkpoint_times = set() if checkpoint_times is None else set(checkpoint_times)
+        self.checkpoints = {}
         if trackGradients:
             assert isinstance(targetParameters, dict), "The argument targetParameters must be a dictionary"
             assert isinstance(targetMeasuringDevices, list), "The argument targetMeasuringDevices must be a list of Sensor and Meter objects"
             self.model.set_trackGradient(True)
             self.get_execution_order_reversed()
-        self.model.initialize(startTime=startTime, endTime=endTime, stepSize=stepSize)
+        if record is not None:
+            model_recording_policy = self.model.recording_policy
+            self.model.set_recording_policy(record)
+        if prune:
+            assert self.model.recording_policy is not None, "A recording policy must be set, e.g. through the \"record\" argument, if prune=True"
+            target_components = [component for component, property_name in self.model.recording_policy]
+            if trackGradients:
+                target_components.extend(targetMeasuringDevices)
+            self.execution_order = self.model.get_pruned_execution_order(target_components)
+        else:
+            self.execution_order = self.model.execution_order
+        self.flat_execution_order = [component for component_group in self.execution_order for component in component_group]
         self.get_simulation_timesteps(startTime, endTime, stepSize)
-        logger.info("Running simulation")
-        if show_progress_bar:
-            for self.secondTime, self.dateTime in tqdm(zip(self.secondTimeSteps,self.dateTimeSteps), total=len(self.dateTimeSteps)):
-                self.do_system_time_step(self.model)
+        self.model.initialize(startTime=startTime, endTime=endTime, stepSize=stepSize, n_timesteps=len(self.secondTimeSteps), components=self.flat_execution_order)
+        if checkpoint is not None:
+            self.model.set_state(checkpoint.states, components=self.flat_execution_order)
+        self.get_input_transfers(self.model)
+        self.get_batch_execution_order(self.execution_order, vectorize=vectorize)
+        self.recorded_components = [component for component in self.flat_execution_order if component.is_recording()]
+        if gradient_tape is not None:
+            gradient_tape.initialize(len(self.secondTimeSteps))
+        if prune:
+            self.constant_components = [component for component in self.flat_execution_order if len(component.connectsAt)==0 and component.has_constant_output(startTime, endTime, stepSize)]
         else:
-            for self.secondTime, self.dateTime in zip(self.secondTimeSteps,self.dateTimeSteps):
+            self.constant_components = []
+        logger.info("Running simulation")
+        try:
+            timesteps = zip(self.secondTimeSteps, self.dateTimeSteps)
+            if show_progress_bar:
+                timesteps = tqdm(timesteps, total=len(self.dateTimeSteps))
+            for self.secondTime, self.dateTime in timesteps:
+                if self.dateTime in checkpoint_times:
+                    self.checkpoints[self.dateTime] = self.get_checkpoint(self.dateTime)
                 self.do_system_time_step(self.model)
+                if len(self.constant_components)>0:
+                    self.fold_constant_components()
+        finally:
+            if record is not None:
+                self.model.set_recording_policy(model_recording_policy)
+
+        for batch in self.component_batches:
+            batch.write_states()
+        final_dateTime = startTime+datetime.timedelta(seconds=len(self.secondTimeSteps)*stepSize)
+        if final_dateTime in checkpoint_times:
+            self.checkpoints[final_dateTime] = self.get_checkpoint(final_dateTime)
+        assert len(self.checkpoints)==len(checkpoint_times), "All checkpoint_times must coincide with a timestep or with the end of the simulation"
+
+    def _get_ensemble_replica(self, component, memo):
+        """
+        Returns an independent copy of "component" used as one member of an ensemble (see self.simulate_ensemble). 
+        All objects in "memo" (other components, connections and connection points) are shared with the original component instead of being copied. 
+        FMU instances cannot be copied. Instead, each replica instantiates its own FMU when initialized.
+        """
+        memo = memo.copy()
+        del memo[id(component)]
+        if isinstance(component, FMUComponent):
+            for attr in ["fmu", "fmu_initial_state"]:
+                if hasattr(component, attr):
+                    memo[id(getattr(component, attr))] = None
+        replica = copy.deepcopy(component, memo)
+        if isinstance(replica, FMUComponent):
+            replica.INITIALIZED = False
+        replica.clear_results()
+        replica.set_recorded_properties([])
+        return replica
+
+    def simulate_ensemble(self, model, parameter_sets, component_list, attr_list, startTime, endTime, stepSize, record, show_progress_bar=True, vectorize=False):
+        """
+        Simulate the "model" for all parameter sets in "parameter_sets" (array with shape (n_sets, n_parameters)) in a single pass over the time loop. 
+        The parameters are assigned to the attributes in "component_list" and "attr_list" as in Model.set_parameters_from_array.
+        The components affected by the parameters, i.e. the components in "component_list" and all components downstream of them, are replicated once for each parameter set. 
+        All other components are simulated once and shared by the replicas. 
+        If "vectorize" is True, replicas of the same class are advanced together where supported (see self.get_batch_execution_order), 
+        such that the parameter sets form the batch dimension of the vectorized components.
+        Only the components in "record" and the components upstream of them are simulated (see Model.get_pruned_execution_order).
+        The original components are left unchanged and no simulation results are saved. 
+        Instead, an array with shape (n_sets, n_timesteps, len(record)) holding the values of the recorded (component, property name) tuples is returned.
+        """
+        parameter_sets = np.atleast_2d(np.asarray(parameter_sets, dtype=np.float64))
+        assert parameter_sets.shape[1]==len(component_list) and len(component_list)==len(attr_list), "The arguments parameter_sets, component_list and attr_list must have matching lengths"
+        assert startTime.tzinfo is not None, "The argument startTime must have a timezone"
+        assert endTime.tzinfo is not None, "The argument endTime must have a timezone"
+        assert isinstance(stepSize, int), "The argument stepSize must be an integer"
+        for component, property_name in record:
+            assert component.id in model.component_dict, f"The component \"{component.id}\" is not part of the model"
+            assert property_name in component.input or property_name in component.output, f"The component \"{component.id}\" has no input or output named \"{property_name}\""
+        self.model = model
+        self.startTime = startTime
+        self.endTime = endTime
+        self.stepSize = stepSize
+        self.trackGradients = False
+        self.targetParameters = None
+        self.targetMeasuringDevices = None
+        self.gradient_tape = None
+        n_sets = parameter_sets.shape[0]
+
+        self.execution_order = model.get_pruned_execution_order([component for component, property_name in record])
+        required_components = [component for component_group in self.execution_order for component in component_group]
+        varying_components = set()
+        for component in component_list:
+            if component not in varying_components:
+                varying_components.update(model._depth_first_search_system(component))
+        shared_components = [component for component in required_components if component not in varying_components]
+        varying_components = [component for component in required_components if component in varying_components]
+
+        self.get_simulation_timesteps(startTime, endTime, stepSize)
+        model.initialize(startTime=startTime, endTime=endTime, stepSize=stepSize, components=shared_components)
+
+        # Replicas are copied after Model.initialize, which sets the initial values of all components
+        memo = {id(model): model}
+        for component in model.component_dict.values():
+            memo[id(component)] = component
+            for connection_point in component.connectsAt:
+                memo[id(connection_point)] = connection_point
+            for connection in component.connectedThrough:
+                memo[id(connection)] = connection
+        replicas = {component: [self._get_ensemble_replica(component, memo) for j in range(n_sets)] for component in varying_components}
+        for j, parameter_set in enumerate(parameter_sets):
+            for p, component, attr in zip(parameter_set, component_list, attr_list):
+                if component in replicas:
+                    rsetattr(replicas[component][j], attr, p)
+        for component in varying_components:
+            for replica in replicas[component]:
+                replica.initialize(startTime=startTime,
+                                    endTime=endTime,
+                                    stepSize=stepSize,
+                                    model=model)
+
+        # Replica j receives its inputs from replica j of each varying sender component
+        self.get_input_transfers(model)
+        for component in varying_components:
+            transfers, use_slow_path = self.input_transfers.pop(component)
+            for j, replica in enumerate(replicas[component]):
+                replica_transfers = tuple((receiver_property_name, replicas[sender_component][j] if sender_component in replicas else sender_component, sender_property_name) for receiver_property_name, sender_component, sender_property_name in transfers)
+                self.input_transfers[replica] = (replica_transfers, use_slow_path)
+
+        ensemble_execution_order = [[replica for component in component_group for replica in replicas.get(component, [component])] for component_group in self.execution_order]
+        self.flat_execution_order = [component for component_group in ensemble_execution_order for component in component_group]
+        self.get_batch_execution_order(ensemble_execution_order, vectorize=vectorize)
+        self.recorded_components = []
+        self.constant_components = [component for component in shared_components if len(component.connectsAt)==0 and component.has_constant_output(startTime, endTime, stepSize)]
+
+        record_sources = [(replicas.get(component, [component]), property_name, property_name in component.input) for component, property_name in record]
+        y = np.zeros((n_sets, len(self.secondTimeSteps), len(record)))
+        logger.info("Running ensemble simulation")
+        timesteps = zip(self.secondTimeSteps, self.dateTimeSteps)
+        if show_progress_bar:
+            timesteps = tqdm(timesteps, total=len(self.dateTimeSteps))
+        for i, (self.secondTime, self.dateTime) in enumerate(timesteps):
+            self.do_system_time_step(model)
+            if len(self.constant_components)>0:
+                self.fold_constant_components()
+            for k, (sources, property_name, is_input) in enumerate(record_sources):
+                y[:,i,k] = [source.input[property_name] if is_input else source.output[property_name] for source in sources]
+        return y
+
+    def simulate_stream(self, model, startTime, endTime, stepSize, record, chunk_size=1000, show_progress_bar=True, vectorize=False, checkpoint=None):
+        """
+        Generator that simulates the "model" between the dates "startTime" and "endTime" with timestep equal to "stepSize" in seconds, 
+        and yields the values of the recorded (component, property name) tuples in "record" in chunks of at most "chunk_size" timesteps. 
+        Each chunk is a tuple (dateTimes, values), where "values" is an array with shape (len(dateTimes), len(record)).
+        In contrast to self.simulate, the timesteps are generated as the time loop advances and no simulation results are saved in the components, 
+        such that the memory used for results is bounded by the chunk size regardless of the length of the simulation period.
+        Only the components in "record" and the components upstream of them are simulated (see Model.get_pruned_execution_order).
+        If "checkpoint" is provided, the simulation is resumed from it as in self.simulate. 
+        When the generator is exhausted, the final state can be saved with self.get_checkpoint.
+        """
+        assert startTime.tzinfo is not None, "The argument startTime must have a timezone"
+        assert endTime.tzinfo is not None, "The argument endTime must have a timezone"
+        assert isinstance(stepSize, int), "The argument stepSize must be an integer"
+        assert isinstance(chunk_size, int) and chunk_size>0, "The argument chunk_size must be a positive integer"
+        for component, property_name in record:
+            assert component.id in model.component_dict, f"The component \"{component.id}\" is not part of the model"
+            assert property_name in component.input or property_name in component.output, f"The component \"{component.id}\" has no input or output named \"{property_name}\""
+        if checkpoint is not None:
+            assert startTime==checkpoint.dateTime, f"The argument startTime must equal the time of the checkpoint ({checkpoint.dateTime}) when resuming from a checkpoint"
+        self.model = model
+        self.startTime = startTime
+        self.endTime = endTime
+        self.stepSize = stepSize
+        self.trackGradients = False
+        self.targetParameters = None
+        self.targetMeasuringDevices = None
+        self.gradient_tape = None
+        n_timesteps = math.floor((endTime-startTime).total_seconds()/stepSize)
+
+        self.execution_order = model.get_pruned_execution_order([component for component, property_name in record])
+        self.flat_execution_order = [component for component_group in self.execution_order for component in component_group]
+        model.initialize(startTime=startTime, endTime=endTime, stepSize=stepSize, components=self.flat_execution_order)
+        if checkpoint is not None:
+            model.set_state(checkpoint.states, components=self.flat_execution_order)
+        self.get_input_transfers(model)
+        self.get_batch_execution_order(self.execution_order, vectorize=vectorize)
+        self.recorded_components = []
+        self.constant_components = [component for component in self.flat_execution_order if len(component.connectsAt)==0 and component.has_constant_output(startTime, endTime, stepSize)]
+
+        record_sources = [(component.input if property_name in component.input else component.output, property_name) for component, property_name in record]
+        logger.info("Running streaming simulation")
+        progress_bar = tqdm(total=n_timesteps) if show_progress_bar else None
+        try:
+            for chunk_start in range(0, n_timesteps, chunk_size):
+                n_chunk = min(chunk_size, n_timesteps-chunk_start)
+                dateTimes = []
+                values = np.empty((n_chunk, len(record)))
+                for i in range(n_chunk):
+                    self.secondTime = (chunk_start+i)*stepSize
+                    self.dateTime = startTime+datetime.timedelta(seconds=self.secondTime)
+                    self.do_system_time_step(model)
+                    if len(self.constant_components)>0:
+                        self.fold_constant_components()
+                    values[i] = [source[property_name] for source, property_name in record_sources]
+                    dateTimes.append(self.dateTime)
+                if progress_bar is not None:
+                    progress_bar.update(n_chunk)
+                yield dateTimes, values
+        finally:
+            if progress_bar is not None:
+                progress_bar.close()
+        for batch in self.component_batches:
+            batch.write_states()
+
+    def simulate_to_sink(self, model, startTime, endTime, stepSize, record, sink, chunk_size=1000, show_progress_bar=True, vectorize=False, checkpoint=None):
+        """
+        Runs self.simulate_stream and writes each chunk to "sink" (see ResultSink), e.g. a MemmapSink, HDF5Sink or ParquetSink.
+        """
+        assert isinstance(sink, ResultSink), "The argument sink must be a ResultSink"
+        n_timesteps = math.floor((endTime-startTime).total_seconds()/stepSize)
+        sink.open([(component.id, property_name) for component, property_name in record], startTime, stepSize, n_timesteps)
+        try:
+            for dateTimes, values in self.simulate_stream(model, startTime, endTime, stepSize, record, chunk_size=chunk_size, show_progress_bar=show_progress_bar, vectorize=vectorize, checkpoint=checkpoint):
+                sink.write(dateTimes, values)
+        finally:
+            sink.close()
 
     def get_simulation_readings(self):
         df_simulation_readings = pd.DataFrame()
@@ -322,16 +613,20 @@ class Simulator():
                                 trackGradients=False,
                                 targetParameters=self.targetParameters,
                                 targetMeasuringDevices=self.targetMeasuringDevices,
-                                show_progress_bar=False)
+                                show_progress_bar=False,
+                                record=self.record,
+                                prune=True)
                 n_time = len(self.dateTimeSteps)
                 for j, measuring_device in enumerate(self.targetMeasuringDevices):
-                    simulation_readings = np.array(next(iter(measuring_device.savedInput.values())))
+                    simulation_readings = np.asarray(next(iter(measuring_device.savedInput.values())))
                     y_model[n_time_prev:n_time_prev+n_time,j] = simulation_readings
         except FMICallException as inst:
             return None
         return (None, y_model, None)
 
     def _sim_func_gaussian_process(self, model, theta, startTime, endTime, stepSize):
+        import george
+        from george import kernels
         try:
             n_par = model.chain_log["n_par"]
             n_par_map = model.chain_log["n_par_map"]
@@ -355,10 +650,12 @@ class Simulator():
                                 trackGradients=False,
                                 targetParameters=self.targetParameters,
                                 targetMeasuringDevices=self.targetMeasuringDevices,
-                                show_progress_bar=False)
+                                show_progress_bar=False,
+                                record=self.record,
+                                prune=True)
                 
                 for measuring_device in self.targetMeasuringDevices:
-                    simulation_readings_train[measuring_device.id].append(np.array(next(iter(measuring_device.savedInput.values()))))#self.targetMeasuringDevices[measuring_device]["scale_factor"])
+                    simulation_readings_train[measuring_device.id].append(np.asarray(next(iter(measuring_device.savedInput.values()))))#self.targetMeasuringDevices[measuring_device]["scale_factor"])
                     actual_readings_train[measuring_device.id].append(df_actual_readings_train[measuring_device.id].to_numpy())#self.targetMeasuringDevices[measuring_device]["scale_factor"])
                     x = self.gp_inputs[measuring_device.id]
                     x_train[measuring_device.id].append(x)
@@ -385,7 +682,9 @@ class Simulator():
                                 trackGradients=False,
                                 targetParameters=self.targetParameters,
                                 targetMeasuringDevices=self.targetMeasuringDevices,
-                                show_progress_bar=False)
+                                show_progress_bar=False,
+                                record=self.record,
+                                prune=True)
                 
                 self.get_gp_inputs(self.targetMeasuringDevices, startTime=startTime_, endTime=endTime_, stepSize=stepSize_, t_only=False)
                 n_time = len(self.dateTimeSteps)
@@ -393,7 +692,7 @@ class Simulator():
                 for j, measuring_device in enumerate(self.targetMeasuringDevices):
                     x = self.gp_inputs[measuring_device.id]
                     n = n_par_map[measuring_device.id]
-                    simulation_readings = np.array(next(iter(measuring_device.savedInput.values())))                    
+                    simulation_readings = np.asarray(next(iter(measuring_device.savedInput.values())))                    
                     scale_lengths = theta_kernel[n_prev:n_prev+n]
                     a = scale_lengths[0]
                     scale_lengths = scale_lengths[1:]
@@ -419,19 +718,56 @@ class Simulator():
 
         return (y, y_model, y_noise)
     
+    def _sim_func_ensemble(self, model, parameter_sets, startTime, endTime, stepSize):
+        """
+        Counterpart of self._sim_func, which simulates all parameter sets at once (see self.simulate_ensemble). 
+        Returns a list with one (None, y_model, None) tuple for each parameter set.
+        A failing parameter set stops the time loop of the whole ensemble. 
+        The parameter sets are then simulated one by one with self._sim_func, such that only the failing sets are returned as None.
+        """
+        targetParameters = self.targetParameters
+        targetMeasuringDevices = self.targetMeasuringDevices
+        try:
+            y_model = [self.simulate_ensemble(model,
+                                            parameter_sets[:,self.theta_mask],
+                                            self.flat_component_list,
+                                            self.flat_attr_list,
+                                            startTime=startTime_,
+                                            endTime=endTime_,
+                                            stepSize=stepSize_,
+                                            record=self.record,
+                                            show_progress_bar=False) for startTime_, endTime_, stepSize_  in zip(startTime, endTime, stepSize)]
+            y_model = np.concatenate(y_model, axis=1)
+        except FMICallException as inst:
+            logger.info(f"[Simulator Class] : Ensemble simulation failed ({inst}). Simulating the parameter sets one by one.")
+            # self.simulate_ensemble resets the targets used by self._sim_func
+            self.targetParameters = targetParameters
+            self.targetMeasuringDevices = targetMeasuringDevices
+            parameters = [rgetattr(component, attr) for component, attr in zip(self.flat_component_list, self.flat_attr_list)]
+            y_list = [self._sim_func(model, parameter_set, startTime, endTime, stepSize) for parameter_set in parameter_sets]
+            model.set_parameters_from_array(parameters, self.flat_component_list, self.flat_attr_list)
+            return y_list
+        return [(None, y, None) for y in y_model]
+
     def _sim_func_wrapped(self, args):
             return self._sim_func(*args)
     
     def _sim_func_wrapped_gaussian_process(self, args):
         return self._sim_func_gaussian_process(*args)
     
-    def run_emcee_inference(self, model, targetParameters, targetMeasuringDevices, startTime, endTime, stepSize, show=False, assume_uncorrelated_noise=True, burnin=None):
+    def run_emcee_inference(self, model, targetParameters, targetMeasuringDevices, startTime, endTime, stepSize, show=False, assume_uncorrelated_noise=True, burnin=None, ensemble=False):
+        """
+        If "ensemble" is True, all sampled parameter sets are simulated in a single ensemble simulation (see self.simulate_ensemble) instead of in separate processes. 
+        This is only supported if assume_uncorrelated_noise=True.
+        """
+        assert assume_uncorrelated_noise or ensemble==False, "The argument ensemble=True is only supported if assume_uncorrelated_noise=True"
         self.model = model
         self.startTime = startTime
         self.endTime = endTime
         self.stepSize = stepSize
         self.targetParameters = targetParameters
         self.targetMeasuringDevices = targetMeasuringDevices
+        self.record = [(measuring_device, next(iter(measuring_device.input))) for measuring_device in targetMeasuringDevices]
         n_samples_max = 100
 
         parameter_chain = model.chain_log["chain.x"][burnin:,0,:,:]
@@ -463,16 +799,35 @@ class Simulator():
 
         del model.chain_log
 
-        n_cores = 4#multiprocessing.cpu_count()
-        pool = multiprocessing.Pool(n_cores, maxtasksperchild=100) #maxtasksperchild is set because FMUs are leaking memory
-        chunksize = 1#math.ceil(len(args)/n_cores)
-        # self.model._set_addUncertainty(True)
-        self.model.make_pickable()
-        y_list = list(tqdm(pool.imap(sim_func, args, chunksize=chunksize), total=len(args)))
-        # y_list = [sim_func(arg) for arg in args]
-        
-        # y_list = [self._sim_func_wrapped(arg) for arg in args]
-        pool.close()
+        if ensemble:
+            y_list = self._sim_func_ensemble(model, parameter_chain_sampled, startTime, endTime, stepSize)
+        else:
+            n_cores = 4#multiprocessing.cpu_count()
+            chunksize = 1#math.ceil(len(args)/n_cores)
+            # self.model._set_addUncertainty(True)
+            self.model.make_pickable()
+            # The time series data is loaded once and shared with the worker processes instead of being copied with each task (see Model.share_data)
+            for startTime_, endTime_, stepSize_  in zip(startTime, endTime, stepSize):
+                self.model.cache(startTime=startTime_,
+                                endTime=endTime_,
+                                stepSize=stepSize_)
+            # The pool and the shared memory blocks are released if the inference fails or is interrupted
+            try:
+                self.model.share_data()
+                pool = multiprocessing.Pool(n_cores, maxtasksperchild=100) #maxtasksperchild is set because FMUs are leaking memory
+                try:
+                    y_list = list(tqdm(pool.imap(sim_func, args, chunksize=chunksize), total=len(args)))
+                    # y_list = [sim_func(arg) for arg in args]
+                    
+                    # y_list = [self._sim_func_wrapped(arg) for arg in args]
+                    pool.close()
+                except BaseException:
+                    pool.terminate()
+                    raise
+                finally:
+                    pool.join()
+            finally:
+                self.model.release_shared_data()
         # self.model._set_addUncertainty(False)
         y_list = [el for el in y_list if el is not None]
 
@@ -542,6 +897,7 @@ class Simulator():
 
 
         ydata = np.array(ydata).transpose()
+        from twin4build.utils.plot import plot
         fig, axes = plot.plot_emcee_inference(intervals, time, ydata, show=show)
         
         return fig, axes
@@ -577,7 +933,7 @@ class Simulator():
                         targetMeasuringDevices=targetMeasuringDevices, show_progress_bar=False)
             predictions = np.zeros((len(time), len(targetMeasuringDevices)))
             for i, measuring_device in enumerate(targetMeasuringDevices):
-                simulation_readings = np.array(next(iter(measuring_device.savedInput.values())))
+                simulation_readings = np.asarray(next(iter(measuring_device.savedInput.values())))
                 predictions[:, i] = simulation_readings
 
         except FMICallException as inst:
@@ -590,6 +946,7 @@ class Simulator():
         ydata = np.array(ydata).transpose()
 
         if show and predictions is not None:
+            from twin4build.utils.plot import plot
             fig, axes = plot.plot_ls_inference(predictions, time, ydata, targetMeasuringDevices)
             return fig, axes
         
@@ -0,0 +1,80 @@
+import os
+import sys
+import datetime
+import unittest
+import numpy as np
+from dateutil import tz
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+from twin4build.simulator.checkpoint import SimulationCheckpoint
+
+def fcn(self):
+    setpoint_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0.3,
+                                            "ruleset_start_minute": [0,0],
+                                            "ruleset_end_minute": [0,0],
+                                            "ruleset_start_hour": [6,12],
+                                            "ruleset_end_hour": [12,22],
+                                            "ruleset_value": [0.6,0.4]},
+                                        add_noise=False,
+                                        id="Setpoint schedule")
+    actual_value_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0.25,
+                                            "ruleset_start_minute": [0,0],
+                                            "ruleset_end_minute": [0,0],
+                                            "ruleset_start_hour": [8,16],
+                                            "ruleset_end_hour": [16,20],
+                                            "ruleset_value": [0.5,0.45]},
+                                        add_noise=False,
+                                        id="Actual value schedule")
+    valve = tb.ValveSystem(waterFlowRateMax=0.1,
+                            valveAuthority=0.8,
+                            id="Valve")
+    flow_sensor = tb.SensorSystem(id="Flow sensor")
+    observed_property = tb.Temperature()
+    observed_property.isPropertyOf = actual_value_schedule
+    for i in range(2):
+        controller = tb.ControllerSystem(observes=observed_property, K_p=0.1*(i+1), K_i=0.05, K_d=0, id=f"Controller {i}")
+        self.add_connection(setpoint_schedule, controller, "scheduleValue", "setpointValue")
+        self.add_connection(actual_value_schedule, controller, "scheduleValue", "actualValue")
+    self.add_connection(controller, valve, "inputSignal", "valvePosition")
+    self.add_connection(valve, flow_sensor, "waterFlowRate", "waterFlowRate")
+
+class TestCheckpoint(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_checkpoint(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        checkpointTime = datetime.datetime(year=2021, month=1, day=11, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        endTime = datetime.datetime(year=2021, month=1, day=12, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_checkpoint", saveSimulationResult=True, graph_rendering="none")
+        model.load_model(infer_connections=False, fcn=fcn, do_load_parameters=False)
+        controllers = [model.component_dict[f"Controller {i}"] for i in range(2)]
+        flow_sensor = model.component_dict["Flow sensor"]
+        simulator = tb.Simulator()
+
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, vectorize=True, checkpoint_times=[checkpointTime])
+        n = len(simulator.dateTimeSteps)//2
+        expected = {controller: np.array(controller.savedOutput["inputSignal"])[n:] for controller in controllers}
+        expected_waterFlowRate = np.array(flow_sensor.savedInput["waterFlowRate"])[n:]
+        checkpoint = simulator.checkpoints[checkpointTime]
+
+        # Save and restore the checkpoint from disk
+        filename = model.get_dir(folder_list=["checkpoints"], filename="checkpoint.pickle")[0]
+        checkpoint.save(filename)
+        checkpoint = SimulationCheckpoint.load(filename)
+        self.assertEqual(checkpoint.dateTime, checkpointTime)
+
+        # Resuming from the checkpoint continues the first simulation
+        simulator.simulate(model, stepSize=stepSize, startTime=checkpointTime, endTime=endTime, show_progress_bar=False, vectorize=True, checkpoint=checkpoint)
+        self.assertEqual(len(simulator.component_batches), 1)
+        for controller in controllers:
+            np.testing.assert_allclose(np.array(controller.savedOutput["inputSignal"]), expected[controller])
+        np.testing.assert_allclose(np.array(flow_sensor.savedInput["waterFlowRate"]), expected_waterFlowRate)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import sys
+import datetime
+import unittest
+import numpy as np
+from dateutil import tz
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+from twin4build.simulator.component_batch import ComponentBatch
+
+def fcn(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0,
+                                            "ruleset_start_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_end_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_start_hour": [6,7,8,12,14,16,18],
+                                            "ruleset_end_hour": [7,8,12,14,16,18,22],
+                                            "ruleset_value": [0,0.1,1,0,0,0.5,0.7]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    position_schedule_2 = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0.3,
+                                            "ruleset_start_minute": [0,0],
+                                            "ruleset_end_minute": [0,0],
+                                            "ruleset_start_hour": [8,14],
+                                            "ruleset_end_hour": [12,20],
+                                            "ruleset_value": [0.6,0.9]},
+                                        add_noise=False,
+                                        id="Position schedule 2")
+    setpoint_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0.5,
+                                            "ruleset_start_minute": [0],
+                                            "ruleset_end_minute": [0],
+                                            "ruleset_start_hour": [6],
+                                            "ruleset_end_hour": [18],
+                                            "ruleset_value": [1.5]},
+                                        add_noise=False,
+                                        id="Setpoint schedule")
+    for i in range(5):
+        damper = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1+0.2*i),
+                                a=1+i,
+                                id=f"Damper {i}")
+        # The dampers receive their positions from different schedules, and the controllers receive their actual values from the batched dampers
+        self.add_connection(position_schedule if i%2==0 else position_schedule_2, damper, "scheduleValue", "damperPosition")
+        observed_property = tb.Temperature()
+        observed_property.isPropertyOf = damper
+        controller = tb.ControllerSystem(observes=observed_property, K_p=0.1*(i+1), K_i=0.05, K_d=0, id=f"Controller {i}")
+        self.add_connection(setpoint_schedule, controller, "scheduleValue", "setpointValue")
+        self.add_connection(damper, controller, "airFlowRate", "actualValue")
+
+def get_space_heaters(n):
+    space_heaters = []
+    for i in range(n):
+        space_heater = tb.SpaceHeaterSystem(heatTransferCoefficient=60+10*i,
+                                            thermalMassHeatCapacity=tb.PropertyValue(hasValue=2e6+2e5*i),
+                                            temperatureClassification=tb.PropertyValue("45/30-21"),
+                                            id=f"Space heater {i}")
+        space_heater.output["outletWaterTemperature"] = 21
+        space_heater.initialize()
+        space_heaters.append(space_heater)
+    return space_heaters
+
+def get_heat_recoveries(n):
+    heat_recoveries = []
+    for i in range(n):
+        heat_recovery = tb.AirToAirHeatRecoverySystem(eps_75_h=0.7+0.02*i,
+                                                    eps_75_c=0.6+0.02*i,
+                                                    eps_100_h=0.8+0.02*i,
+                                                    eps_100_c=0.7+0.02*i,
+                                                    id=f"Heat recovery {i}")
+        # The maximum flow rates are set as the estimated parameters are (see AirToAirHeatRecoverySystem.batch_parameters)
+        heat_recovery.primaryAirFlowRateMax.hasValue = 1+0.5*i
+        heat_recovery.secondaryAirFlowRateMax.hasValue = 1.5+0.25*i
+        heat_recovery.initialize()
+        heat_recoveries.append(heat_recovery)
+    return heat_recoveries
+
+def compare_batch(components, components_batch, inputs, stepSize):
+    """
+    Steps "components" with do_step and "components_batch" as a ComponentBatch with the same inputs and checks that all outputs are equal.
+    "inputs" is a list with one dictionary of input arrays (one value for each component) for each timestep.
+    """
+    batch = ComponentBatch(components_batch)
+    batch.initialize()
+    for input_ in inputs:
+        for key, values in input_.items():
+            for component, component_batch, value in zip(components, components_batch, values.tolist()):
+                component.input[key] = value
+                component_batch.input[key] = value
+        for component in components:
+            component.do_step(stepSize=stepSize)
+        batch.do_step(stepSize=stepSize)
+        for component, component_batch in zip(components, components_batch):
+            for key, value in component.output.items():
+                np.testing.assert_allclose(np.array(component_batch.output[key], dtype=np.float64), np.array(value, dtype=np.float64), rtol=1e-12, err_msg=f"{component.id}: {key}")
+
+class TestComponentBatch(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_component_batch(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen")) 
+        endTime = datetime.datetime(year=2021, month=1, day=12, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_component_batch", saveSimulationResult=True)
+        model.load_model(infer_connections=False, fcn=fcn)
+        simulator = tb.Simulator()
+
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, vectorize=False)
+        expected = {component.id: np.array(component.savedOutput["airFlowRate"]) for component in model.component_dict.values() if isinstance(component, tb.DamperSystem)}
+        expected_inputSignal = {component.id: np.array(component.savedOutput["inputSignal"]) for component in model.component_dict.values() if isinstance(component, tb.ControllerSystem)}
+
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, vectorize=True)
+        self.assertEqual(len(simulator.component_batches), 2)
+        self.assertEqual([len(batch) for batch in simulator.component_batches], [5, 5])
+        damper_batch, controller_batch = simulator.component_batches
+        self.assertEqual([len(senders) for key, values, senders, sender_property_names, upstream_batch, indices in damper_batch.transfers], [5])
+        self.assertEqual({key: upstream_batch for key, values, senders, sender_property_names, upstream_batch, indices in controller_batch.transfers}, {"setpointValue": None, "actualValue": damper_batch})
+        for id_, airFlowRate in expected.items():
+            self.assertTrue(np.allclose(np.array(model.component_dict[id_].savedOutput["airFlowRate"]), airFlowRate))
+        for id_, inputSignal in expected_inputSignal.items():
+            self.assertTrue(np.allclose(np.array(model.component_dict[id_].savedOutput["inputSignal"]), inputSignal))
+
+    @unittest.skipIf(False, 'Currently not used')
+    def test_space_heater_batch(self):
+        n = 6
+        random_state = np.random.RandomState(0)
+        inputs = [{"supplyWaterTemperature": random_state.uniform(30, 60, n),
+                   "waterFlowRate": np.where(random_state.uniform(size=n)<0.2, 0, random_state.uniform(0, 0.02, n)),
+                   "indoorTemperature": random_state.uniform(18, 24, n)} for k in range(20)]
+        compare_batch(get_space_heaters(n), get_space_heaters(n), inputs, stepSize=600)
+
+    @unittest.skipIf(False, 'Currently not used')
+    def test_air_to_air_heat_recovery_batch(self):
+        n = 6
+        random_state = np.random.RandomState(0)
+        inputs = []
+        for k in range(40):
+            # Zero, below tolerance and regular flow rates
+            primaryAirFlowRate = random_state.choice([0, 1e-6, 0.5, 1, 1.5, 2], n)
+            secondaryAirFlowRate = random_state.choice([0, 1e-6, 0.5, 1, 1.5, 2], n)
+            inputs.append({"primaryTemperatureIn": random_state.uniform(-5, 30, n),
+                           "secondaryTemperatureIn": random_state.uniform(15, 25, n),
+                           "primaryAirFlowRate": primaryAirFlowRate,
+                           "secondaryAirFlowRate": secondaryAirFlowRate,
+                           "primaryTemperatureOutSetpoint": random_state.uniform(15, 25, n)})
+        # The inputs cover all combinations of the feasible mode and the operation mode with flow
+        has_flow = np.array([(input_["primaryAirFlowRate"]>1e-5) & (input_["secondaryAirFlowRate"]>1e-5) for input_ in inputs])
+        is_feasible_heating = np.array([input_["primaryTemperatureIn"]<input_["secondaryTemperatureIn"] for input_ in inputs])
+        is_operation_heating = np.array([input_["primaryTemperatureIn"]<input_["primaryTemperatureOutSetpoint"] for input_ in inputs])
+        for feasible_heating in [True, False]:
+            for operation_heating in [True, False]:
+                self.assertTrue(np.any(has_flow & (is_feasible_heating==feasible_heating) & (is_operation_heating==operation_heating)))
+        self.assertTrue(np.any(has_flow==False))
+        compare_batch(get_heat_recoveries(n), get_heat_recoveries(n), inputs, stepSize=600)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import datetime
+import types
+import unittest
+import numpy as np
+from dateutil import tz
+from fmpy.fmi2 import FMICallException
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+from twin4build.simulator.component_batch import ComponentBatch
+
+def fcn(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0,
+                                            "ruleset_start_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_end_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_start_hour": [6,7,8,12,14,16,18],
+                                            "ruleset_end_hour": [7,8,12,14,16,18,22],
+                                            "ruleset_value": [0,0.1,1,0,0,0.5,0.7]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    damper = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper")
+    self.add_connection(position_schedule, damper, "scheduleValue", "damperPosition")
+
+def do_step_failing(self, secondTime=None, dateTime=None, stepSize=None):
+    """
+    DamperSystem.do_step, which fails like an FMU for values of "a" above 5.
+    """
+    if self.a>5:
+        raise FMICallException("fmi2DoStep", 3)
+    tb.DamperSystem.do_step(self, secondTime=secondTime, dateTime=dateTime, stepSize=stepSize)
+
+def fcn_failing(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0,
+                                            "ruleset_start_minute": [0,0],
+                                            "ruleset_end_minute": [0,0],
+                                            "ruleset_start_hour": [6,12],
+                                            "ruleset_end_hour": [12,22],
+                                            "ruleset_value": [0.5,0.9]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    damper = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper")
+    damper.do_step = types.MethodType(do_step_failing, damper) # Replicas are bound to the copied method
+    flow_sensor = tb.SensorSystem(id="Flow sensor")
+    self.add_connection(position_schedule, damper, "scheduleValue", "damperPosition")
+    self.add_connection(damper, flow_sensor, "airFlowRate", "airFlowRate")
+
+class TestEnsemble(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_ensemble(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen")) 
+        endTime = datetime.datetime(year=2021, month=1, day=12, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_ensemble", saveSimulationResult=True)
+        model.load_model(infer_connections=False, fcn=fcn)
+        damper = model.component_dict["Damper"]
+        simulator = tb.Simulator()
+        parameter_sets = np.array([[1], [5], [3]])
+        expected = []
+        for parameter_set in parameter_sets:
+            model.set_parameters_from_array(parameter_set, [damper], ["a"])
+            simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False)
+            expected.append(np.array(damper.savedOutput["airFlowRate"]))
+        expected = np.array(expected)
+
+        a = damper.a
+        y = simulator.simulate_ensemble(model, parameter_sets, [damper], ["a"], stepSize=stepSize, startTime=startTime, endTime=endTime, record=[(damper, "airFlowRate")], show_progress_bar=False, vectorize=True)
+        self.assertEqual(y.shape, (3, len(simulator.dateTimeSteps), 1))
+        self.assertTrue(np.allclose(y[:,:,0], expected))
+        self.assertTrue(any(isinstance(component, ComponentBatch) for component_group in simulator.batch_execution_order for component in component_group))
+        self.assertEqual(damper.a, a)
+
+    @unittest.skipIf(False, 'Currently not used')
+    def test_ensemble_failing_parameter_set(self):
+        """
+        A failing parameter set stops the ensemble simulation, after which only the failing set is dropped by the inference.
+        """
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen")) 
+        endTime = datetime.datetime(year=2021, month=1, day=11, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_ensemble_failing", saveSimulationResult=True)
+        model.load_model(infer_connections=False, fcn=fcn_failing)
+        damper = model.component_dict["Damper"]
+        flow_sensor = model.component_dict["Flow sensor"]
+        simulator = tb.Simulator()
+        simulator.flat_component_list = [damper]
+        simulator.flat_attr_list = ["a"]
+        simulator.theta_mask = np.array([0])
+        simulator.record = [(flow_sensor, "airFlowRate")]
+        simulator.targetParameters = None
+        simulator.targetMeasuringDevices = {flow_sensor: {"standardDeviation": 0.1, "scale_factor": 1}}
+        parameter_sets = np.array([[1], [6], [3]])
+        self.assertRaises(FMICallException, simulator.simulate_ensemble, model, parameter_sets, [damper], ["a"], stepSize=stepSize, startTime=startTime, endTime=endTime, record=simulator.record, show_progress_bar=False)
+
+        simulator.targetMeasuringDevices = {flow_sensor: {"standardDeviation": 0.1, "scale_factor": 1}}
+        y_list = simulator._sim_func_ensemble(model, parameter_sets, [startTime], [endTime], [stepSize])
+        self.assertEqual(len(y_list), 3)
+        self.assertIsNone(y_list[1])
+        y = simulator.simulate_ensemble(model, parameter_sets[[0,2]], [damper], ["a"], stepSize=stepSize, startTime=startTime, endTime=endTime, record=simulator.record, show_progress_bar=False)
+        np.testing.assert_allclose(y_list[0][1], y[0])
+        np.testing.assert_allclose(y_list[2][1], y[1])
+        self.assertEqual(damper.a, 5)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sys
+import datetime
+import unittest
+import numpy as np
+from dateutil import tz
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+from twin4build.simulator.gradient_tape import GradientTape
+from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.coil.coil_DryCoilDiscretizedEthyleneGlycolWater30Percent_FMUmodel import CoilFMUSystem
+from scipy.optimize._numdiff import approx_derivative
+
+def fcn(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0.2,
+                                            "ruleset_start_minute": [0,0],
+                                            "ruleset_end_minute": [0,0],
+                                            "ruleset_start_hour": [6,12],
+                                            "ruleset_end_hour": [12,22],
+                                            "ruleset_value": [0.5,0.9]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    valve = tb.ValveSystem(waterFlowRateMax=0.1,
+                            valveAuthority=0.8,
+                            id="Valve")
+    flow_sensor = tb.SensorSystem(id="Flow sensor")
+    self.add_connection(position_schedule, valve, "scheduleValue", "valvePosition")
+    self.add_connection(valve, flow_sensor, "waterFlowRate", "waterFlowRate")
+
+def get_schedule(id_, default_value, values):
+    return tb.ScheduleSystem(weekDayRulesetDict = {
+                                "ruleset_default_value": default_value,
+                                "ruleset_start_minute": [0,0],
+                                "ruleset_end_minute": [0,0],
+                                "ruleset_start_hour": [6,12],
+                                "ruleset_end_hour": [12,22],
+                                "ruleset_value": values},
+                            add_noise=False,
+                            id=id_)
+
+def fcn_stateful(self):
+    valve = tb.ValveSystem(waterFlowRateMax=1.5,
+                            valveAuthority=0.8,
+                            id="Valve")
+    coil = CoilFMUSystem(m1_flow_nominal=1.5,
+                        m2_flow_nominal=3,
+                        tau1=300,
+                        tau2=300,
+                        tau_m=600,
+                        nominalUa=tb.PropertyValue(hasValue=2000),
+                        id="Coil")
+    air_temperature_sensor = tb.SensorSystem(id="Air temperature sensor")
+    self.add_connection(get_schedule("Position schedule", 0.2, [0.5,0.9]), valve, "scheduleValue", "valvePosition")
+    self.add_connection(valve, coil, "waterFlowRate", "waterFlowRate")
+    self.add_connection(get_schedule("Air flow schedule", 1, [2,3]), coil, "scheduleValue", "airFlowRate")
+    self.add_connection(get_schedule("Water temperature schedule", 40, [50,60]), coil, "scheduleValue", "inletWaterTemperature")
+    self.add_connection(get_schedule("Air temperature schedule", 5, [10,15]), coil, "scheduleValue", "inletAirTemperature")
+    self.add_connection(coil, air_temperature_sensor, "outletAirTemperature", "outletAirTemperature")
+
+class TestGradientTape(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_gradient_tape(self):
+        stepSize = 3600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen")) 
+        endTime = datetime.datetime(year=2021, month=1, day=11, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_gradient_tape", graph_rendering="none")
+        model.load_model(infer_connections=False, fcn=fcn, do_load_parameters=False)
+        valve = model.component_dict["Valve"]
+        flow_sensor = model.component_dict["Flow sensor"]
+        record = [(flow_sensor, "waterFlowRate")]
+        attr_list = ["waterFlowRateMax", "valveAuthority"]
+        simulator = tb.Simulator()
+        gradient_tape = GradientTape(model, [valve, valve], attr_list, [flow_sensor])
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, record=record, prune=True, gradient_tape=gradient_tape)
+        y = np.array(flow_sensor.savedInput["waterFlowRate"])
+        jac = gradient_tape.get_jacobian()
+        self.assertEqual(jac.shape, (len(y), 1, len(attr_list)))
+
+        # Compare with forward differences
+        h = 1e-6
+        for k, attr in enumerate(attr_list):
+            value = getattr(valve, attr)
+            setattr(valve, attr, value+h)
+            simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, record=record, prune=True)
+            setattr(valve, attr, value)
+            y_perturbed = np.array(flow_sensor.savedInput["waterFlowRate"])
+            np.testing.assert_allclose(jac[:,0,k], (y_perturbed-y)/h, rtol=1e-4, atol=1e-6)
+
+    @unittest.skipIf(False, 'Currently not used')
+    def test_gradient_tape_stateful(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen")) 
+        endTime = datetime.datetime(year=2021, month=1, day=11, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_gradient_tape_stateful", graph_rendering="none")
+        model.load_model(infer_connections=False, fcn=fcn_stateful, do_load_parameters=False)
+        valve = model.component_dict["Valve"]
+        coil = model.component_dict["Coil"]
+        air_temperature_sensor = model.component_dict["Air temperature sensor"]
+        record = [(air_temperature_sensor, "outletAirTemperature")]
+        component_list = [valve, valve]
+        attr_list = ["waterFlowRateMax", "valveAuthority"]
+        self.assertTrue(coil.has_state())
+        self.assertFalse(valve.has_state())
+
+        # The coil FMU has internal states, which the tape neglects
+        with self.assertRaises(AssertionError):
+            GradientTape(model, component_list, attr_list, [air_temperature_sensor])
+
+        simulator = tb.Simulator()
+        gradient_tape = GradientTape(model, component_list, attr_list, [air_temperature_sensor], allow_neglected_sensitivities=True)
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, record=record, prune=True, gradient_tape=gradient_tape)
+        jac = gradient_tape.get_jacobian()[:,0,:]
+
+        def get_y(theta):
+            model.set_parameters_from_array(theta, component_list, attr_list)
+            simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, record=record, prune=True)
+            return np.array(air_temperature_sensor.savedInput["outletAirTemperature"])
+        theta = np.array([valve.waterFlowRateMax, valve.valveAuthority])
+        jac_fd = approx_derivative(get_y, theta)
+        model.set_parameters_from_array(theta, component_list, attr_list)
+        self.assertEqual(jac.shape, jac_fd.shape)
+        self.assertGreater(np.abs(jac_fd).max(), 0.1)
+        self.assertGreater(np.abs(jac-jac_fd).max(), 0.5*np.abs(jac_fd).max())
+
+if __name__=="__main__":
+    unittest.main()
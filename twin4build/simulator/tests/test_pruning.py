@@ -0,0 +1,69 @@
+import os
+import sys
+import datetime
+import unittest
+import numpy as np
+from dateutil import tz
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+
+def fcn(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0,
+                                            "ruleset_start_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_end_minute": [0,0,0,0,0,0,0],
+                                            "ruleset_start_hour": [6,7,8,12,14,16,18],
+                                            "ruleset_end_hour": [7,8,12,14,16,18,22],
+                                            "ruleset_value": [0,0.1,1,0,0,0.5,0.7]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    constant_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0.5,
+                                            "ruleset_start_minute": [],
+                                            "ruleset_end_minute": [],
+                                            "ruleset_start_hour": [],
+                                            "ruleset_end_hour": [],
+                                            "ruleset_value": []},
+                                        add_noise=False,
+                                        id="Constant schedule")
+    damper_1 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper 1")
+    damper_2 = tb.DamperSystem(nominalAirFlowRate = tb.PropertyValue(hasValue=1.6),
+                            a=5,
+                            id="Damper 2")
+    self.add_connection(position_schedule, damper_1, "scheduleValue", "damperPosition")
+    self.add_connection(constant_schedule, damper_2, "scheduleValue", "damperPosition")
+
+class TestPruning(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_pruning(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen")) 
+        endTime = datetime.datetime(year=2021, month=1, day=12, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_pruning", saveSimulationResult=True)
+        model.load_model(infer_connections=False, fcn=fcn)
+        damper_1 = model.component_dict["Damper 1"]
+        damper_2 = model.component_dict["Damper 2"]
+        simulator = tb.Simulator()
+
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False)
+        expected_1 = np.array(damper_1.savedOutput["airFlowRate"])
+        expected_2 = np.array(damper_2.savedOutput["airFlowRate"])
+
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, record=[(damper_1, "airFlowRate")], prune=True)
+        self.assertNotIn(damper_2, simulator.flat_execution_order)
+        self.assertEqual(len(damper_2.savedOutput), 0)
+        self.assertEqual(list(damper_1.savedOutput.keys()), ["airFlowRate"])
+        self.assertTrue(np.allclose(np.array(damper_1.savedOutput["airFlowRate"]), expected_1))
+
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, record=[(damper_2, "airFlowRate")], prune=True)
+        self.assertNotIn(model.component_dict["Constant schedule"], [component for component_group in simulator.batch_execution_order for component in component_group])
+        self.assertTrue(np.allclose(np.array(damper_2.savedOutput["airFlowRate"]), expected_2))
+
+if __name__=="__main__":
+    unittest.main()
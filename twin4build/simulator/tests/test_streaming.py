@@ -0,0 +1,58 @@
+import os
+import sys
+import datetime
+import unittest
+import numpy as np
+from dateutil import tz
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 4)
+    sys.path.append(file_path)
+import twin4build as tb
+from twin4build.simulator.result_sink import MemmapSink
+
+def fcn(self):
+    position_schedule = tb.ScheduleSystem(weekDayRulesetDict = {
+                                            "ruleset_default_value": 0.2,
+                                            "ruleset_start_minute": [0,0],
+                                            "ruleset_end_minute": [0,0],
+                                            "ruleset_start_hour": [6,12],
+                                            "ruleset_end_hour": [12,22],
+                                            "ruleset_value": [0.5,0.9]},
+                                        add_noise=False,
+                                        id="Position schedule")
+    valve = tb.ValveSystem(waterFlowRateMax=0.1,
+                            valveAuthority=0.8,
+                            id="Valve")
+    flow_sensor = tb.SensorSystem(id="Flow sensor")
+    self.add_connection(position_schedule, valve, "scheduleValue", "valvePosition")
+    self.add_connection(valve, flow_sensor, "waterFlowRate", "waterFlowRate")
+
+class TestStreaming(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_streaming(self):
+        stepSize = 600
+        startTime = datetime.datetime(year=2021, month=1, day=10, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        endTime = datetime.datetime(year=2021, month=1, day=12, hour=0, minute=0, second=0, tzinfo=tz.gettz("Europe/Copenhagen"))
+        model = tb.Model(id="test_streaming", graph_rendering="none")
+        model.load_model(infer_connections=False, fcn=fcn, do_load_parameters=False)
+        valve = model.component_dict["Valve"]
+        flow_sensor = model.component_dict["Flow sensor"]
+        record = [(flow_sensor, "waterFlowRate"), (valve, "valvePosition")]
+        simulator = tb.Simulator()
+        simulator.simulate(model, stepSize=stepSize, startTime=startTime, endTime=endTime, show_progress_bar=False, record=record)
+        expected = np.array([flow_sensor.savedInput["waterFlowRate"], valve.savedInput["valvePosition"]]).transpose()
+
+        chunks = list(simulator.simulate_stream(model, startTime, endTime, stepSize, record, chunk_size=100, show_progress_bar=False))
+        self.assertEqual([len(dateTimes) for dateTimes, values in chunks], [100, 100, 88])
+        self.assertEqual(chunks[-1][0][-1], simulator.dateTimeSteps[-1])
+        np.testing.assert_allclose(np.concatenate([values for dateTimes, values in chunks], axis=0), expected)
+        self.assertEqual(len(flow_sensor.savedInput), 0)
+
+        filename = model.get_dir(folder_list=["streaming"], filename="results.npy")[0]
+        simulator.simulate_to_sink(model, startTime, endTime, stepSize, record, MemmapSink(filename), chunk_size=100, show_progress_bar=False)
+        np.testing.assert_allclose(np.load(filename, mmap_mode="r"), expected)
+
+if __name__=="__main__":
+    unittest.main()
@@ -11,7 +11,6 @@ from twin4build.saref.property_.property_ import Property
 from twin4build.saref.measurement.measurement import Measurement
 from twin4build.saref.property_.temperature.temperature import Temperature
 from twin4build.saref4bldg.building_space.building_space import BuildingSpace
-from twin4build.saref4bldg.building_space.building_space_system import NoSpaceModelException
 from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_control_device.controller.controller import Controller
 from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_device import DistributionDevice
 from twin4build.saref4bldg.physical_object.building_object.building_device.distribution_device.distribution_flow_device.energy_conversion_device.air_to_air_heat_recovery.air_to_air_heat_recovery import AirToAirHeatRecovery
@@ -98,6 +97,7 @@ class fiwareReader:
 
         
         logger.info("[Fiware Reader Class] : Entered in Read Config From Fiware Function")
+        from twin4build.saref4bldg.building_space.building_space_system import NoSpaceModelException # Imported here as it imports torch
 
 
         access_token = self.get_fiware_access_token()
@@ -14,6 +14,8 @@ logger = Logging.get_logger("ai_logfile")
 import time as t
 from dateutil.parser import parse
 import platform
+import json
+import hashlib
 def parseDateStr(s):
     if s != '':
         try:
@@ -22,63 +24,150 @@ def parseDateStr(s):
             return np.datetime64('NaT')
     else: return np.datetime64('NaT')     
 
-def sample_from_df(df,
-                   datecolumn=0,
-                   stepSize=None,
-                     start_time=None,
-                     end_time=None,
-                     resample=True,
-                     resample_method="linear",
-                     clip=True,
-                     tz="Europe/Copenhagen",
-                     preserve_order=True):
-    
-    df = df.rename(columns={df.columns.to_list()[datecolumn]: 'datetime'})
-    for column in df.columns.to_list():
-        if column!="datetime":
-            df[column] = pd.to_numeric(df[column], errors='coerce') #Remove string entries
-    # system = platform.system()
-    # leading_char = {"Windows": "#",
-                    # "Linux": "-"}
-    # formats = ['%m/%d/%Y %H-%M-%S %p',]
-
-    # format = formats[0]#.replace("%d", f"%{leading_char[system]}d")
-    #format = format.replace("%m", f"%{leading_char[system]}m")
-    df["datetime"] = pd.to_datetime(df["datetime"])#), format=format)
-    # df["datetime"] = df["datetime"].apply(parseDateStr)
-    if df["datetime"].apply(lambda x:x.tzinfo is not None).any():
-        has_tz = True
-        df["datetime"] = df["datetime"].apply(lambda x:x.tz_convert("UTC"))
+def _parse_utc_offset_strings(datetime):
+    """
+    Fast path for timezone-aware datetime strings of equal length ending with "Z", "+HH:MM" or "+HHMM", e.g. "2022-10-30T02:00:00+02:00".
+    pandas parses such strings with a slow per-element fallback, while the timezone-naive part can be parsed in a single vectorized operation.
+    Returns the datetimes as int64 nanoseconds since epoch (UTC), or None if the strings do not have this format.
+    """
+    if datetime.dtype!=object or datetime.isna().any():
+        return None
+    try:
+        strings = np.asarray(datetime.to_numpy(), dtype=str)
+    except (TypeError, ValueError):
+        return None
+    width = strings.dtype.itemsize//4
+    if strings.size==0 or width<7:
+        return None
+    codes = strings.view(np.uint32).reshape(strings.size, width)
+    if np.any(codes[:,-1]==0):
+        # Strings of different lengths
+        return None
+    if np.all(codes[:,-1]==ord("Z")):
+        offset_width = 1
+        offset = np.zeros(strings.size, dtype=np.int64)
     else:
-        has_tz = False
+        if np.all(np.isin(codes[:,-6], [ord("+"), ord("-")])) and np.all(codes[:,-3]==ord(":")):
+            offset_width = 6
+            digits = codes[:,[-5,-4,-2,-1]].astype(np.int64)-ord("0")
+        elif np.all(np.isin(codes[:,-5], [ord("+"), ord("-")])):
+            offset_width = 5
+            digits = codes[:,[-4,-3,-2,-1]].astype(np.int64)-ord("0")
+        else:
+            return None
+        if np.any((digits<0) | (digits>9)):
+            return None
+        sign = np.where(codes[:,-offset_width]==ord("-"), -1, 1)
+        offset = sign*((digits[:,0]*10+digits[:,1])*3600 + (digits[:,2]*10+digits[:,3])*60)*10**9
+    naive = pd.to_datetime(strings.astype(f"U{width-offset_width}"))
+    if naive.tz is not None:
+        return None
+    return naive.asi8 - offset
 
-    df = df.set_index(pd.DatetimeIndex(df['datetime']))
-    df = df.drop(columns=["datetime"])
+def normalize_df(df,
+                 datecolumn=0,
+                 tz="Europe/Copenhagen",
+                 preserve_order=True,
+                 ambiguous="infer",
+                 nonexistent="NaT"):
+    """
+    Parses the datetime column of a raw spreadsheet and returns a sorted, timezone-aware (tz) DataFrame with unique, numeric rows.
+    This is the expensive part of sample_from_df, which does not depend on the sampled period.
+    All operations are vectorized.
+
+    ambiguous, nonexistent: Passed to pandas.DatetimeIndex.tz_localize when timezone-naive datetimes are localized as "tz".
+        ambiguous="infer" resolves the repeated hour when daylight saving time ends from the order of the rows (see preserve_order).
+    """
+    columns = [column for i, column in enumerate(df.columns.to_list()) if i!=datecolumn]
+    values = np.empty((df.shape[0], len(columns)), dtype=np.float64)
+    for i, column in enumerate(columns):
+        values[:,i] = pd.to_numeric(df[column], errors='coerce') #Remove string entries
+
+    # Timezone-aware strings are much faster to parse directly to UTC, which requires knowing whether the datetimes are timezone-aware beforehand.
+    # Mixed UTC offsets, e.g. a timezone-aware export spanning a change of daylight saving time, are parsed as object dtype.
+    datetime = df.iloc[:,datecolumn]
+    datetime_sample = pd.to_datetime(datetime.dropna().iloc[:100])
+    has_tz = isinstance(datetime_sample.dtype, pd.DatetimeTZDtype) or datetime_sample.dtype==object
+    i8 = _parse_utc_offset_strings(datetime) if has_tz else None
+    if i8 is None:
+        index = pd.DatetimeIndex(pd.to_datetime(datetime, utc=has_tz))
+    else:
+        index = pd.DatetimeIndex(i8, tz="UTC")
 
     if preserve_order and has_tz==False:
         # Detect if dates are reverse
-        diff_seconds = df.index.to_series().diff().dt.total_seconds()
-        frac_neg = np.sum(diff_seconds<0)/diff_seconds.size
+        i8 = index.asi8
+        is_valid = index.notna()
+        is_negative = (np.diff(i8)<0) & is_valid[1:] & is_valid[:-1]
+        frac_neg = np.sum(is_negative)/i8.size
         if frac_neg>=0.95:
-            df = df.iloc[::-1]
+            index = index[::-1]
+            values = values[::-1]
         elif frac_neg>0.05 and frac_neg<0.95:
             raise Exception("\"preserve_order\" is true, but the datetime order cannot be determined.")
-    else:
-        df = df.sort_index()
-        
-    df = df.dropna(how="all")
-    
-    
-    #Check if the first index is timezone aware
-    if df.index[0].tzinfo is None:
-        df = df.tz_localize(gettz(tz), ambiguous='infer', nonexistent="NaT")
-    else:
-        df = df.tz_convert(gettz(tz))
+
+    is_not_empty = np.any(np.isnan(values)==False, axis=1)
+    index = index[is_not_empty]
+    values = values[is_not_empty]
+
+    if has_tz==False:
+        index = index.tz_localize(gettz(tz), ambiguous=ambiguous, nonexistent=nonexistent)
+
+    # Sort by UTC time and remove invalid dates
+    i8 = index.asi8
+    is_valid = index.notna()
+    i8 = i8[is_valid]
+    values = values[is_valid]
+    order = np.argsort(i8, kind="stable")
+    i8 = i8[order]
+    values = values[order]
 
     # Duplicate dates can occur either due to measuring/logging malfunctions
     # or due to change of daylight saving time where an hour occurs twice in fall.
-    df = df.groupby(level=0).mean()
+    # NaN values are ignored when averaging the duplicates.
+    i8, first = np.unique(i8, return_index=True)
+    if i8.size<values.shape[0]:
+        is_nan = np.isnan(values)
+        sums = np.add.reduceat(np.where(is_nan, 0, values), first, axis=0)
+        counts = np.add.reduceat(is_nan==False, first, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = np.where(counts>0, sums/counts, np.nan)
+
+    index = pd.DatetimeIndex(i8, tz="UTC", name="datetime").tz_convert(gettz(tz))
+    df = pd.DataFrame(values, index=index, columns=columns)
+    return df
+
+def _interpolate_linear(x, y, x_new):
+    """
+    Linear interpolation of each column of "y" at "x_new", ignoring NaN values.
+    Points before the first valid value of a column are NaN, while points after the last valid value are equal to the last valid value.
+    """
+    y_new = np.full((x_new.size, y.shape[1]), np.nan)
+    for i in range(y.shape[1]):
+        is_valid = np.isnan(y[:,i])==False
+        if np.all(is_valid):
+            x_valid = x
+            y_valid = y[:,i]
+        else:
+            x_valid = x[is_valid]
+            y_valid = y[is_valid,i]
+        if x_valid.size==0:
+            continue
+        y_new[:,i] = np.interp(x_new, x_valid, y_valid)
+        y_new[x_new<x_valid[0],i] = np.nan
+    return y_new
 
+def resample_df(df,
+                stepSize=None,
+                start_time=None,
+                end_time=None,
+                resample=True,
+                resample_method="linear",
+                clip=True,
+                tz="Europe/Copenhagen"):
+    """
+    Resamples and clips a DataFrame returned by normalize_df to the period [start_time, end_time].
+    """
     if start_time.tzinfo is None:
             start_time = start_time.astimezone(tz=gettz(tz))
     if end_time.tzinfo is None:
@@ -90,14 +179,132 @@ def sample_from_df(df,
         if resample_method=="constant":
             df = df.resample(f"{stepSize}s", origin=start_time).ffill().bfill()
         elif resample_method=="linear":
-            oidx = df.index
             nidx = pd.date_range(start_time, end_time, freq=f"{stepSize}s")
-            df = df.reindex(oidx.union(nidx)).interpolate('index').reindex(nidx)
+            values = _interpolate_linear(df.index.asi8.astype(np.float64), df.to_numpy(dtype=np.float64), nidx.asi8.astype(np.float64))
+            df = pd.DataFrame(values, index=nidx, columns=df.columns)
 
     if clip:
         df = df[start_time:end_time]
     return df
 
+def sample_from_df(df,
+                   datecolumn=0,
+                   stepSize=None,
+                     start_time=None,
+                     end_time=None,
+                     resample=True,
+                     resample_method="linear",
+                     clip=True,
+                     tz="Europe/Copenhagen",
+                     preserve_order=True,
+                     ambiguous="infer",
+                     nonexistent="NaT"):
+    df = normalize_df(df, datecolumn=datecolumn, tz=tz, preserve_order=preserve_order, ambiguous=ambiguous, nonexistent=nonexistent)
+    df = resample_df(df,
+                     stepSize=stepSize,
+                     start_time=start_time,
+                     end_time=end_time,
+                     resample=resample,
+                     resample_method=resample_method,
+                     clip=clip,
+                     tz=tz)
+    return df
+
+def read_spreadsheet(filename):
+    name, file_extension = os.path.splitext(filename)
+    with open(filename, 'rb') as filehandler:
+        if file_extension==".csv":
+            df = pd.read_csv(filehandler, low_memory=False)#, parse_dates=[0])
+        elif file_extension==".xlsx":
+            df = pd.read_excel(filehandler)
+        else:
+            logger.error((f"Invalid file extension: {file_extension}"))
+            raise Exception(f"Invalid file extension: {file_extension}")
+    return df
+
+class NormalizedSeriesCache():
+    """
+    Columnar on-disk cache of a spreadsheet after parsing and timezone normalization (see normalize_df).
+
+    The cache is a folder under generated_files/cached_data containing:
+        - index.npy: The datetime index as int64 nanoseconds since epoch (UTC).
+        - values.npy: The values as a float64 array of shape (n_rows, n_columns).
+        - columns.json: The column names of the normalized data and of the raw spreadsheet.
+    The folder name is derived from the absolute path, size and modification time of the source file and the parse options.
+    The source is therefore only parsed once, after which any period and step size is sliced from the memory-mapped arrays.
+    """
+    def __init__(self, filename, datecolumn=0, tz="Europe/Copenhagen", preserve_order=True, ambiguous="infer", nonexistent="NaT", cache_root=None):
+        self.filename = filename
+        stat = os.stat(filename)
+        key = json.dumps([os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, datecolumn, tz, preserve_order, ambiguous, nonexistent])
+        name, file_extension = os.path.splitext(os.path.basename(filename))
+        folder_name = f"name({name})_{hashlib.sha1(key.encode()).hexdigest()[:16]}_normalized"
+        self.directory, isdir = mkdir_in_root(folder_list=["generated_files", "cached_data", folder_name], root=cache_root)
+        self._columns_filename = os.path.join(self.directory, "columns.json")
+        self._index_filename = os.path.join(self.directory, "index.npy")
+        self._values_filename = os.path.join(self.directory, "values.npy")
+        if os.path.isfile(self._columns_filename)==False:
+            df_raw = read_spreadsheet(filename)
+            df = normalize_df(df_raw, datecolumn=datecolumn, tz=tz, preserve_order=preserve_order, ambiguous=ambiguous, nonexistent=nonexistent)
+            # columns.json is written last and marks the cache as complete
+            self._replace(self._index_filename, lambda handle: np.save(handle, df.index.tz_convert("UTC").asi8))
+            self._replace(self._values_filename, lambda handle: np.save(handle, df.to_numpy(dtype=np.float64)))
+            self._replace(self._columns_filename, lambda handle: handle.write(json.dumps({"columns": df.columns.to_list(), "raw_columns": df_raw.columns.to_list()}).encode()))
+        with open(self._columns_filename, "r") as handle:
+            columns = json.load(handle)
+        self.columns = columns["columns"]
+        self.raw_columns = columns["raw_columns"]
+        self.index = np.load(self._index_filename, mmap_mode="r")
+        self.values = np.load(self._values_filename, mmap_mode="r")
+        self.tz = tz
+
+    def _replace(self, filename, write):
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "wb") as handle:
+            write(handle)
+        os.replace(tmp_filename, filename)
+
+    def _get_valid_bounds(self, start, stop):
+        """
+        Extends the rows [start, stop) to include the nearest non-NaN value of every column before and after.
+        These rows determine the interpolated values in the period.
+        """
+        n = self.index.size
+        lower = start
+        width = 1
+        while lower>0:
+            lower = max(start-width, 0)
+            if np.all(np.any(np.isnan(self.values[lower:start])==False, axis=0)):
+                break
+            width *= 2
+        upper = stop
+        width = 1
+        while upper<n:
+            upper = min(stop+width, n)
+            if np.all(np.any(np.isnan(self.values[stop:upper])==False, axis=0)):
+                break
+            width *= 2
+        return lower, upper
+
+    def get_df(self, start_time=None, end_time=None):
+        """
+        Returns the normalized DataFrame, restricted to the rows required to resample the period [start_time, end_time].
+        """
+        start = 0
+        stop = self.index.size
+        if start_time is not None:
+            if start_time.tzinfo is None:
+                start_time = start_time.astimezone(tz=gettz(self.tz))
+            start = int(np.searchsorted(self.index, pd.Timestamp(start_time).value, side="left"))
+        if end_time is not None:
+            if end_time.tzinfo is None:
+                end_time = end_time.astimezone(tz=gettz(self.tz))
+            stop = int(np.searchsorted(self.index, pd.Timestamp(end_time).value, side="right"))
+        start, stop = self._get_valid_bounds(start, stop)
+        index = pd.DatetimeIndex(np.array(self.index[start:stop]), tz="UTC", name="datetime").tz_convert(gettz(self.tz))
+        df = pd.DataFrame(np.array(self.values[start:stop]), index=index, columns=self.columns)
+        return df
+
 def load_spreadsheet(filename,
                      datecolumn=0,
                      valuecolumn=None,
@@ -111,7 +318,9 @@ def load_spreadsheet(filename,
                      cache=True, 
                      cache_root=None, 
                      tz="Europe/Copenhagen", 
-                     preserve_order=True):
+                     preserve_order=True,
+                     ambiguous="infer",
+                     nonexistent="NaT"):
     """
     This function loads a spead either in .csv or .xlsx format.
     The datetime should in the first column - timezone-naive inputs are localized as "tz", while timezone-aware inputs are converted to "tz".
@@ -121,46 +330,33 @@ def load_spreadsheet(filename,
 
     preserve_order: If True, the order of rows in the spreadsheet are important in order to resolve DST when timezone information is not available
 
+    ambiguous, nonexistent: How timezone-naive datetimes that are ambiguous or nonexistent in "tz" due to DST are handled (see pandas.DatetimeIndex.tz_localize)
+
+    cache: If True, the parsed and normalized spreadsheet is cached once (see NormalizedSeriesCache) and each period is sliced and resampled from the cache.
+
     PRINT THE FOLLOWING TO SEE AVAILABLE NAMES:
     from dateutil.zoneinfo import getzoneinfofile_stream, ZoneInfoFile
     print(ZoneInfoFile(getzoneinfofile_stream()).zones.keys())
     """
-    name, file_extension = os.path.splitext(filename)
-
     if cache:
-        #Check if file is cached
-        startTime_str = start_time.strftime('%d-%m-%Y %H-%M-%S')
-        endTime_str = end_time.strftime('%d-%m-%Y %H-%M-%S')
-        cached_filename = f"name({os.path.basename(name)})_stepSize({str(stepSize)})_startTime({startTime_str})_endTime({endTime_str})_cached.pickle"
-        cached_filename, isfile = mkdir_in_root(folder_list=["generated_files", "cached_data"], filename=cached_filename, root=cache_root)
-    if cache and os.path.isfile(cached_filename):
-        df = pd.read_pickle(cached_filename)
+        series_cache = NormalizedSeriesCache(filename, datecolumn=datecolumn, tz=tz, preserve_order=preserve_order, ambiguous=ambiguous, nonexistent=nonexistent, cache_root=cache_root)
+        raw_columns = series_cache.raw_columns
+        df = series_cache.get_df(start_time=start_time if clip else None, end_time=end_time if clip else None)
     else:
-        with open(filename, 'rb') as filehandler:
-            if file_extension==".csv":
-                df = pd.read_csv(filehandler, low_memory=False)#, parse_dates=[0])
-            elif file_extension==".xlsx":
-                df = pd.read_excel(filehandler)
-            else:
-                logger.error((f"Invalid file extension: {file_extension}"))
-                raise Exception(f"Invalid file extension: {file_extension}")
-
-        if valuecolumn is not None:
-            valuename = df.columns[valuecolumn]
-        df = sample_from_df(df,
-                            datecolumn,
-                            stepSize=stepSize,
-                            start_time=start_time,
-                            end_time=end_time,
-                            resample=resample,
-                            clip=clip,
-                            tz=tz,
-                            preserve_order=preserve_order)
-        
-        if valuecolumn is not None:
-            df = df[valuename]
-
-        if cache:
-            df.to_pickle(cached_filename)
+        df_raw = read_spreadsheet(filename)
+        raw_columns = df_raw.columns.to_list()
+        df = normalize_df(df_raw, datecolumn=datecolumn, tz=tz, preserve_order=preserve_order, ambiguous=ambiguous, nonexistent=nonexistent)
+
+    df = resample_df(df,
+                     stepSize=stepSize,
+                     start_time=start_time,
+                     end_time=end_time,
+                     resample=resample,
+                     clip=clip,
+                     tz=tz)
+    
+    if valuecolumn is not None:
+        valuename = raw_columns[valuecolumn]
+        df = df[valuename]
 
     return df
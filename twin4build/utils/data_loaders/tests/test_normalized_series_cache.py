@@ -0,0 +1,40 @@
+import os
+import unittest
+import sys
+import tempfile
+import shutil
+import datetime
+import pandas as pd
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 5)
+    sys.path.append(file_path)
+from twin4build.utils.data_loaders.load_spreadsheet import load_spreadsheet, NormalizedSeriesCache
+from twin4build.utils.uppath import uppath
+from dateutil.tz import gettz
+
+class TestNormalizedSeriesCache(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_normalized_series_cache(self):
+        filename = os.path.join(uppath(os.path.abspath(__file__), 4), "model", "tests", "weather_DMI.csv")
+        cache_root = tempfile.mkdtemp()
+        try:
+            periods = [(datetime.datetime(year=2022, month=10, day=28, hour=0, minute=7, tzinfo=gettz("Europe/Copenhagen")),
+                        datetime.datetime(year=2022, month=11, day=2, hour=0, minute=0, tzinfo=gettz("Europe/Copenhagen")), 600),
+                       (datetime.datetime(year=2020, month=12, day=31, hour=0, minute=0, tzinfo=gettz("UTC")),
+                        datetime.datetime(year=2021, month=1, day=2, hour=0, minute=0, tzinfo=gettz("UTC")), 60)]
+            for startTime, endTime, stepSize in periods:
+                df = load_spreadsheet(filename=filename, stepSize=stepSize, start_time=startTime, end_time=endTime, cache=False)
+                df_cached = load_spreadsheet(filename=filename, stepSize=stepSize, start_time=startTime, end_time=endTime, cache=True, cache_root=cache_root)
+                pd.testing.assert_frame_equal(df, df_cached)
+
+            # The source is only parsed once
+            directories = os.listdir(os.path.join(cache_root, "generated_files", "cached_data"))
+            self.assertEqual(len(directories), 1)
+            series_cache = NormalizedSeriesCache(filename, cache_root=cache_root)
+            self.assertEqual(series_cache.columns, ["outdoorTemperature", "globalIrradiation"])
+        finally:
+            shutil.rmtree(cache_root)
+
+if __name__=="__main__":
+    unittest.main()
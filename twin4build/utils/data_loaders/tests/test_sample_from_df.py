@@ -0,0 +1,59 @@
+import os
+import unittest
+import sys
+import datetime
+import numpy as np
+import pandas as pd
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 5)
+    sys.path.append(file_path)
+from twin4build.utils.data_loaders.load_spreadsheet import sample_from_df
+from dateutil.tz import gettz
+
+def get_cases():
+    """
+    Returns synthetic spreadsheets covering the daylight saving time change in October 2022 as (name, df, start_time, end_time, stepSize, kwargs).
+    The naive timestamps contain the repeated hour, two duplicated rows, missing values and a string entry.
+    The aware timestamps are strings with two different UTC offsets.
+    """
+    datetimes = pd.date_range("2022-10-29 00:00", "2022-10-31 00:00", freq="10min", tz="Europe/Copenhagen")
+    random_state = np.random.RandomState(0)
+    a = random_state.randn(len(datetimes))
+    a[5:40] = np.nan
+    b = random_state.randn(len(datetimes)).astype(object)
+    b[100] = "bad"
+    df_naive = pd.DataFrame({"time": datetimes.tz_localize(None).strftime("%Y-%m-%d %H:%M:%S"), "a": a, "b": b})
+    df_naive = pd.concat([df_naive, df_naive.iloc[[50,60]].assign(a=[1.0,2.0])])
+    df_naive = df_naive.iloc[np.r_[0:60, len(datetimes), 60:len(datetimes), len(datetimes)+1]].reset_index(drop=True)
+    df_aware = pd.DataFrame({"time": datetimes.strftime("%Y-%m-%dT%H:%M:%S%z"), "a": a})
+    startTime_naive = datetime.datetime(year=2022, month=10, day=29, hour=1)
+    endTime_naive = datetime.datetime(year=2022, month=10, day=30, hour=23)
+    startTime_utc = datetime.datetime(year=2022, month=10, day=29, hour=1, tzinfo=gettz("UTC"))
+    endTime_utc = datetime.datetime(year=2022, month=10, day=30, hour=23, tzinfo=gettz("UTC"))
+    endTime_aware = datetime.datetime(year=2022, month=10, day=31, hour=3, tzinfo=gettz("UTC"))
+    cases = [("naive", df_naive, startTime_naive, endTime_naive, 300, {}),
+             ("naive_local", df_naive, startTime_naive.replace(tzinfo=gettz("Europe/Copenhagen")), endTime_naive.replace(tzinfo=gettz("Europe/Copenhagen")), 300, {}),
+             ("reversed", df_naive.iloc[::-1].reset_index(drop=True), startTime_utc, endTime_utc, 300, {}),
+             ("aware", df_aware, startTime_utc, endTime_aware, 300, {}),
+             ("aware_constant", df_aware, startTime_utc, endTime_aware, 300, {"resample_method": "constant"})]
+    return cases
+
+class TestSampleFromDf(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_sample_from_df(self):
+        """
+        Compares with "sample_from_df_expected.csv", which holds the output of sample_from_df before the timestamps were parsed by normalize_df.
+        """
+        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_from_df_expected.csv")
+        df_expected = pd.read_csv(filename)
+        df_expected["datetime"] = pd.to_datetime(df_expected["datetime"], utc=True)
+        for name, df, startTime, endTime, stepSize, kwargs in get_cases():
+            df_sample = sample_from_df(df.copy(), stepSize=stepSize, start_time=startTime, end_time=endTime, **kwargs)
+            expected = df_expected[df_expected["case"]==name].set_index("datetime")[df_sample.columns]
+            expected.index.name = df_sample.index.name
+            df_sample.index = df_sample.index.tz_convert("UTC")
+            pd.testing.assert_frame_equal(df_sample, expected, check_freq=False, rtol=1e-12)
+
+if __name__=="__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 from fmpy import read_model_description, extract, instantiate_fmu
 from fmpy.fmi1 import FMU1Slave
-from fmpy.fmi2 import FMU2Slave
+from fmpy.fmi2 import FMU2Slave, fmi2ValueReference, fmi2Real
 import fmpy.fmi2 as fmi2
 import copy
 from ctypes import byref
@@ -13,9 +13,9 @@ from twin4build.utils.uppath import uppath
 from twin4build.utils.do_nothing import do_nothing
 import os
 import time
-from scipy.optimize._numdiff import approx_derivative
 from fmpy.fmi2 import FMICallException
 from twin4build.utils.mkdir_in_root import mkdir_in_root
+from twin4build.utils.fmu.unit_converters.functions import get_affine_coefficients
 logger = Logging.get_logger("ai_logfile")
 
 
@@ -107,9 +107,11 @@ class FMUComponent:
         self.fmu.setupExperiment(startTime=0)
         self.fmu.enterInitializationMode()
         self.fmu.exitInitializationMode()
+        self.fmu_time = 0
+        self.fmu_time_offset = 0
 
         self.set_parameters()
-
+        self.initialize_value_transfer()
         
         self.inputUncertainty = copy.deepcopy(self.input)
         self.outputUncertainty = copy.deepcopy(self.output)
@@ -133,6 +135,38 @@ class FMUComponent:
                                                 
             self.uncertainty_type_mask = np.array([el for el in temp_dict.values()])
 
+    def _get_conversion_vectors(self, conversions):
+        scale = np.ones(len(conversions))
+        offset = np.zeros(len(conversions))
+        non_affine_conversions = []
+        for i, conversion in enumerate(conversions):
+            coefficients = get_affine_coefficients(conversion)
+            if coefficients is None:
+                non_affine_conversions.append((i, conversion))
+            else:
+                scale[i], offset[i] = coefficients
+        return scale, offset, non_affine_conversions
+
+    def initialize_value_transfer(self):
+        """
+        Precomputes the value references, unit conversions and buffers used by _do_step, 
+        such that all inputs and all outputs are exchanged with the FMU through a single fmi2SetReal and fmi2GetReal call.
+        Affine unit conversions (see get_affine_coefficients) are applied as vectors. Other conversions are applied individually.
+        """
+        self.fmu_input_keys = list(self.input.keys())
+        self.fmu_output_keys = list(self.output.keys())
+        n_inputs = len(self.fmu_input_keys)
+        n_outputs = len(self.fmu_output_keys)
+        self.fmu_input_valueReferences = (fmi2ValueReference*n_inputs)(*[self.fmu_variables[self.FMUinputMap[key]].valueReference for key in self.fmu_input_keys])
+        self.fmu_output_valueReferences = (fmi2ValueReference*n_outputs)(*[self.fmu_variables[self.FMUmap[key]].valueReference for key in self.fmu_output_keys])
+        self.fmu_input_values = (fmi2Real*n_inputs)()
+        self.fmu_output_values = (fmi2Real*n_outputs)()
+        # Numpy views of the ctypes buffers
+        self.fmu_input_array = np.ctypeslib.as_array(self.fmu_input_values)
+        self.fmu_output_array = np.ctypeslib.as_array(self.fmu_output_values)
+        self.fmu_input_scale, self.fmu_input_offset, self.fmu_input_conversions = self._get_conversion_vectors([self.input_conversion[key] for key in self.fmu_input_keys])
+        self.fmu_output_scale, self.fmu_output_offset, self.fmu_output_conversions = self._get_conversion_vectors([self.output_conversion[key] for key in self.fmu_output_keys])
+
     def set_parameters(self, parameters=None):
         lookup_dict = self.fmu_parameters
         if parameters is None:
@@ -190,6 +224,7 @@ class FMUComponent:
     
 
     def get_numerical_jacobian(self, x, secondTime=None, dateTime=None, stepSize=None):
+        from scipy.optimize._numdiff import approx_derivative
         # jac = nd.Jacobian(self._do_step_wrapped,order=4)(x, secondTime=secondTime, dateTime=dateTime, stepSize=stepSize)
         jac = np.atleast_2d(approx_derivative(self._do_step_wrapped, x, bounds=(list(self.inputLowerBounds.values()), list(self.inputUpperBounds.values())), args=(secondTime, dateTime, stepSize)))
         return jac
@@ -222,22 +257,62 @@ class FMUComponent:
         return np.array(list(self.output.values()))
     
     def _do_step(self, secondTime=None, dateTime=None, stepSize=None):
+        secondTime += self.fmu_time_offset
         end_time = secondTime+stepSize
-        for key in self.input.keys():
-            x = self.input_conversion[key](self.input[key])
-            FMUkey = self.FMUinputMap[key]
-            self.fmu.setReal([self.fmu_variables[FMUkey].valueReference], [x])
+        x = [self.input[key] for key in self.fmu_input_keys]
+        self.fmu_input_array[:] = x
+        self.fmu_input_array *= self.fmu_input_scale
+        self.fmu_input_array += self.fmu_input_offset
+        for i, conversion in self.fmu_input_conversions:
+            self.fmu_input_array[i] = conversion(x[i])
+        self.fmu.fmi2SetReal(self.fmu.component, self.fmu_input_valueReferences, len(self.fmu_input_valueReferences), self.fmu_input_values)
 
         while secondTime<end_time:
             self.fmu.doStep(currentCommunicationPoint=secondTime, communicationStepSize=self.component_stepSize)
             secondTime += self.component_stepSize
+        self.fmu_time = secondTime
             
         # Currently only the values for the final timestep is saved.
         # Alternatively, the in-between values in the while loop could also be saved.
         # However, this would need adjustments in the "SimulationResult" class and the "update_simulation_result" method.
-        for key in self.output.keys():
-            FMUkey = self.FMUmap[key]
-            self.output[key] = self.output_conversion[key](self.fmu.getReal([self.fmu_variables[FMUkey].valueReference])[0])
+        self.fmu.fmi2GetReal(self.fmu.component, self.fmu_output_valueReferences, len(self.fmu_output_valueReferences), self.fmu_output_values)
+        y = self.fmu_output_array*self.fmu_output_scale + self.fmu_output_offset
+        for i, conversion in self.fmu_output_conversions:
+            y[i] = conversion(self.fmu_output_array[i])
+        self.output.update(zip(self.fmu_output_keys, y.tolist()))
+
+    def has_state(self):
+        """
+        Returns True if the FMU has continuous states. The model description is only read once.
+        """
+        if hasattr(self, "fmu_n_continuous_states")==False:
+            self.fmu_n_continuous_states = read_model_description(self.fmu_path).numberOfContinuousStates
+        return self.fmu_n_continuous_states>0
+
+    def get_state(self):
+        """
+        Extends System.get_state with the internal state of the FMU, serialized through the FMI state serialization functions (fmi2SerializeFMUstate), 
+        and the internal time of the FMU.
+        """
+        state = super().get_state()
+        fmu_state = self.fmu.getFMUState()
+        state["fmu_state"] = self.fmu.serializeFMUState(fmu_state)
+        self.fmu.freeFMUState(fmu_state)
+        state["fmu_time"] = self.fmu_time
+        return state
+
+    def set_state(self, state):
+        """
+        Restores a state returned by self.get_state. The parameters of the component are set again afterwards, as in self.reset. 
+        As the restored FMU continues from its internal time, the time of the new simulation period (starting at secondTime=0) is offset accordingly.
+        """
+        super().set_state(state)
+        fmu_state = self.fmu.deserializeFMUState(state["fmu_state"])
+        self.fmu.setFMUState(fmu_state)
+        self.fmu.freeFMUState(fmu_state)
+        self.set_parameters()
+        self.fmu_time = state["fmu_time"]
+        self.fmu_time_offset = state["fmu_time"]
 
     def do_step(self, secondTime=None, dateTime=None, stepSize=None):
         if self.doUncertaintyAnalysis:
@@ -22,4 +22,22 @@ class add():
         self.const = const
     def call(self, x):
         return x+self.const
-    __call__ = call
\ No newline at end of file
+    __call__ = call
+
+def get_affine_coefficients(conversion):
+    """
+    Returns the coefficients (a, b) if "conversion" is the affine function x -> a*x+b, otherwise None.
+    This allows FMUComponent to apply the unit conversions of all inputs or outputs as vectors.
+    """
+    if isinstance(conversion, add):
+        return (1., conversion.const)
+    elif conversion is do_nothing:
+        return (1., 0.)
+    elif conversion is change_sign:
+        return (-1., 0.)
+    elif conversion is to_degC_from_degK:
+        return (1., -273.15)
+    elif conversion is to_degK_from_degC:
+        return (1., 273.15)
+    else:
+        return None
@@ -2,6 +2,8 @@ from twin4build.saref4syst.system import System
 import numpy as np
 from twin4build.utils.data_loaders.load_spreadsheet import load_spreadsheet
 from twin4build.utils.get_main_dir import get_main_dir
+from twin4build.utils.shared_array import SharedArray
+from twin4build.utils.time_series_input import is_same_data_source
 import pandas as pd
 import os
 from twin4build.utils.preprocessing.data_collection import DataCollection
@@ -41,6 +43,12 @@ class OutdoorEnvironmentSystem(base.OutdoorEnvironment, System):
                        "outdoorCo2Concentration": None}
         self.filename = filename
         self.df = df_input
+        self.df_input = df_input
+        self.database = None
+        self.cached_database = {} # (startTime, endTime, stepSize) -> (DataFrame, dict of arrays)
+        self.max_cached_periods = 32
+        self.cached_initialize_arguments = None
+        self.cached_data_source = None
         self.cache_root = get_main_dir()
 
         
@@ -95,17 +103,68 @@ class OutdoorEnvironmentSystem(base.OutdoorEnvironment, System):
                     raise(ValueError(f"Neither one of the following filenames exist: \n\"{self.filename}\"\n{filename_}"))
                 self.filename = filename_
 
-        if self.df is None:
-            self.df = load_spreadsheet(filename=self.filename, stepSize=stepSize, start_time=startTime, end_time=endTime, dt_limit=1200, cache_root=self.cache_root)
-        required_keys = ["outdoorTemperature", "globalIrradiation"]
-        is_included = np.array([key in np.array([self.df.columns]) for key in required_keys])
-        assert np.all(is_included), f"The following required columns \"{', '.join(list(np.array(required_keys)[is_included==False]))}\" are not included in the provided weather file {self.filename}." 
+        # The cached weather data is discarded if the data source has changed since it was loaded, e.g. if "df_input" was replaced
+        data_source = (self.filename, self.df_input)
+        if is_same_data_source(data_source, self.cached_data_source)==False:
+            self.clear_cached_database()
+            self.cached_data_source = data_source
+        key = (startTime, endTime, stepSize)
+        if key not in self.cached_database:
+            if self.df_input is not None:
+                df = self.df_input
+            else:
+                df = load_spreadsheet(filename=self.filename, stepSize=stepSize, start_time=startTime, end_time=endTime, dt_limit=1200, cache_root=self.cache_root)
+            required_keys = ["outdoorTemperature", "globalIrradiation"]
+            is_included = np.array([key_ in np.array([df.columns]) for key_ in required_keys])
+            assert np.all(is_included), f"The following required columns \"{', '.join(list(np.array(required_keys)[is_included==False]))}\" are not included in the provided weather file {self.filename}." 
+            # Pandas indexing is slow compared to indexing a NumPy array, which is therefore extracted once
+            self.cached_database[key] = (df, {key_: np.ascontiguousarray(df[key_].to_numpy()) for key_ in required_keys})
+            if len(self.cached_database)>self.max_cached_periods:
+                df_, database_ = self.cached_database.pop(next(iter(self.cached_database)))
+                for array in database_.values():
+                    if isinstance(array, SharedArray):
+                        array.release()
+        df, self.database = self.cached_database[key]
+        if df is not None:
+            self.df = df
         self.stepIndex = 0
+        self.cached_initialize_arguments = key
+
+    def clear_cached_database(self):
+        for df, database in self.cached_database.values():
+            for array in database.values():
+                if isinstance(array, SharedArray):
+                    array.release()
+        self.cached_database = {}
+        self.cached_initialize_arguments = None
+
+    def share_data(self):
+        """
+        Moves the weather data of all cached periods to shared memory (see SharedArray and Model.share_data).
+        While the data is shared, the DataFrames are not pickled, i.e. they are not transferred to worker processes.
+        """
+        for df, database in self.cached_database.values():
+            for key, array in database.items():
+                if isinstance(array, SharedArray)==False:
+                    database[key] = SharedArray.from_array(array)
+
+    def release_shared_data(self):
+        for df, database in self.cached_database.values():
+            for key, array in database.items():
+                if isinstance(array, SharedArray):
+                    database[key] = array.release()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if any(isinstance(array, SharedArray) for df, database in self.cached_database.values() for array in database.values()):
+            state["cached_database"] = {key: (None, database) for key, (df, database) in self.cached_database.items()}
+            state["df"] = None
+            state["df_input"] = None
+            state["cached_data_source"] = (self.filename, None)
+        return state
 
     def do_step(self, secondTime=None, dateTime=None, stepSize=None):
-        # self.output["outdoorTemperature"] = self.database["outdoorTemperature"][self.stepIndex]
-        # self.output["globalIrradiation"] = self.database["globalIrradiation"][self.stepIndex]
-        self.output["outdoorTemperature"] = self.df["outdoorTemperature"].iloc[self.stepIndex]
-        self.output["globalIrradiation"] = self.df["globalIrradiation"].iloc[self.stepIndex]
+        self.output["outdoorTemperature"] = self.database["outdoorTemperature"][self.stepIndex]
+        self.output["globalIrradiation"] = self.database["globalIrradiation"][self.stepIndex]
         self.output["outdoorCo2Concentration"] = 400
         self.stepIndex += 1
\ No newline at end of file
@@ -1,5 +1,4 @@
 from twin4build.saref4syst.system import System
-from pwlf import PiecewiseLinFit
 import copy
 import numpy as np
 class PiecewiseLinearSystem(System):
@@ -59,6 +58,7 @@ class PiecewiseLinearSystem(System):
             Fits a piecewise linear model to the input-output data and stores it in self.model.
         '''
         
+        from pwlf import PiecewiseLinFit # Imported here as pwlf is slow to import and only needed for calibration
         X = input.iloc[:,0]
         self.model = PiecewiseLinFit(X, output)
         res = self.model.fit(n_line_segments)
@@ -1,5 +1,4 @@
 from twin4build.saref4syst.system import System
-from pwlf import PiecewiseLinFit
 
 class PiecewiseLinearSupplyWaterTemperatureSystem(System):
     def __init__(self,
@@ -42,6 +41,7 @@ class PiecewiseLinearSupplyWaterTemperatureSystem(System):
              uses input and output data to train a piecewise linear regression model with a specified number of line segments.
         '''
 
+        from pwlf import PiecewiseLinFit # Imported here as pwlf is slow to import and only needed for calibration
         self.model = {}
         for key in input.keys():
             X = input[key].iloc[:,0]
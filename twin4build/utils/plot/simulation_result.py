@@ -1,25 +1,12 @@
-import matplotlib.pyplot as plt
 import math
-import matplotlib.pylab as pylab
-import matplotlib.dates as mdates
-
 # from matplotlib.pyplot import cm
 from itertools import cycle
 import numpy as np
-import seaborn as sns
 import copy
+import numbers
 
-global_colors = sns.color_palette("deep")
-global_blue = global_colors[0]
-global_orange = global_colors[1]
-global_green = global_colors[2]
-global_red = global_colors[3]
-global_purple = global_colors[4]
-global_brown = global_colors[5]
-global_pink = global_colors[6]
-global_grey = global_colors[7]
-global_beis = global_colors[8]
-global_sky_blue = global_colors[9]
+# Exact types that are written to the preallocated result arrays without the (slow) numbers.Real check
+_real_types = frozenset([float, int, bool, np.float64, np.float32, np.int64, np.int32, np.bool_])
 
 
 class SimulationResult:
@@ -50,29 +37,117 @@ class SimulationResult:
         self.saveSimulationResult = saveSimulationResult
         self.doUncertaintyAnalysis = doUncertaintyAnalysis
         self.trackGradient = trackGradient
+        self.recordedProperties = None
+        self._n_result_timesteps = None
+        self._result_index = 0
+        self._result_plan = None
         
-    def clear_results(self):
+    def clear_results(self, n_timesteps=None):
+        """
+        Clears all saved results. 
+        If "n_timesteps" is provided, numeric inputs and outputs are saved in preallocated float64 arrays of length "n_timesteps", which are written in place by step index.
+        Values that are not real numbers, e.g. lists, are saved in lists as before.
+        """
         self.savedInput = {}
         self.savedOutput = {}
         self.savedInputUncertainty = {}
         self.savedOutputUncertainty = {}
         self.savedOutputGradient = {}
         self.savedParameterGradient = {}
+        self._n_result_timesteps = n_timesteps
+        self._result_index = 0
+        self._result_plan = None
+
+    def _save_values(self, saved, values, copy_values):
+        for key, value in values.items():
+            if key not in saved:
+                saved[key] = [value]
+            else:
+                saved[key].append(copy.deepcopy(value) if copy_values else value)
+
+    def _get_result_plan(self, saved, values, copy_values):
+        """
+        Returns the (key, array) pairs of the numeric values and the keys of the other values that are saved in preallocated mode.
+        Whether a key is numeric is decided once, at its first write, and is given by the type of its buffer (array or list).
+        """
+        numeric = []
+        other = []
+        for key, value in values.items():
+            if self.recordedProperties is not None and key not in self.recordedProperties:
+                continue
+            if key not in saved:
+                if type(value) in _real_types or isinstance(value, numbers.Real):
+                    saved[key] = np.full(self._n_result_timesteps, np.nan)
+                else:
+                    saved[key] = [None]*self._result_index
+            buffer = saved[key]
+            if type(buffer) is np.ndarray:
+                numeric.append((key, buffer))
+            else:
+                other.append(key)
+        return (len(values), tuple(numeric), tuple(other), copy_values)
+
+    def _save_values_preallocated(self, saved, values, plan):
+        i = self._result_index
+        n_values, numeric, other, copy_values = plan
+        for key, buffer in numeric:
+            value = values[key]
+            if type(value) in _real_types:
+                buffer[i] = value
+            elif isinstance(value, numbers.Real):
+                buffer[i] = value
+            else: # Fall back to a list if a non-numeric value is encountered
+                saved[key] = buffer[:i].tolist() + [copy.deepcopy(value) if copy_values else value]
+                self._result_plan = None
+        for key in other:
+            value = values[key]
+            saved[key].append(copy.deepcopy(value) if copy_values else value)
+
+    def set_recorded_properties(self, recordedProperties=None):
+        """
+        Sets the recording policy of the component.
+        If "recordedProperties" is None, all inputs and outputs are saved if saveSimulationResult is True.
+        Otherwise, only the inputs and outputs with names in "recordedProperties" are saved, regardless of saveSimulationResult. 
+        An empty collection disables recording for the component.
+        """
+        self.recordedProperties = None if recordedProperties is None else set(recordedProperties)
+        self._result_plan = None
+
+    def is_recording(self):
+        if self.recordedProperties is None:
+            return self.saveSimulationResult
+        else:
+            return len(self.recordedProperties)>0
         
     def update_results(self):
-        if self.saveSimulationResult:
-            for key in self.input:
-                if key not in self.savedInput:
-                    self.savedInput[key] = [self.input[key]]
-                else:
-                    self.savedInput[key].append(self.input[key])
-                
-            for key in self.output:
-                if key not in self.savedOutput:
-                    self.savedOutput[key] = [self.output[key]]
-                else:
-                    self.savedOutput[key].append(copy.deepcopy(self.output[key]))
+        if self._n_result_timesteps is not None:
+            if self.is_recording()==False:
+                return
+            assert self._result_index<self._n_result_timesteps, f"The number of saved timesteps exceeds the preallocated number of timesteps ({self._n_result_timesteps}) for component \"{self.id}\""
+            # The plan is rebuilt if keys are added to the inputs or outputs or if a numeric key falls back to a list
+            plan = self._result_plan
+            if plan is None or plan[0][0]!=len(self.input) or plan[1][0]!=len(self.output):
+                plan = (self._get_result_plan(self.savedInput, self.input, copy_values=False),
+                        self._get_result_plan(self.savedOutput, self.output, copy_values=True))
+                self._result_plan = plan
+            self._save_values_preallocated(self.savedInput, self.input, plan[0])
+            self._save_values_preallocated(self.savedOutput, self.output, plan[1])
+            self._result_index += 1
+        else:
+            if self.recordedProperties is None:
+                if self.saveSimulationResult==False:
+                    return
+                input_ = self.input
+                output = self.output
+            else:
+                if len(self.recordedProperties)==0:
+                    return
+                input_ = {key: value for key, value in self.input.items() if key in self.recordedProperties}
+                output = {key: value for key, value in self.output.items() if key in self.recordedProperties}
+            self._save_values(self.savedInput, input_, copy_values=False)
+            self._save_values(self.savedOutput, output, copy_values=True)
 
+        if self.recordedProperties is None:
             if self.doUncertaintyAnalysis:
                 for key in self.inputUncertainty:
                     if key not in self.savedInputUncertainty:
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 5)
+    sys.path.append(file_path)
+from twin4build.utils.plot.tests.test_simulation_result import get_dampers, save_results
+
+def benchmark(dampers, n_timesteps, n_timesteps_preallocated, repeat):
+    times = []
+    for _ in range(repeat):
+        for damper in dampers:
+            damper.clear_results(n_timesteps=n_timesteps_preallocated)
+        t = time.process_time()
+        save_results(dampers, n_timesteps)
+        times.append(time.process_time()-t)
+    return min(times)
+
+def main():
+    """
+    Compares the time spent in update_results for 100 components over one week at 600 s with list appends (n_timesteps=None) and with preallocated arrays.
+    """
+    n_components = 100
+    n_timesteps = 1008
+    dampers = get_dampers(n_components, n_timesteps)
+    time_list = benchmark(dampers, n_timesteps, None, repeat=5)
+    time_preallocated = benchmark(dampers, n_timesteps, n_timesteps, repeat=5)
+    print(f"update_results: lists {time_list:.3f} s, preallocated arrays {time_preallocated:.3f} s, speedup {time_list/time_preallocated:.1f}x")
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+import numpy as np
+###Only for testing before distributing package
+if __name__ == '__main__':
+    uppath = lambda _path,n: os.sep.join(_path.split(os.sep)[:-n])
+    file_path = uppath(os.path.abspath(__file__), 5)
+    sys.path.append(file_path)
+import twin4build as tb
+
+def get_dampers(n_components, n_timesteps):
+    dampers = [tb.DamperSystem(nominalAirFlowRate=tb.PropertyValue(hasValue=1+0.01*i), a=1+0.01*i, id=f"Damper {i}") for i in range(n_components)]
+    for damper in dampers:
+        damper.clear_results(n_timesteps=n_timesteps)
+        damper.initialize()
+        damper.input["damperPosition"] = 0.5
+        damper.do_step()
+    return dampers
+
+def save_results(dampers, n_timesteps):
+    for i in range(n_timesteps):
+        for damper in dampers:
+            damper.input["damperPosition"] = i/n_timesteps
+            damper.output["airFlowRate"] = np.float64(i)
+            damper.update_results()
+
+class TestSimulationResult(unittest.TestCase):
+    @unittest.skipIf(False, 'Currently not used')
+    def test_preallocated_results(self):
+        n_timesteps = 50
+        dampers = get_dampers(2, n_timesteps)
+        damper = dampers[0]
+        damper.set_recorded_properties(["airFlowRate", "damperPosition"])
+        save_results(dampers, n_timesteps)
+        self.assertIsInstance(damper.savedOutput["airFlowRate"], np.ndarray)
+        np.testing.assert_allclose(damper.savedOutput["airFlowRate"], np.arange(n_timesteps))
+        np.testing.assert_allclose(damper.savedInput["damperPosition"], np.arange(n_timesteps)/n_timesteps)
+        self.assertEqual(set(damper.savedOutput.keys()), {"airFlowRate", "damperPosition"})
+
+        # A non-numeric value makes the key fall back to a list
+        damper.clear_results(n_timesteps=3)
+        for value in [1.0, 2, [3.0, 4.0]]:
+            damper.output["airFlowRate"] = value
+            damper.update_results()
+        self.assertEqual(damper.savedOutput["airFlowRate"], [1.0, 2.0, [3.0, 4.0]])
+
+        # List mode gives the same results as the preallocated arrays
+        dampers[1].clear_results()
+        save_results(dampers[1:], n_timesteps)
+        np.testing.assert_allclose(np.array(dampers[1].savedOutput["airFlowRate"]), np.arange(n_timesteps))
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+def _attach_shared_array(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    array = SharedArray(shape, dtype=dtype, buffer=shm.buf)
+    array._shm = shm
+    array._is_owner = False
+    array.flags.writeable = False
+    return array
+
+class SharedArray(np.ndarray):
+    """
+    Read-only NumPy array stored in shared memory (see multiprocessing.shared_memory).
+    Pickling a SharedArray only transfers the name of the shared memory block, and the unpickled array is attached to the same block without copying.
+    This is used to transfer time series data to worker processes, such that the memory use is independent of the number of workers (see Model.share_data).
+
+    The process that creates the array with SharedArray.from_array owns the shared memory block and must call release when the workers are done with it.
+    Views of a SharedArray are pickled by value.
+    """
+    @classmethod
+    def from_array(cls, array):
+        array = np.ascontiguousarray(array)
+        assert array.dtype.hasobject==False, "Arrays of Python objects cannot be stored in shared memory"
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared_array = cls(array.shape, dtype=array.dtype, buffer=shm.buf)
+        shared_array[...] = array
+        shared_array._shm = shm
+        shared_array._is_owner = True
+        shared_array.flags.writeable = False
+        return shared_array
+
+    def __array_finalize__(self, obj):
+        # Views and copies do not own a reference to the shared memory block
+        self._shm = None
+        self._is_owner = False
+
+    def __reduce__(self):
+        if self._shm is None:
+            return super().__reduce__()
+        return (_attach_shared_array, (self._shm.name, self.shape, self.dtype.str))
+
+    def release(self):
+        """
+        Returns a regular copy of the array. If this process owns the shared memory block, the block is removed.
+        The memory is freed by the operating system when all processes attached to the block have released their arrays.
+        """
+        array = np.array(self, copy=True).view(np.ndarray)
+        if self._is_owner:
+            self._shm.unlink()
+            self._is_owner = False
+        return array
@@ -254,7 +254,8 @@ class SignaturePattern():
         print("==================")
 
     def reset_ruleset(self):
-        for rule in self._ruleset.values():
+        # The ruleset grows with the nodes added by Ignore rules, which all refer to the same few rules. Each rule is only reset once.
+        for rule in dict.fromkeys(self._ruleset.values()):
             rule.reset()
 
 class Rule:
@@ -352,15 +353,16 @@ class Exact(Rule):
         rule_applies = False
 
 
-        match_node_no_match = []
-        match_node_child_no_match = []
-        for (sp_node, sp_node_child_, sp_attr_name), rule in ruleset.items():
-            if sp_node_child_ in node_map and sp_node==self.object and sp_attr_name==self.predicate and sp_node_child_!=self.subject:
-                match_node_child_no_match.extend([c for c in node_map[sp_node_child_]])
+        # The ruleset is looked up for each node in node_map, as the ruleset can be much larger than node_map (see Ignore.apply)
+        match_node_no_match = set()
+        match_node_child_no_match = set()
+        for sp_node_child_ in node_map:
+            if sp_node_child_!=self.subject and (self.object, sp_node_child_, self.predicate) in ruleset:
+                match_node_child_no_match.update(node_map[sp_node_child_])
         
-        for (sp_node, sp_node_child_, sp_attr_name), rule in ruleset.items():
-            if sp_node in node_map and sp_node_child_==self.subject and sp_attr_name==self.predicate and sp_node!=self.object:
-                match_node_no_match.extend([c for c in node_map[sp_node]])
+        for sp_node in node_map:
+            if sp_node!=self.object and (sp_node, self.subject, self.predicate) in ruleset:
+                match_node_no_match.update(node_map[sp_node])
         
         # print("match_node_child_no_match", [m.id if "id" in get_object_attributes(m) else m.__class__.__name__ + str(id(m)) for m in match_node_child_no_match])
         # print("match_node_no_match", [m.id if "id" in get_object_attributes(m) else m.__class__.__name__ + str(id(m)) for m in match_node_no_match])
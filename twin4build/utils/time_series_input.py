@@ -1,12 +1,22 @@
 from twin4build.saref4syst.system import System
 import os
+import numpy as np
 from twin4build.utils.data_loaders.load_spreadsheet import load_spreadsheet
 from twin4build.utils.preprocessing.data_collection import DataCollection
 from twin4build.logger.Logging import Logging
 from twin4build.utils.get_main_dir import get_main_dir
+from twin4build.utils.shared_array import SharedArray
 from pathlib import Path, PurePosixPath
 logger = Logging.get_logger("ai_logfile")
 
+def is_same_data_source(data_source, other_data_source):
+    """
+    Compares two data sources (see TimeSeriesInputSystem.get_data_source). DataFrames are compared by identity.
+    """
+    if data_source is None or other_data_source is None:
+        return False
+    return data_source[:-1]==other_data_source[:-1] and data_source[-1] is other_data_source[-1]
+
 class TimeSeriesInputSystem(System):
     """
     This component models a generic dynamic input based on prescribed time series data.
@@ -24,6 +34,11 @@ class TimeSeriesInputSystem(System):
         self.filename = filename
         logger.info("[Time Series Input] : Entered in Initialise Function")
         self.cached_initialize_arguments = None
+        self.physicalSystemReadings = None
+        self.physicalSystemReadingsArray = None
+        self.cached_readings = {} # (startTime, endTime, stepSize) -> (DataFrame, array)
+        self.cached_data_source = None
+        self.max_cached_periods = 32
         self.cache_root = get_main_dir()
         
 
@@ -59,16 +74,72 @@ class TimeSeriesInputSystem(System):
                     endTime=None,
                     stepSize=None,
                     model=None):
-        if self.df is None or (self.cached_initialize_arguments!=(startTime, endTime, stepSize) and self.cached_initialize_arguments is not None):
-            self.df = load_spreadsheet(self.filename, self.datecolumn, self.valuecolumn, stepSize=stepSize, start_time=startTime, end_time=endTime, dt_limit=1200, cache_root=self.cache_root)
-        self.physicalSystemReadings = self.df            
+        # The cached readings are discarded if the data source has changed since they were loaded, e.g. if "df" was replaced
+        data_source = self.get_data_source()
+        if is_same_data_source(data_source, self.cached_data_source)==False:
+            self.clear_cached_readings()
+            self.cached_data_source = data_source
+        key = (startTime, endTime, stepSize)
+        if key not in self.cached_readings:
+            if self.filename is None:
+                df = self.df
+            else:
+                df = load_spreadsheet(self.filename, self.datecolumn, self.valuecolumn, stepSize=stepSize, start_time=startTime, end_time=endTime, dt_limit=1200, cache_root=self.cache_root)
+            # Pandas indexing is slow compared to indexing a NumPy array, which is therefore extracted once
+            self.cached_readings[key] = (df, np.ascontiguousarray(df.values))
+            if len(self.cached_readings)>self.max_cached_periods:
+                df_, array_ = self.cached_readings.pop(next(iter(self.cached_readings)))
+                if isinstance(array_, SharedArray):
+                    array_.release()
+        self.physicalSystemReadings, self.physicalSystemReadingsArray = self.cached_readings[key]
+        if self.physicalSystemReadings is not None:
+            self.df = self.physicalSystemReadings
+        self.outputKey = next(iter(self.output), None)
         self.stepIndex = 0
-        self.cached_initialize_arguments = (startTime, endTime, stepSize)
+        self.cached_initialize_arguments = key
         logger.info("[Time Series Input] : Exited from Initialise Function")
+
+    def get_data_source(self):
+        """
+        Returns a tuple (filename, datecolumn, valuecolumn, DataFrame) identifying the data that the readings are loaded from. 
+        The DataFrame is only part of the data source if no filename is given.
+        """
+        return (self.filename, self.datecolumn, self.valuecolumn, self.df if self.filename is None else None)
+
+    def clear_cached_readings(self):
+        for df, array in self.cached_readings.values():
+            if isinstance(array, SharedArray):
+                array.release()
+        self.cached_readings = {}
+        self.cached_initialize_arguments = None
+
+    def share_data(self):
+        """
+        Moves the readings of all cached periods to shared memory (see SharedArray and Model.share_data).
+        While the readings are shared, the DataFrames are not pickled, i.e. they are not transferred to worker processes.
+        """
+        for key, (df, array) in self.cached_readings.items():
+            if isinstance(array, SharedArray)==False and array.dtype.hasobject==False:
+                self.cached_readings[key] = (df, SharedArray.from_array(array))
+        if self.cached_initialize_arguments in self.cached_readings:
+            self.physicalSystemReadingsArray = self.cached_readings[self.cached_initialize_arguments][1]
+
+    def release_shared_data(self):
+        for key, (df, array) in self.cached_readings.items():
+            if isinstance(array, SharedArray):
+                self.cached_readings[key] = (df, array.release())
+        if self.cached_initialize_arguments in self.cached_readings:
+            self.physicalSystemReadingsArray = self.cached_readings[self.cached_initialize_arguments][1]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if any(isinstance(array, SharedArray) for df, array in self.cached_readings.values()):
+            state["cached_readings"] = {key: (None, array) if isinstance(array, SharedArray) else (df, array) for key, (df, array) in self.cached_readings.items()}
+            if self.filename is not None:
+                state["df"] = None
+            state["physicalSystemReadings"] = None
+        return state
         
     def do_step(self, secondTime=None, dateTime=None, stepSize=None):
-        key = list(self.output.keys())[0]
-        self.output[key] = self.physicalSystemReadings.values[self.stepIndex]
+        self.output[self.outputKey] = self.physicalSystemReadingsArray[self.stepIndex]
         self.stepIndex += 1
-        
-        
\ No newline at end of file